@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import time
+import logging
+import numpy as np
+import pandas as pd
+from metrics import track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'bars')
+
+
+class BarCache:
+    """
+    本地K线列式缓存
+    每个 (source, symbol, period) 对应一个目录，每列一个二进制文件，meta.json 记录列名、类型和行数；
+    time 列为毫秒时间戳，按升序存放。读取时使用内存映射，增量数据直接追加到列文件末尾。
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+
+    def _key_dir(self, source, symbol, period):
+        safe_symbol = re.sub(r'[^0-9A-Za-z._=-]', '_', str(symbol))
+        return os.path.join(self.root, str(source), str(period), safe_symbol)
+
+    def _load_meta(self, path):
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_meta(self, path, meta):
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def read_columns(self, source, symbol, period):
+        """
+        以内存映射方式读取缓存的各列
+        :return: (meta, {列名: np.memmap})，无缓存时返回 (None, {})
+        """
+        path = self._key_dir(source, symbol, period)
+        meta = self._load_meta(path)
+        if not meta or meta['rows'] == 0:
+            return meta, {}
+        columns = {}
+        for i, (name, dtype) in enumerate(meta['columns']):
+            columns[name] = np.memmap(os.path.join(path, f'col_{i}.bin'), dtype=dtype, mode='r',
+                                      shape=(meta['rows'],))
+        return meta, columns
+
+    def read(self, source, symbol, period, begin_time=None, end_time=None):
+        """
+        读取缓存K线
+        :param begin_time: 起始时间(毫秒，含)，为空表示不限
+        :param end_time: 结束时间(毫秒，含)，为空表示不限
+        :return: DataFrame，包含 time 列；无缓存时返回空 DataFrame
+        """
+        meta, columns = self.read_columns(source, symbol, period)
+        if not columns:
+            return pd.DataFrame()
+        times = columns['time']
+        start = 0 if begin_time is None else int(np.searchsorted(times, begin_time, side='left'))
+        stop = len(times) if end_time is None else int(np.searchsorted(times, end_time, side='right'))
+        df = pd.DataFrame({name: np.asarray(col[start:stop]) for name, col in columns.items()})
+        for name, value in meta.get('constants', {}).items():
+            df[name] = value
+        return df
+
+    def coverage(self, source, symbol, period):
+        """
+        已请求过的时间范围
+        :return: (fetched_from, fetched_until)，无缓存时为 (None, None)
+        """
+        meta = self._load_meta(self._key_dir(source, symbol, period))
+        if not meta:
+            return None, None
+        return meta.get('fetched_from'), meta.get('fetched_until')
+
+    def write(self, source, symbol, period, df, fetched_from=None, fetched_until=None):
+        """
+        写入K线，time 不早于新数据首行的旧数据会被截断后替换（用于更新未收盘的最后一根K线）；
+        新数据早于缓存首行时整体重写
+        :param df: 包含 time(毫秒) 列的 DataFrame
+        """
+        path = self._key_dir(source, symbol, period)
+        os.makedirs(path, exist_ok=True)
+        meta = self._load_meta(path) or {'columns': [], 'rows': 0}
+
+        if df is not None and not df.empty:
+            df = df.sort_values('time').drop_duplicates('time', keep='last')
+            # 非数值列(如 symbol)通常为常量，单独记录，不占用列文件
+            constants = {name: df[name].iloc[0] for name in df.columns
+                         if name != 'time' and not pd.api.types.is_numeric_dtype(df[name])
+                         and df[name].nunique(dropna=False) == 1}
+            df = df[[name for name in df.columns
+                     if name == 'time' or pd.api.types.is_numeric_dtype(df[name])]]
+            df = df.assign(time=df['time'].astype(np.int64))
+
+            if meta['rows'] == 0:
+                old = None
+                meta.update(
+                    columns=[['time', 'int64']] + [[name, 'float64'] for name in df.columns if name != 'time'],
+                    constants={k: (v.item() if hasattr(v, 'item') else v) for k, v in constants.items()},
+                )
+            else:
+                _, old = self.read_columns(source, symbol, period)
+
+            names = [name for name, _ in meta['columns']]
+            first_new = int(df['time'].iloc[0])
+            if old and first_new < int(old['time'][0]):
+                # 向前补数据：与旧数据合并后整体重写
+                merged = pd.concat([df, self.read(source, symbol, period)], ignore_index=True)
+                merged = merged.drop_duplicates('time', keep='first').sort_values('time')
+                del old
+                self._rewrite(path, meta, merged.reindex(columns=names))
+            else:
+                keep = int(np.searchsorted(old['time'], first_new, side='left')) if old else 0
+                del old
+                self._append(path, meta, df.reindex(columns=names), keep)
+
+        if fetched_from is not None:
+            current = meta.get('fetched_from')
+            meta['fetched_from'] = fetched_from if current is None else min(current, fetched_from)
+        if fetched_until is not None:
+            meta['fetched_until'] = max(meta.get('fetched_until') or 0, fetched_until)
+        self._save_meta(path, meta)
+
+    def _append(self, path, meta, df, keep):
+        for i, (name, dtype) in enumerate(meta['columns']):
+            col_path = os.path.join(path, f'col_{i}.bin')
+            values = df[name].to_numpy(dtype=dtype, na_value=0 if dtype == 'int64' else np.nan)
+            with open(col_path, 'ab') as f:
+                f.truncate(keep * np.dtype(dtype).itemsize)
+                f.write(values.tobytes())
+        meta['rows'] = keep + len(df)
+
+    def _rewrite(self, path, meta, df):
+        for i, (name, dtype) in enumerate(meta['columns']):
+            tmp_path = os.path.join(path, f'col_{i}.bin.tmp')
+            df[name].to_numpy(dtype=dtype, na_value=0 if dtype == 'int64' else np.nan).tofile(tmp_path)
+            os.replace(tmp_path, os.path.join(path, f'col_{i}.bin'))
+        meta['rows'] = len(df)
+
+    def get(self, source, symbol, period, begin_time, end_time, fetch):
+        """
+        读取 [begin_time, end_time] 区间的K线，只对缓存未覆盖的区间调用 fetch
+        :param begin_time: 起始时间(毫秒)，为空表示从数据源默认的起点读取，已有缓存时从缓存首根K线读取、不向前补数据
+        :param fetch: fetch(begin_time, end_time) -> 包含 time(毫秒) 列的 DataFrame
+        :return: DataFrame
+        """
+        fetched_from, fetched_until = self.coverage(source, symbol, period)
+        if fetched_from is None and fetched_until is not None:
+            # 起始时间为空时写入的缓存：以首根K线时间作为已覆盖的起点
+            _, columns = self.read_columns(source, symbol, period)
+            fetched_from = int(columns['time'][0]) if columns else None
+            del columns
+        if fetched_from is None:
+            df = fetch(begin_time, end_time)
+            if begin_time is None and df is not None and not df.empty:
+                begin_time = int(df['time'].min())
+            self.write(source, symbol, period, df, begin_time, end_time)
+        else:
+            if begin_time is not None and begin_time < fetched_from:
+                logger.info(f"补充缓存 {symbol} {period}: {begin_time} - {fetched_from}")
+                self.write(source, symbol, period, fetch(begin_time, fetched_from), begin_time, None)
+            if end_time > fetched_until:
+                # 从缓存最后一根K线开始重新获取，覆盖可能未收盘的K线
+                meta, columns = self.read_columns(source, symbol, period)
+                last_time = int(columns['time'][-1]) if columns else fetched_until
+                del columns
+                logger.info(f"增量更新缓存 {symbol} {period}: {last_time} - {end_time}")
+                self.write(source, symbol, period, fetch(min(last_time, fetched_until), end_time), None, end_time)
+        return self.read(source, symbol, period, begin_time, end_time)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """进程内共享的默认缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BarCache()
+    return _default_cache
+
+
+def get_tiger_bars(quote_client, symbol, period='day', begin_time=None, end_time=None, cache=None):
+    """
+    带本地缓存的 quote_client.get_bars
+    :param begin_time: 起始时间(毫秒)
+    :param end_time: 结束时间(毫秒)，默认当前时间
+    :return: 与 get_bars 相同列的 DataFrame
+    """
+    cache = cache or default_cache()
+    end_time = end_time or int(time.time() * 1000)
+
+    def fetch(begin, end):
+        with track('tiger', 'get_bars'):
+            return quote_client.get_bars(symbols=[symbol], period=period, begin_time=begin, end_time=end)
+
+    return cache.get('tiger', symbol, period, begin_time, end_time, fetch)
+
+
+def _parse_period(period):
+    """
+    解析 yfinance 的 period 参数 (如 '1d', '5d', '1mo', '1y')
+    :return: (数量, 单位)，不能按时间区间缓存的 period (如 'max', 'ytd') 返回 None
+    """
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', str(period))
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def _period_lookback(count, unit):
+    """
+    period 对应的回看时间跨度
+    与 yfinance 一致，'Nd' 指最近 N 个交易日：多取若干自然日覆盖周末和节假日，读取后再按交易日截取
+    """
+    if unit == 'd':
+        return pd.Timedelta(days=count + 2 * (count // 5 + 1) + 2)
+    return pd.Timedelta(days=count * {'wk': 7, 'mo': 31, 'y': 366}[unit])
+
+
+def _last_sessions(df, count):
+    """截取最近 count 个交易日的K线(按 UTC 日期划分交易日)"""
+    dates = df.index.normalize()
+    sessions = dates.unique()
+    return df[dates >= sessions[-count]] if len(sessions) > count else df
+
+
+def _yf_frame(data):
+    """yf.download 结果去掉多级列名、索引转为 UTC"""
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    data.index = data.index.tz_localize('UTC') if data.index.tz is None else data.index.tz_convert('UTC')
+    return data
+
+
+def get_yf_bars(ticker, period='1d', interval='1m', cache=None):
+    """
+    带本地缓存的 yf.download，返回格式与 yf.download 相同(时间索引, Open/High/Low/Close/...)
+    不能按时间区间缓存的 period (如 'max', 'ytd') 直接调用 yf.download
+    """
+    import yfinance as yf
+
+    parsed = _parse_period(period)
+    if parsed is None:
+        return _yf_frame(yf.download(ticker, period=period, interval=interval, progress=False))
+
+    cache = cache or default_cache()
+    end = pd.Timestamp.now(tz='UTC')
+    begin = end - _period_lookback(*parsed)
+    # 1 分钟线每次请求最多 7 天
+    step = pd.Timedelta(days=7) if interval == '1m' else None
+
+    def fetch(begin_ms, end_ms):
+        frames = []
+        start, stop = pd.Timestamp(begin_ms, unit='ms', tz='UTC'), pd.Timestamp(end_ms, unit='ms', tz='UTC')
+        while start < stop:
+            chunk_end = min(stop, start + step) if step is not None else stop
+            data = yf.download(ticker, start=start, end=chunk_end, interval=interval, progress=False)
+            if not data.empty:
+                frames.append(_yf_frame(data))
+            start = chunk_end
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames)
+        times = data.index.asi8 // 1_000_000
+        data = data.reset_index(drop=True)
+        data.insert(0, 'time', times)
+        return data
+
+    df = cache.get('yfinance', ticker, interval, int(begin.value // 1_000_000), int(end.value // 1_000_000), fetch)
+    if df.empty:
+        return df
+    df.index = pd.to_datetime(df.pop('time'), unit='ms', utc=True).rename('Datetime')
+    return _last_sessions(df, parsed[0]) if parsed[1] == 'd' else df
@@ -0,0 +1,271 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import warnings
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results.jsonl')
+
+BAR_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+SYMBOL_COUNTS = [10, 100, 500]
+
+BENCHMARKS = {}
+
+
+def benchmark(name, params=(None,)):
+    """
+    注册基准用例
+    被装饰的函数接收参数值，返回 (待计时的无参函数, 每次调用处理的元素数)
+    :param name: 用例名
+    :param params: 参数列表，每个参数生成一条结果
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, list(params))
+        return func
+    return decorator
+
+
+def synthetic_prices(n, start=100.0, volatility=0.001, seed=0):
+    """几何随机游走价格序列"""
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+
+
+def synthetic_bars(n, seed=0):
+    """与 yfinance 下载结果同结构的分钟K线"""
+    close = synthetic_prices(n, seed=seed)
+    index = pd.date_range('2024-01-01', periods=n, freq='min')
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                         'Volume': np.ones(n)}, index=index)
+
+
+def synthetic_tiger_bars(symbols, days=252, seed=0):
+    """与 get_tiger_bars 返回结构相同的日K线，每个标的随机缺失约 2% 的交易日"""
+    rng = np.random.default_rng(seed)
+    times = (pd.date_range('2024-01-01', periods=days, freq='D').astype('int64') // 10 ** 6).to_numpy()
+    bars = {}
+    for i, symbol in enumerate(symbols):
+        keep = rng.random(days) > 0.02
+        bars[symbol] = pd.DataFrame({'time': times[keep], 'close': synthetic_prices(days, seed=seed + i)[keep]})
+    return bars
+
+
+@benchmark('grid_check_and_trade', params=[10_000])
+def bench_grid_check_and_trade(ticks):
+    """GridTrading.check_and_trade 单次决策耗时，行情和下单走 SimulatedExchange"""
+    from grid_trading import GridTrading
+    from sim_exchange import SimulatedExchange
+    from trade_journal import TradeJournal
+
+    logging.getLogger('grid_trading').setLevel(logging.WARNING)  # 每笔行情的 INFO 日志会主导耗时
+    prices = synthetic_prices(ticks, start=175, volatility=0.003)
+    exchange = SimulatedExchange(balances={'USD': 1e9})
+    quote_client, trade_client = exchange.tiger_clients()
+    strategy = GridTrading('BENCH', 200, 150, 10, 100, market='US',
+                           quote_client=quote_client, trade_client=trade_client, journal=TradeJournal(':memory:'))
+
+    def run():
+        strategy.last_grid_index = None
+        strategy.positions.clear()
+        strategy.trade_history.clear()
+        for price in prices:
+            exchange.on_price('BENCH', price)
+            strategy.check_and_trade()
+    return run, ticks
+
+
+def _okx_grid_trader():
+    from okx_grid_trading import OKXGridTrader
+    from sim_exchange import SimulatedExchange, unlimited_rate_limiter
+    from trade_journal import TradeJournal
+    exchange = SimulatedExchange(balances={'USDT': 1e9})
+    return OKXGridTrader(backend=exchange.okx_backend(), rate_limiter=unlimited_rate_limiter(),
+                         journal=TradeJournal(':memory:'))
+
+
+@benchmark('okx_calculate_grid_levels', params=[10, 100, 1000])
+def bench_okx_grid_levels(num_grids):
+    trader = _okx_grid_trader()
+    return (lambda: trader.calculate_grid_levels(2600, 2400, num_grids)), num_grids
+
+
+@benchmark('okx_calculate_grid_quantity', params=[10, 100, 1000])
+def bench_okx_grid_quantity(num_grids):
+    trader = _okx_grid_trader()
+    grid_prices = trader.calculate_grid_levels(2600, 2400, num_grids)
+    return (lambda: trader.calculate_grid_quantity(1000, grid_prices)), num_grids
+
+
+@benchmark('generate_signals', params=BAR_SIZES)
+def bench_generate_signals(bars):
+    from intraday import generate_signals
+    data = synthetic_bars(bars)
+    return (lambda: generate_signals(data)), bars
+
+
+@benchmark('simulate_trading', params=BAR_SIZES)
+def bench_simulate_trading(bars):
+    from intraday import generate_signals, simulate_trading
+    signals = generate_signals(synthetic_bars(bars))
+    return (lambda: simulate_trading(signals)), bars
+
+
+@benchmark('correlation_pipeline', params=SYMBOL_COUNTS)
+def bench_correlation_pipeline(symbols):
+    """stock_correlation 的 K线转换 -> 按日期对齐 -> 收益率相关系数流程"""
+    from stock_correlation import bars_to_close, merge_closes, returns_correlation
+    bars = synthetic_tiger_bars([f'S{i:04d}' for i in range(symbols)])
+
+    def run():
+        merged = merge_closes([bars_to_close(data, symbol) for symbol, data in bars.items()])
+        return returns_correlation(merged)
+    return run, symbols
+
+
+@benchmark('correlation_engine', params=SYMBOL_COUNTS)
+def bench_correlation_engine(symbols):
+    """correlation_engine 对齐 + 分块相关系数矩阵 + top-k 标的对"""
+    from correlation_engine import align_closes, aligned_returns, CorrelationEngine
+    bars = synthetic_tiger_bars([f'S{i:04d}' for i in range(symbols)])
+    closes = {symbol: pd.Series(data['close'].to_numpy(), index=pd.to_datetime(data['time'], unit='ms'))
+              for symbol, data in bars.items()}
+
+    def run():
+        engine = CorrelationEngine(aligned_returns(align_closes(closes)))
+        return engine.matrix(), engine.top_pairs(10)
+    return run, symbols
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    计时：每轮循环调用直到超过 min_time 秒，取各轮单次耗时
+    :return: {'best', 'median', 'loops'}，单位秒
+    """
+    func()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {'best': min(samples), 'median': statistics.median(samples), 'loops': loops}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(names=None, max_bars=None, repeat=5, min_time=0.2):
+    """
+    运行基准用例
+    :param names: 用例名列表，默认全部
+    :param max_bars: 跳过参数大于该值的用例，用于快速运行
+    :return: 结果列表
+    """
+    results = []
+    for name, (factory, params) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for param in params:
+            if max_bars is not None and param is not None and param > max_bars:
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                func, items = factory(param)
+                timing = measure(func, repeat=repeat, min_time=min_time)
+            result = {'name': name, 'param': param, **timing,
+                      'per_item': timing['best'] / items if items else None}
+            logger.info(f"{name}[{param}]: best {timing['best'] * 1e3:.3f} ms, "
+                        f"median {timing['median'] * 1e3:.3f} ms ({timing['loops']} loops)")
+            results.append(result)
+    return results
+
+
+def save_results(results, path=RESULTS_PATH):
+    """追加一次运行结果，附带提交号和运行环境"""
+    record = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+    return record
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    与历史结果对比
+    :param baseline: load_results 中的一条记录
+    :param threshold: 变慢超过该比例视为回归
+    :return: 对比表 DataFrame，ratio > 1 表示变慢
+    """
+    previous = {(r['name'], r['param']): r['best'] for r in baseline['results']}
+    rows = []
+    for r in results:
+        before = previous.get((r['name'], r['param']))
+        ratio = r['best'] / before if before else None
+        rows.append({'name': r['name'], 'param': r['param'], 'before': before, 'after': r['best'],
+                     'ratio': ratio, 'regression': ratio is not None and ratio > 1 + threshold})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='策略与分析热点路径基准测试')
+    parser.add_argument('names', nargs='*', help=f"用例名，可选: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--max-bars', type=int, default=None, help='跳过规模大于该值的用例')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定回归的变慢比例')
+    parser.add_argument('--results', default=RESULTS_PATH, help='结果文件(JSON Lines)')
+    parser.add_argument('--no-save', action='store_true', help='不写入结果文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    history = load_results(args.results)
+    results = run_benchmarks(args.names, args.max_bars, args.repeat, args.min_time)
+    if history:
+        table = compare(results, history[-1], args.threshold)
+        print(f"\n与 {history[-1]['commit']} ({history[-1]['time']}) 对比:")
+        print(table.to_string(index=False))
+        if table['regression'].any():
+            print(f"\n发现 {int(table['regression'].sum())} 项性能回归")
+    if not args.no_save:
+        save_results(results, args.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# 子命令 -> 需要导入的模块，imports 子命令按此测量导入耗时
+COMMAND_MODULES = {
+    'grid': 'grid_trading',
+    'okx-grid': 'okx_grid_trading',
+    'symbols': 'get_all_symbols',
+    'correlation': 'stock_correlation',
+    'intraday': 'intraday',
+}
+
+
+def run_grid(args):
+    from tigeropen.common.consts import Market
+    from grid_trading import GridTrading
+
+    strategy = GridTrading(args.symbol, upper_price=args.upper, lower_price=args.lower, grid_num=args.grids,
+                           quantity_per_grid=args.quantity, market=Market[args.market.upper()],
+                           state_path=True if args.state else None)
+    strategy.run(interval=args.interval)
+
+
+def run_okx_grid(args):
+    import okx_grid_trading
+
+    okx_grid_trading.main(is_simulated=not args.live, upper_price=args.upper, lower_price=args.lower,
+                          num_grids=args.grids, total_investment=args.investment,
+                          check_interval=args.interval, use_ws=args.ws, state_path=True if args.state else None,
+                          inst_id=args.inst)
+
+
+def run_symbols(args):
+    from get_all_symbols import get_all_symbols
+
+    get_all_symbols(export_csv=args.csv, max_workers=args.workers)
+
+
+def run_correlation(args):
+    import stock_correlation
+
+    stock_correlation.main()
+
+
+def run_intraday(args):
+    from intraday import get_stock_data, generate_signals, simulate_trading
+
+    data = get_stock_data(args.ticker, period=args.period, interval=args.interval, use_cache=not args.no_cache)
+    signals = generate_signals(data, args.short, args.long)
+    print(simulate_trading(signals))
+
+
+def parse_importtime(stderr, module):
+    """
+    解析 python -X importtime 的输出
+    :return: (模块总耗时毫秒, [(依赖包, 毫秒), ...] 按耗时降序)
+    """
+    total = 0.0
+    packages = {}
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)', line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)) / 1000, len(match.group(3)), match.group(4)
+        if name == module and depth == 1:
+            total = cumulative
+        elif depth == 3:
+            # 目标模块直接导入的模块
+            packages[name] = max(packages.get(name, 0.0), cumulative)
+    return total, sorted(packages.items(), key=lambda item: -item[1])
+
+
+def measure_import(module, repeat=3):
+    """
+    在新的解释器中测量导入模块的耗时，取多次中的最小值
+    :return: (毫秒, 最耗时的直接依赖列表)，导入失败时返回 (None, 错误信息)
+    """
+    best = None
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                              capture_output=True, text=True, cwd=cwd)
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed'
+        total, packages = parse_importtime(proc.stderr, module)
+        if best is None or total < best[0]:
+            best = (total, packages)
+    return best
+
+
+def run_imports(args):
+    names = args.commands or list(COMMAND_MODULES)
+    unknown = [name for name in names if name not in COMMAND_MODULES]
+    if unknown:
+        print(f"未知子命令: {', '.join(unknown)}，可选: {', '.join(COMMAND_MODULES)}")
+        return 2
+    over_budget = []
+    print(f"{'子命令':<12} {'模块':<20} {'导入耗时(ms)':>12}  主要依赖")
+    for name in names:
+        module = COMMAND_MODULES[name]
+        elapsed, detail = measure_import(module, args.repeat)
+        if elapsed is None:
+            print(f"{name:<12} {module:<20} {'失败':>12}  {detail}")
+            continue
+        top = ', '.join(f"{package} {ms:.0f}" for package, ms in detail[:args.top])
+        print(f"{name:<12} {module:<20} {elapsed:>12.1f}  {top}")
+        if args.budget_ms is not None and elapsed > args.budget_ms:
+            over_budget.append(name)
+    if over_budget:
+        print(f"\n导入耗时超过 {args.budget_ms}ms: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='交易策略与数据工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    grid = subparsers.add_parser('grid', help='老虎证券网格交易')
+    grid.add_argument('symbol', help='标的代码，如 03033')
+    grid.add_argument('--upper', type=float, required=True, help='网格上限价格')
+    grid.add_argument('--lower', type=float, required=True, help='网格下限价格')
+    grid.add_argument('--grids', type=int, default=10, help='网格数量')
+    grid.add_argument('--quantity', type=int, default=100, help='每个网格的交易数量')
+    grid.add_argument('--market', default='HK', help='市场 (HK/US/CN/SG)')
+    grid.add_argument('--interval', type=int, default=60, help='检查间隔(秒)')
+    grid.add_argument('--state', action='store_true', help='保存网格持仓快照，重启时恢复')
+    grid.set_defaults(func=run_grid)
+
+    okx_grid = subparsers.add_parser('okx-grid', help='OKX 现货网格交易')
+    okx_grid.add_argument('--live', action='store_true', help='使用实盘（默认模拟盘）')
+    okx_grid.add_argument('--inst', default='ETH-USDT', help='交易对')
+    okx_grid.add_argument('--upper', type=float, default=None, help='网格上限价格，默认当前价格的102%%')
+    okx_grid.add_argument('--lower', type=float, default=None, help='网格下限价格，默认当前价格的98%%')
+    okx_grid.add_argument('--grids', type=int, default=10, help='网格数量')
+    okx_grid.add_argument('--investment', type=float, default=1000, help='总投资金额(USDT)')
+    okx_grid.add_argument('--interval', type=int, default=60, help='订单检查间隔(秒)')
+    okx_grid.add_argument('--ws', action='store_true', help='订阅 WebSocket 行情，事件驱动运行')
+    okx_grid.add_argument('--state', action='store_true', help='保存网格快照，重启时与交易所挂单对账恢复')
+    okx_grid.set_defaults(func=run_okx_grid)
+
+    symbols = subparsers.add_parser('symbols', help='刷新证券代码主表')
+    symbols.add_argument('--csv', action='store_true', help='同时导出 CSV 文件')
+    symbols.add_argument('--workers', type=int, default=4, help='并发请求数')
+    symbols.set_defaults(func=run_symbols)
+
+    correlation = subparsers.add_parser('correlation', help='富时A50与上证指数相关性分析')
+    correlation.set_defaults(func=run_correlation)
+
+    intraday = subparsers.add_parser('intraday', help='日内均线交叉策略回测')
+    intraday.add_argument('ticker', nargs='?', default='AAPL')
+    intraday.add_argument('--period', default='1d')
+    intraday.add_argument('--interval', default='1m')
+    intraday.add_argument('--short', type=int, default=50, help='短均线窗口')
+    intraday.add_argument('--long', type=int, default=200, help='长均线窗口')
+    intraday.add_argument('--no-cache', action='store_true', help='不使用本地K线缓存')
+    intraday.set_defaults(func=run_intraday)
+
+    imports = subparsers.add_parser('imports', help='测量各子命令的导入耗时')
+    imports.add_argument('commands', nargs='*', metavar='command',
+                         help=f"子命令，默认全部: {', '.join(COMMAND_MODULES)}")
+    imports.add_argument('--repeat', type=int, default=3, help='每个模块测量次数，取最小值')
+    imports.add_argument('--top', type=int, default=3, help='显示最耗时的直接依赖数')
+    imports.add_argument('--budget-ms', type=float, default=None, help='超过该耗时时以非零状态退出')
+    imports.set_defaults(func=run_imports)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
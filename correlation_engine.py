@@ -0,0 +1,244 @@
+import heapq
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def load_universe(market='US', csv_path=None, limit=None):
+    """
+    读取标的池
+    :param market: 市场
+    :param csv_path: get_all_symbols 导出的 CSV (market,symbol,name)，默认读取 symbol_master 主表
+    :param limit: 最多返回的标的数
+    :return: 代码列表
+    """
+    if csv_path is not None:
+        df = pd.read_csv(csv_path, encoding='utf-8-sig', dtype=str)
+        symbols = df.loc[df['market'] == str(market), 'symbol'].tolist()
+    else:
+        from symbol_master import list_symbols
+        symbols = [symbol for symbol, _ in list_symbols(market)]
+    return symbols[:limit] if limit else symbols
+
+
+def fetch_closes(quote_client, symbols, begin_time, end_time, period='day'):
+    """
+    逐个标的获取K线(经过本地缓存)，对齐为收盘价矩阵
+    :return: 以时间为索引、每列一个标的的 DataFrame
+    """
+    from bar_cache import get_tiger_bars
+
+    closes = {}
+    for symbol in symbols:
+        try:
+            bars = get_tiger_bars(quote_client, symbol, period=period, begin_time=begin_time, end_time=end_time)
+        except Exception as e:
+            logger.error(f"获取 {symbol} K线失败: {e}")
+            continue
+        if bars is not None and len(bars):
+            closes[symbol] = pd.Series(np.asarray(bars['close'], dtype=float),
+                                       index=pd.to_datetime(np.asarray(bars['time']), unit='ms'))
+    return align_closes(closes)
+
+
+def align_closes(closes):
+    """
+    一次性按时间对齐多个收盘价序列
+    :param closes: {symbol: Series}
+    :return: DataFrame，缺失为 NaN
+    """
+    if not closes:
+        return pd.DataFrame()
+    return pd.concat(closes, axis=1, join='outer').sort_index()
+
+
+def aligned_returns(closes, min_coverage=0.9):
+    """
+    收盘价矩阵转为收益率矩阵
+    缺失值保留为 NaN，由相关系数计算按成对有效样本处理，不会因个别标的停牌删除整行
+    :param min_coverage: 有效收益率占比低于该值的标的被剔除
+    :return: (T, N) float64 DataFrame
+    """
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    coverage = returns.notna().mean()
+    dropped = coverage.index[coverage < min_coverage]
+    if len(dropped):
+        logger.info(f"剔除 {len(dropped)} 个数据不足的标的")
+    return returns.drop(columns=dropped).astype(np.float64)
+
+
+class CorrelationEngine:
+    """
+    分块计算 N×N 收益率相关系数
+    每次只处理 block_size 列 × block_size 列的子块，工作内存为 O(T·block_size + block_size²)；
+    存在缺失值时按成对有效样本计算(与 DataFrame.corr 一致)
+    :param returns: (T, N) 收益率 DataFrame 或数组
+    :param block_size: 分块列数
+    :param min_periods: 成对有效样本少于该值时结果为 NaN
+    """
+
+    def __init__(self, returns, block_size=512, min_periods=2):
+        if isinstance(returns, pd.DataFrame):
+            self.symbols = list(returns.columns)
+            values = returns.to_numpy(dtype=np.float64)
+        else:
+            values = np.asarray(returns, dtype=np.float64)
+            self.symbols = list(range(values.shape[1]))
+        self.block_size = block_size
+        self.min_periods = min_periods
+        self.mask = ~np.isnan(values)
+        self.has_missing = not self.mask.all()
+        # 去均值后缺失处置 0，减小成对求和相减时的精度损失
+        self.values = np.where(self.mask, values - np.nanmean(values, axis=0), 0.0)
+        if not self.has_missing:
+            # 无缺失时预先标准化，每个子块只需一次矩阵乘法
+            centered = values - values.mean(axis=0)
+            norms = np.sqrt((centered ** 2).sum(axis=0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.standardized = centered / norms
+
+    @property
+    def n(self):
+        return self.values.shape[1]
+
+    def block(self, i0, i1, j0, j1):
+        """列 [i0, i1) 与列 [j0, j1) 之间的相关系数子块"""
+        if not self.has_missing:
+            if self.values.shape[0] < self.min_periods:
+                return np.full((i1 - i0, j1 - j0), np.nan)
+            return np.clip(self.standardized[:, i0:i1].T @ self.standardized[:, j0:j1], -1.0, 1.0)
+        x, mx = self.values[:, i0:i1], self.mask[:, i0:i1].astype(np.float64)
+        y, my = self.values[:, j0:j1], self.mask[:, j0:j1].astype(np.float64)
+        count = mx.T @ my
+        sum_x = x.T @ my
+        sum_y = mx.T @ y
+        sum_xx = (x * x).T @ my
+        sum_yy = mx.T @ (y * y)
+        sum_xy = x.T @ y
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = sum_xy - sum_x * sum_y / count
+            var_x = sum_xx - sum_x ** 2 / count
+            var_y = sum_yy - sum_y ** 2 / count
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[count < self.min_periods] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def iter_blocks(self, upper=True):
+        """
+        逐块生成 (i0, j0, 子块)
+        :param upper: 只生成上三角(含对角)子块
+        """
+        step = self.block_size
+        for i0 in range(0, self.n, step):
+            for j0 in range(i0 if upper else 0, self.n, step):
+                yield i0, j0, self.block(i0, min(i0 + step, self.n), j0, min(j0 + step, self.n))
+
+    def matrix(self, dtype=np.float64):
+        """
+        完整相关系数矩阵
+        :param dtype: 结果类型，N 很大时可用 float32 减半内存
+        :return: DataFrame
+        """
+        result = np.empty((self.n, self.n), dtype=dtype)
+        for i0, j0, block in self.iter_blocks():
+            i1, j1 = i0 + block.shape[0], j0 + block.shape[1]
+            result[i0:i1, j0:j1] = block
+            result[j0:j1, i0:i1] = block.T
+        return pd.DataFrame(result, index=self.symbols, columns=self.symbols)
+
+    def top_pairs(self, k=10, least=False):
+        """
+        相关系数最高(或最低)的 k 个标的对，不需要保存完整矩阵
+        :param least: True 时返回相关性最低(最负)的标的对
+        :return: DataFrame[symbol_a, symbol_b, correlation]
+        """
+        sign = -1.0 if least else 1.0
+        heap = []  # 最小堆，保留 sign * corr 最大的 k 个
+        for i0, j0, block in self.iter_blocks():
+            scores = sign * block
+            rows, cols = np.indices(block.shape)
+            valid = (rows + i0 < cols + j0) & ~np.isnan(scores)
+            scores, rows, cols = scores[valid], rows[valid], cols[valid]
+            if len(scores) > k:
+                keep = np.argpartition(scores, -k)[-k:]
+                scores, rows, cols = scores[keep], rows[keep], cols[keep]
+            for score, r, c in zip(scores, rows, cols):
+                item = (float(score), int(r + i0), int(c + j0))
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        pairs = sorted(heap, reverse=True)
+        return pd.DataFrame([(self.symbols[a], self.symbols[b], sign * score) for score, a, b in pairs],
+                            columns=['symbol_a', 'symbol_b', 'correlation'])
+
+
+def correlation_matrix(returns, block_size=512, min_periods=2):
+    """分块计算的相关系数矩阵，结果与 returns.corr(min_periods=min_periods) 一致"""
+    return CorrelationEngine(returns, block_size, min_periods).matrix()
+
+
+def top_correlated_pairs(returns, k=10, least=False, block_size=512):
+    """相关性最高/最低的 k 个标的对"""
+    return CorrelationEngine(returns, block_size).top_pairs(k, least=least)
+
+
+def rolling_correlation(returns, window, pairs, min_periods=None):
+    """
+    多个标的对的滚动相关系数，用累积和一次性向量化计算
+    :param returns: (T, N) 收益率 DataFrame
+    :param window: 窗口长度
+    :param pairs: [(symbol_a, symbol_b), ...]
+    :param min_periods: 窗口内有效样本少于该值时为 NaN，默认等于 window
+    :return: (T, len(pairs)) DataFrame，列名为 'a|b'
+    """
+    min_periods = window if min_periods is None else min_periods
+    a = returns[[p[0] for p in pairs]].to_numpy(dtype=np.float64)
+    b = returns[[p[1] for p in pairs]].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(a) | np.isnan(b))
+    # 先去均值，减小累积和相减时的精度损失
+    a = np.where(valid, a - np.nanmean(a, axis=0), 0.0)
+    b = np.where(valid, b - np.nanmean(b, axis=0), 0.0)
+
+    # 与 DataFrame.rolling 一致：开头不足 window 的部分窗口在满足 min_periods 时也给出结果
+    end = np.arange(1, len(returns) + 1)
+    start = np.maximum(end - window, 0)
+
+    def window_sum(x):
+        c = np.cumsum(np.vstack([np.zeros((1, x.shape[1])), x]), axis=0)
+        return c[end] - c[start]
+
+    count = window_sum(valid.astype(np.float64))
+    sum_a, sum_b = window_sum(a), window_sum(b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = window_sum(a * b) - sum_a * sum_b / count
+        var_a = window_sum(a * a) - sum_a ** 2 / count
+        var_b = window_sum(b * b) - sum_b ** 2 / count
+        result = np.clip(cov / np.sqrt(var_a * var_b), -1.0, 1.0)
+    result[count < min_periods] = np.nan
+    return pd.DataFrame(result, index=returns.index, columns=[f"{x}|{y}" for x, y in pairs])
+
+
+def main():
+    from tiger_clients import default_pool
+    from datetime import datetime, timedelta
+
+    quote_client = default_pool().quote_client()
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=252)
+    symbols = load_universe('US', limit=500)
+    closes = fetch_closes(quote_client, symbols, int(start_date.timestamp() * 1000),
+                          int(end_date.timestamp() * 1000))
+    returns = aligned_returns(closes)
+    engine = CorrelationEngine(returns)
+    print(f"{engine.n} 个标的, {len(returns)} 个交易日")
+    print("\n相关性最高的标的对:")
+    print(engine.top_pairs(20).to_string(index=False))
+    print("\n相关性最低的标的对:")
+    print(engine.top_pairs(20, least=True).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from indicators import EWCorrelation, OnlineCorrelation
+
+logger = logging.getLogger(__name__)
+
+
+class PairMonitor:
+    """
+    单个标的对的相关性状态：
+    fast 为短周期指数加权相关系数，baseline 为长周期指数加权(或累计 Welford)相关系数，
+    两者偏离超过阈值视为相关性破裂
+    """
+
+    def __init__(self, symbol_a, symbol_b, fast_span=30, slow_span=500):
+        self.symbol_a = symbol_a
+        self.symbol_b = symbol_b
+        self.fast = EWCorrelation(fast_span)
+        self.baseline = EWCorrelation(slow_span) if slow_span else OnlineCorrelation()
+        self.last_alert = None
+        self.broken = False
+
+    def update(self, return_a, return_b):
+        self.fast.update(return_a, return_b)
+        self.baseline.update(return_a, return_b)
+
+    @property
+    def samples(self):
+        return self.fast.count
+
+    @property
+    def deviation(self):
+        return self.fast.value - self.baseline.value
+
+    def snapshot(self):
+        return {
+            'pair': f"{self.symbol_a}|{self.symbol_b}",
+            'samples': self.samples,
+            'fast': self.fast.value,
+            'baseline': self.baseline.value,
+            'deviation': self.deviation,
+            'broken': self.broken,
+        }
+
+
+class CorrelationMonitor:
+    """
+    实时相关性监控
+    行情以 on_price 逐笔写入最新价，每次 sample() 用两次采样间的对数收益率更新各标的对，
+    每个标的对每次采样 O(1)，不保存历史价格
+    :param pairs: [(symbol_a, symbol_b), ...]
+    :param fast_span: 短周期等效样本数
+    :param slow_span: 基准周期等效样本数，为 None 时使用全部历史的累计相关系数
+    :param threshold: 短周期与基准相关系数之差超过该值时告警
+    :param min_samples: 少于该采样数时不告警，默认等于 fast_span
+    :param cooldown: 同一标的对两次告警的最小间隔(秒)
+    :param on_alert: 告警回调 on_alert(snapshot)，默认写 warning 日志
+    :param max_alerts: alerts 中保留的最近告警数
+    """
+
+    def __init__(self, pairs, fast_span=30, slow_span=500, threshold=0.3, min_samples=None, cooldown=300,
+                 on_alert=None, max_alerts=1000):
+        self.pairs = [PairMonitor(a, b, fast_span, slow_span) for a, b in pairs]
+        self.threshold = threshold
+        self.min_samples = fast_span if min_samples is None else min_samples
+        self.cooldown = cooldown
+        self.on_alert = on_alert or (lambda snapshot: logger.warning(
+            f"相关性偏离: {snapshot['pair']} 短期 {snapshot['fast']:.3f}, 基准 {snapshot['baseline']:.3f}"))
+        self.prices = {}  # 最新价
+        self.tick_times = {}  # 最新行情时间
+        self.updated = set()  # 上次采样后有新行情的标的
+        self.sampled = {}  # 上次采样时的价格
+        self.alerts = deque(maxlen=max_alerts)
+
+    @property
+    def symbols(self):
+        return sorted({s for pair in self.pairs for s in (pair.symbol_a, pair.symbol_b)})
+
+    def on_price(self, symbol, price, ts=None):
+        """
+        写入最新价
+        :param ts: 行情时间，与上次相同时视为没有新行情(如停牌标的轮询返回的旧报价)
+        """
+        # 停牌等情况下报价可能为 NaN，写入后会污染相关性状态
+        if price is None or not math.isfinite(price) or price <= 0:
+            return
+        self.prices[symbol] = float(price)
+        if ts is None or ts != self.tick_times.get(symbol):
+            self.tick_times[symbol] = ts
+            self.updated.add(symbol)
+
+    def sample(self, ts=None):
+        """
+        以当前最新价做一次采样，更新所有标的对并检查告警
+        上次采样后没有新行情的标的(停牌或行情中断)不计算收益率，所在标的对本次不更新，
+        避免 0 收益率把短周期相关系数拉向 0 造成误报
+        :param ts: 采样时间(秒)，默认当前时间
+        :return: 本次触发的告警列表
+        """
+        ts = time.time() if ts is None else ts
+        returns = {symbol: math.log(self.prices[symbol] / self.sampled[symbol])
+                   for symbol in self.updated if symbol in self.sampled}
+        self.sampled.update((symbol, self.prices[symbol]) for symbol in self.updated)
+        self.updated.clear()
+
+        alerts = []
+        for pair in self.pairs:
+            if pair.symbol_a not in returns or pair.symbol_b not in returns:
+                continue
+            pair.update(returns[pair.symbol_a], returns[pair.symbol_b])
+            deviation = pair.deviation
+            pair.broken = pair.samples >= self.min_samples and abs(deviation) > self.threshold
+            if pair.broken and (pair.last_alert is None or ts - pair.last_alert >= self.cooldown):
+                pair.last_alert = ts
+                snapshot = dict(pair.snapshot(), time=ts)
+                alerts.append(snapshot)
+                self.on_alert(snapshot)
+        self.alerts.extend(alerts)
+        return alerts
+
+    def status(self):
+        """各标的对当前状态"""
+        return [pair.snapshot() for pair in self.pairs]
+
+    def run_tiger(self, quote_client, symbols_by_market, interval=60, batch_size=50):
+        """
+        轮询老虎行情，每个周期采样一次（阻塞运行）
+        :param symbols_by_market: {market: [symbol, ...]}，标的分属不同市场时分别请求
+        """
+        from metrics import track
+
+        logger.info(f"开始相关性监控: {[p.snapshot()['pair'] for p in self.pairs]}")
+        try:
+            while True:
+                for market, symbols in symbols_by_market.items():
+                    for i in range(0, len(symbols), batch_size):
+                        try:
+                            with track('tiger', 'get_stock_briefs'):
+                                quote = quote_client.get_stock_briefs(symbols[i:i + batch_size], market=market)
+                        except Exception as e:
+                            logger.error(f"获取行情失败: {e}")
+                            continue
+                        times = quote['latest_time'] if 'latest_time' in quote else [None] * len(quote)
+                        for symbol, last, latest_time in zip(quote['symbol'], quote['last'], times):
+                            self.on_price(symbol, float(last), latest_time)
+                self.sample()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("相关性监控已停止")
+
+    async def run_okx(self, inst_ids=None, sample_interval=1.0, url=None):
+        """
+        订阅 OKX tickers 频道，每 sample_interval 秒采样一次
+        :param inst_ids: 交易对列表，默认为所有标的对涉及的交易对
+        """
+        from okx_ws import OKXPublicStream, OKX_WS_PUBLIC_URL
+
+        def on_message(arg, data):
+            for tick in data:
+                self.on_price(tick.get('instId') or arg.get('instId'), float(tick.get('last') or 0), tick.get('ts'))
+
+        channels = [{'channel': 'tickers', 'instId': inst_id} for inst_id in (inst_ids or self.symbols)]
+        stream = OKXPublicStream(channels, on_message, url=url or OKX_WS_PUBLIC_URL)
+
+        async def sampler():
+            while True:
+                await asyncio.sleep(sample_interval)
+                self.sample()
+
+        task = asyncio.ensure_future(sampler())
+        try:
+            await stream.run()
+        finally:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    from tiger_clients import default_pool
+    from tigeropen.common.consts import Market
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    monitor = CorrelationMonitor([('JK8.SI', '000001.SH')], fast_span=30, slow_span=1000, threshold=0.4)
+    monitor.run_tiger(default_pool().quote_client(),
+                      {Market.SG: ['JK8.SI'], Market.CN: ['000001.SH']}, interval=60)
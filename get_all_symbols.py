@@ -1,29 +1,43 @@
-from tigeropen.quote.quote_client import QuoteClient
-from tigeropen.common.consts import Language, Market
-from tigeropen.tiger_open_config import TigerOpenClientConfig
-from tigeropen.common.util.signature_utils import read_private_key
-import os
+from tigeropen.common.consts import Market
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 from datetime import datetime
+from symbol_master import SymbolMaster
+from rate_limit import TokenBucket
+from tiger_clients import default_pool, LIVE_ACCOUNT
+from metrics import track
 
 def get_client_config():
     """
     https://quant.itigerup.com/#developer 开发者信息获取
     """
-    client_config = TigerOpenClientConfig()
-    # 使用绝对路径读取私钥文件
-    current_dir = os.path.dirname(os.path.abspath("./tiger-test"))
-    private_key_path = os.path.join(current_dir, 'keys', 'private.pem')
-    client_config.private_key = read_private_key(private_key_path)
-    client_config.tiger_id = '20153826'
-    client_config.account = '498843'
-    client_config.language = Language.zh_CN
-    return client_config
+    return default_pool().config(LIVE_ACCOUNT)
 
-def get_all_symbols():
+def fetch_market_symbols(quote_client, market, limiter):
+    """
+    获取单个市场的证券列表
+    :return: (market, symbols, 耗时秒数, 限流等待秒数)
+    """
+    waited = limiter.acquire()
+    start = time.perf_counter()
+    with track('tiger', 'get_symbol_names'):
+        symbols = quote_client.get_symbol_names(market=market.value)
+    return market, symbols, time.perf_counter() - start, waited
+
+def get_all_symbols(export_csv=False, max_workers=4, requests_per_minute=10):
+    """
+    并发刷新各市场的证券代码主表，只写入新增、退市和更名的证券
+    各市场结果到达后立即写入，慢市场不会阻塞其他市场
+    :param export_csv: 是否同时导出带时间戳的 CSV 文件
+    :param max_workers: 并发请求数
+    :param requests_per_minute: 每分钟最多请求次数（老虎低频接口限制）
+    :return: 各市场耗时统计 {market: {'fetch': 秒, 'wait': 秒, 'apply': 秒, 'count': 数量}}
+    """
     # 初始化客户端
-    client_config = get_client_config()
-    quote_client = QuoteClient(client_config)
+    quote_client = default_pool().quote_client(get_client_config())
+    master = SymbolMaster()
+    limiter = TokenBucket(requests_per_minute, period=60, capacity=max_workers)
     
     # 获取所有市场列表
     markets = [
@@ -33,62 +47,61 @@ def get_all_symbols():
         Market.SG,      # 新加坡
     ]
     
-    all_symbols = []
-    # symbol_names = quote_client.get_symbol_names(market=Market.ALL)
-    # print(symbol_names)
-    # 遍历每个市场获取证券信息
-    for market in markets:
-        try:
-            print(f"正在获取 {market.value} 市场的证券信息...")
-            # 获取该市场的所有证券信息
-            symbols = quote_client.get_symbol_names(market=market.value)
+    csv_file = None
+    if export_csv:
+        # 生成文件名（包含时间戳）
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        csv_file = f'tiger_symbols_{timestamp}.csv'
+        pd.DataFrame(columns=['market', 'symbol', 'name']).to_csv(csv_file, index=False, encoding='utf-8-sig')
+    
+    timings = {}
+    total_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        print(f"正在并发获取 {', '.join(m.value for m in markets)} 市场的证券信息...")
+        futures = {executor.submit(fetch_market_symbols, quote_client, market, limiter): market
+                   for market in markets}
+        for future in as_completed(futures):
+            market = futures[future]
+            try:
+                _, symbols, fetch_time, wait_time = future.result()
+            except Exception as e:
+                print(f"获取 {market.value} 市场信息时出错: {str(e)}")
+                continue
             
             if not symbols:
                 print(f"未获取到 {market.value} 市场的证券信息")
                 continue
-                
-            # 将每个证券的信息添加到列表中
-            for symbol in symbols:
-                try:
-                    symbol_info = {
-                        'market': market.value,
-                        'symbol': symbol[0],
-                        'name': symbol[1],
-                        # 'currency': symbol.currency,
-                        # 'exchange': symbol.exchange,
-                        # 'type': symbol.type,
-                        # 'status': symbol.status,
-                        # 'description': symbol.description
-                    }
-                    all_symbols.append(symbol_info)
-                except AttributeError as e:
-                    print(f"处理证券信息时出错: {str(e)}")
-                    continue
-                
-        except Exception as e:
-            print(f"获取 {market.value} 市场信息时出错: {str(e)}")
-            continue
+            
+            # 只计算并应用与主表的差异
+            apply_start = time.perf_counter()
+            rows = [(symbol[0], symbol[1]) for symbol in symbols]
+            changes = master.refresh(market, rows)
+            if csv_file:
+                pd.DataFrame([(market.value, s, n) for s, n in rows]).to_csv(
+                    csv_file, mode='a', header=False, index=False, encoding='utf-8')
+            apply_time = time.perf_counter() - apply_start
+            
+            timings[market.value] = {'fetch': fetch_time, 'wait': wait_time, 'apply': apply_time,
+                                     'count': len(symbols)}
+            print(f"{market.value} 市场: 共 {len(symbols)} 个, 新增 {len(changes['added'])}, "
+                  f"退市 {len(changes['removed'])}, 更名 {len(changes['renamed'])}, "
+                  f"请求耗时 {fetch_time:.2f}s, 限流等待 {wait_time:.2f}s, 写入耗时 {apply_time:.2f}s")
     
-    if not all_symbols:
+    if not len(master):
         print("未获取到任何证券信息")
-        return
-        
-    # 转换为DataFrame
-    df = pd.DataFrame(all_symbols)
+        return timings
     
-    # 生成文件名（包含时间戳）
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'tiger_symbols_{timestamp}.csv'
-    
-    # 保存到CSV文件
-    df.to_csv(filename, index=False, encoding='utf-8-sig')
-    print(f"\n证券信息已保存到文件: {filename}")
-    print(f"总共获取到 {len(df)} 个证券信息")
+    print(f"\n证券主表已保存到文件: {master.path}")
+    print(f"总共 {len(master)} 个证券信息, 总耗时 {time.perf_counter() - total_start:.2f}s")
     
     # 打印每个市场的证券数量统计
-    market_stats = df.groupby('market').size()
     print("\n各市场证券数量统计:")
-    print(market_stats)
+    for market in master.list_markets():
+        print(f"{market}: {len(master.list(market))}")
+    
+    if csv_file:
+        print(f"\n证券信息已导出到文件: {csv_file}")
+    return timings
 
 if __name__ == "__main__":
-    get_all_symbols() 
\ No newline at end of file
+    get_all_symbols()
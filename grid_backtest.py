@@ -0,0 +1,189 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+
+def _to_price_series(prices):
+    """
+    将输入的行情统一转换为价格序列
+    :param prices: 价格数组、Series，或包含 close/Close 列的K线 DataFrame
+    :return: pandas.Series
+    """
+    if isinstance(prices, pd.DataFrame):
+        for column in ('close', 'Close', 'last', 'price'):
+            if column in prices.columns:
+                return prices[column].astype(float)
+        raise ValueError("K线数据中缺少收盘价列 (close/Close/last/price)")
+    if isinstance(prices, pd.Series):
+        return prices.astype(float)
+    return pd.Series(np.asarray(prices, dtype=float))
+
+
+def grid_levels(lower_price, upper_price, grid_num):
+    """与 GridTrading 相同的网格价格计算方式"""
+    return np.linspace(lower_price, upper_price, grid_num + 1)
+
+
+def grid_crossings(grid_index, grid_num):
+    """
+    向量化计算网格穿越与持仓状态，规则与 GridTrading.check_and_trade 一致：
+    价格向下穿越第 j 条网格线时买入一格（若该格未持仓），
+    价格向上穿越第 j+1 条网格线时卖出第 j 格的持仓。
+    :param grid_index: 每个价格对应的 np.searchsorted(grid_prices, price) 结果
+    :param grid_num: 网格数量
+    :return: (buys, sells, held) 三个形状为 (len(grid_index), grid_num) 的布尔数组
+    """
+    grid_index = np.asarray(grid_index)
+    prev_index = np.concatenate((grid_index[:1], grid_index[:-1]))
+    lines = np.arange(grid_num)[None, :]
+    cur = grid_index[:, None]
+    prev = prev_index[:, None]
+
+    buy_event = (prev > lines) & (cur <= lines)
+    sell_event = (prev <= lines + 1) & (cur > lines + 1)
+
+    # 持仓状态由每格最近一次买入/卖出事件决定，用前向填充代替逐笔循环
+    event = np.where(buy_event, 1, np.where(sell_event, -1, 0)).astype(np.int8)
+    rows = np.arange(len(grid_index))[:, None]
+    last_event_row = np.maximum.accumulate(np.where(event != 0, rows, -1), axis=0)
+    held = (last_event_row >= 0) & (
+        np.take_along_axis(event, np.maximum(last_event_row, 0), axis=0) == 1
+    )
+
+    held_before = np.vstack((np.zeros((1, grid_num), dtype=bool), held[:-1]))
+    buys = buy_event & ~held_before
+    sells = sell_event & held_before
+    return buys, sells, held
+
+
+def backtest_grid(prices, lower_price, upper_price, grid_num, quantity_per_grid, initial_cash=0.0):
+    """
+    对一段历史行情回放网格交易规则
+    :param prices: 价格数组、Series 或K线 DataFrame（按时间排序）
+    :param lower_price: 网格下限价格
+    :param upper_price: 网格上限价格
+    :param grid_num: 网格数量
+    :param quantity_per_grid: 每个网格的交易数量
+    :param initial_cash: 初始资金
+    :return: dict，包含 fills(成交明细)、positions(每格持仓随时间变化)、pnl(资金曲线) 和 summary
+    """
+    series = _to_price_series(prices)
+    price = series.to_numpy()
+    grid_prices = grid_levels(lower_price, upper_price, grid_num)
+    grid_index = np.searchsorted(grid_prices, price)
+
+    buys, sells, held = grid_crossings(grid_index, grid_num)
+
+    buy_rows, buy_grids = np.nonzero(buys)
+    sell_rows, sell_grids = np.nonzero(sells)
+    fills = pd.DataFrame({
+        'time': np.concatenate((series.index[buy_rows], series.index[sell_rows])),
+        'price': np.concatenate((price[buy_rows], price[sell_rows])),
+        'quantity': quantity_per_grid,
+        'side': ['BUY'] * len(buy_rows) + ['SELL'] * len(sell_rows),
+        'grid_index': np.concatenate((buy_grids, sell_grids)),
+        '_row': np.concatenate((buy_rows, sell_rows)),
+    })
+    fills = fills.sort_values(['_row', 'side'], kind='stable').drop(columns='_row').reset_index(drop=True)
+
+    net_sells = sells.sum(axis=1) - buys.sum(axis=1)
+    cash = initial_cash + np.cumsum(net_sells * price * quantity_per_grid)
+    inventory = held.sum(axis=1) * quantity_per_grid
+    equity = cash + inventory * price
+
+    pnl = pd.DataFrame({
+        'price': price,
+        'cash': cash,
+        'inventory': inventory,
+        'equity': equity,
+    }, index=series.index)
+    positions = pd.DataFrame(held, index=series.index, columns=pd.RangeIndex(grid_num, name='grid_index'))
+
+    summary = {
+        'lower_price': lower_price,
+        'upper_price': upper_price,
+        'grid_num': grid_num,
+        'quantity_per_grid': quantity_per_grid,
+        'buys': int(buys.sum()),
+        'sells': int(sells.sum()),
+        'final_inventory': float(inventory[-1]) if len(inventory) else 0.0,
+        'pnl': float(equity[-1] - initial_cash) if len(equity) else 0.0,
+        'max_drawdown': float(np.max(np.maximum.accumulate(equity) - equity)) if len(equity) else 0.0,
+    }
+    return {'fills': fills, 'positions': positions, 'pnl': pnl, 'summary': summary}
+
+
+def _unit_grid_result(price, lower_price, upper_price, grid_num):
+    """计算单位数量(每格1股)下的回测指标，只在网格序号发生变化的位置求解"""
+    grid_prices = grid_levels(lower_price, upper_price, grid_num)
+    grid_index = np.searchsorted(grid_prices, price)
+
+    # 网格序号不变时不会产生任何成交，压缩后再做二维计算
+    is_change = np.empty(len(grid_index), dtype=bool)
+    is_change[0] = True
+    np.not_equal(grid_index[1:], grid_index[:-1], out=is_change[1:])
+    rows = np.flatnonzero(is_change)
+    buys, sells, held = grid_crossings(grid_index[rows], grid_num)
+
+    trade_cash = (sells.sum(axis=1) - buys.sum(axis=1)) * price[rows]
+    segment = np.cumsum(is_change) - 1
+    cash = np.cumsum(trade_cash)[segment]
+    inventory = held.sum(axis=1)[segment]
+    equity = cash + inventory * price
+
+    return (
+        int(buys.sum()),
+        int(sells.sum()),
+        float(inventory[-1]),
+        float(equity[-1]),
+        float(np.max(np.maximum.accumulate(equity) - equity)),
+    )
+
+
+def sweep_grid_params(prices, lower_prices, upper_prices, grid_nums, quantities):
+    """
+    批量回测网格参数组合
+    网格成交只与 (lower_price, upper_price, grid_num) 有关，每格数量只是线性缩放，
+    因此每组价格参数只回放一次，再按数量展开
+    :param prices: 价格数组、Series 或K线 DataFrame
+    :param lower_prices: 网格下限价格候选值
+    :param upper_prices: 网格上限价格候选值
+    :param grid_nums: 网格数量候选值
+    :param quantities: 每格交易数量候选值
+    :return: 每个参数组合一行的 DataFrame，按 pnl 从高到低排序
+    """
+    price = _to_price_series(prices).to_numpy()
+    if len(price) == 0:
+        raise ValueError("回测行情为空")
+    quantities = np.asarray(list(quantities), dtype=float)
+
+    records = []
+    for lower_price, upper_price, grid_num in itertools.product(lower_prices, upper_prices, grid_nums):
+        if lower_price >= upper_price or grid_num < 1:
+            continue
+        buys, sells, inventory, equity, drawdown = _unit_grid_result(price, lower_price, upper_price, grid_num)
+        for quantity in quantities:
+            records.append((
+                lower_price, upper_price, grid_num, quantity,
+                buys, sells, inventory * quantity, equity * quantity, drawdown * quantity,
+            ))
+
+    result = pd.DataFrame(records, columns=[
+        'lower_price', 'upper_price', 'grid_num', 'quantity_per_grid',
+        'buys', 'sells', 'final_inventory', 'pnl', 'max_drawdown',
+    ])
+    return result.sort_values('pnl', ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # 示例：用随机游走行情扫描网格参数
+    rng = np.random.default_rng(0)
+    prices = 175 + np.cumsum(rng.normal(0, 0.5, 100_000))
+    result = sweep_grid_params(
+        prices,
+        lower_prices=np.arange(140, 170, 2),
+        upper_prices=np.arange(180, 210, 2),
+        grid_nums=[5, 10, 20, 40],
+        quantities=[100, 200, 500],
+    )
+    print(result.head(20))
@@ -0,0 +1,177 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from tigeropen.common.consts import Market
+from grid_trading import GridTrading, get_client_config, create_clients
+from metrics import track, observe_tick_to_order
+
+logger = logging.getLogger(__name__)
+
+
+def searchsorted_rows(grid_prices, prices):
+    """
+    逐行 searchsorted：每个价格在对应行网格线中的位置，结果与 np.searchsorted(row, price) 一致
+    :param grid_prices: (N, K) 每行升序的网格价格，不足 K 条的行以 +inf 填充
+    :param prices: (N,) 价格
+    :return: (N,) 网格序号
+    """
+    return (grid_prices < prices[:, None]).sum(axis=1)
+
+
+class GridEngine:
+    """
+    在一个进程内运行多个网格，共用一组行情/交易客户端
+    每个周期按 batch_size 分批调用 get_stock_briefs 获取全部标的价格，
+    再对 (网格数, 网格线数) 的价格矩阵做一次向量化定位，只对发生穿越的网格逐个下单；
+    交易规则与 GridTrading.check_and_trade 相同
+    """
+
+    def __init__(self, market=Market.HK, batch_size=50, quote_client=None, trade_client=None, journal=None):
+        """
+        :param market: 市场类型，所有网格必须属于同一市场
+        :param batch_size: 单次 get_stock_briefs 请求的标的数量上限
+        :param quote_client: 行情客户端，默认按本地配置创建
+        :param trade_client: 交易客户端，默认按本地配置创建
+        :param journal: 所有网格共用的交易日志，默认使用进程内共享的日志
+        """
+        self.market = market
+        self.batch_size = batch_size
+        if quote_client is None or trade_client is None:
+            # 所有网格共用一次配置读取和行情权限申请
+            quote_client, trade_client = create_clients(get_client_config(), market)
+        self.quote_client = quote_client
+        self.trade_client = trade_client
+        self.journal = journal
+        self.grids = []
+        self._build()
+
+    def add_grid(self, symbol, upper_price, lower_price, grid_num, quantity_per_grid):
+        """
+        添加一个网格，参数同 GridTrading
+        :return: 对应的 GridTrading 实例，持仓和交易记录在实例上维护
+        """
+        grid = GridTrading(symbol, upper_price, lower_price, grid_num, quantity_per_grid, market=self.market,
+                           quote_client=self.quote_client, trade_client=self.trade_client, journal=self.journal)
+        self.grids.append(grid)
+        self._build()
+        return grid
+
+    def _build(self):
+        """根据当前网格重建价格矩阵和状态数组"""
+        n = len(self.grids)
+        width = max((grid.grid_num + 1 for grid in self.grids), default=1)
+        self.grid_prices = np.full((n, width), np.inf)
+        self.holdings = np.zeros((n, width), dtype=bool)
+        for row, grid in enumerate(self.grids):
+            self.grid_prices[row, :grid.grid_num + 1] = grid.grid_prices
+            self.holdings[row, list(grid.positions)] = True
+        self.grid_nums = np.array([grid.grid_num for grid in self.grids], dtype=np.int64)
+        self.last_index = np.array([-1 if grid.last_grid_index is None else grid.last_grid_index
+                                    for grid in self.grids], dtype=np.int64)
+        self.full_symbols = [self._full_symbol(grid.symbol) for grid in self.grids]
+        self._columns = np.arange(width)
+
+    def _full_symbol(self, symbol):
+        # 港股代码需要添加市场前缀
+        return f"{symbol}.HK" if self.market == Market.HK else symbol
+
+    def fetch_prices(self):
+        """
+        分批获取所有网格标的的最新价
+        :return: (N,) 价格数组，获取失败的标的为 nan
+        """
+        symbols = list(dict.fromkeys(self.full_symbols))
+        last = {}
+        for i in range(0, len(symbols), self.batch_size):
+            chunk = symbols[i:i + self.batch_size]
+            try:
+                with track('tiger', 'get_stock_briefs'):
+                    quote = self.quote_client.get_stock_briefs(chunk, market=self.market)
+            except Exception as e:
+                logger.error(f"获取价格失败 ({len(chunk)} 个标的): {e}")
+                continue
+            if quote is not None and not quote.empty:
+                last.update(zip(quote['symbol'], pd.to_numeric(quote['last'], errors='coerce')))
+        return np.array([last.get(symbol, np.nan) for symbol in self.full_symbols], dtype=float)
+
+    def check_and_trade(self, prices=None):
+        """
+        检查所有网格并执行交易
+        :param prices: 外部提供的 (N,) 价格数组，默认调用 fetch_prices
+        :return: 本周期下单数量
+        """
+        if not self.grids:
+            return 0
+        if prices is None:
+            prices = self.fetch_prices()
+        tick_time = time.perf_counter()
+        valid = ~np.isnan(prices)
+        index = np.where(valid, searchsorted_rows(self.grid_prices, np.where(valid, prices, 0.0)), self.last_index)
+        last = self.last_index
+        started = valid & (last >= 0)
+        self.last_index = index
+
+        for row in np.flatnonzero(valid):
+            self.grids[row].last_grid_index = int(index[row])
+            self.grids[row].indicators.update(prices[row])
+
+        # 与 GridTrading.check_and_trade 相同的穿越规则，按行展开为掩码
+        cols = self._columns[None, :]
+        buy_stop = np.minimum(last, self.grid_nums)[:, None]
+        sell_start = np.maximum(last - 1, 0)[:, None]
+        sell_stop = np.minimum(index - 1, self.grid_nums)[:, None]
+        buys = started[:, None] & (cols >= index[:, None]) & (cols < buy_stop) & ~self.holdings
+        sells = started[:, None] & (cols >= sell_start) & (cols < sell_stop) & self.holdings
+
+        placed = 0
+        for row, col in zip(*np.nonzero(buys)):
+            placed += self._trade(row, col, prices[row], 'BUY', tick_time)
+        for row, col in zip(*np.nonzero(sells)):
+            placed += self._trade(row, col, prices[row], 'SELL', tick_time)
+        return placed
+
+    def _trade(self, row, col, price, side, tick_time):
+        grid = self.grids[row]
+        order = grid.place_order(float(price), grid.quantity_per_grid, side)
+        if not order:
+            return 0
+        observe_tick_to_order('grid_engine', tick_time)
+        col = int(col)
+        if side == 'BUY':
+            self.holdings[row, col] = True
+            grid.positions[col] = True
+        else:
+            self.holdings[row, col] = False
+            grid.positions.pop(col, None)
+        logger.info(f"{grid.symbol} {'买入' if side == 'BUY' else '卖出'}信号: 网格 {col}, 价格 {price}")
+        return 1
+
+    def run(self, interval=60):
+        """运行所有网格"""
+        logger.info(f"开始运行多标的网格交易 - {len(self.grids)} 个网格")
+        try:
+            while True:
+                start = time.perf_counter()
+                placed = self.check_and_trade()
+                logger.info(f"本周期下单 {placed} 笔，耗时 {time.perf_counter() - start:.3f} 秒")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("策略已停止")
+            self.print_trade_history()
+        except Exception as e:
+            logger.error(f"策略运行出错: {e}")
+            self.print_trade_history()
+
+    def print_trade_history(self):
+        for grid in self.grids:
+            if grid.trade_history:
+                logger.info(f"\n{grid.symbol}:")
+                grid.print_trade_history()
+
+
+if __name__ == "__main__":
+    engine = GridEngine(market=Market.HK)
+    engine.add_grid('03033', upper_price=200, lower_price=150, grid_num=10, quantity_per_grid=100)
+    engine.add_grid('02800', upper_price=25, lower_price=18, grid_num=10, quantity_per_grid=500)
+    engine.run(interval=60)
@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state')
+
+
+def state_path(name, state_dir=DEFAULT_STATE_DIR):
+    """策略快照文件路径，如 state_path('okx-grid-ETH-USDT')"""
+    return os.path.join(state_dir, f"{name}.json")
+
+
+def save_snapshot(path, state):
+    """
+    原子写入策略快照：先写临时文件再替换，进程中途退出也不会留下半个文件
+    :param state: 可 JSON 序列化的字典
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(state, saved_at=time.time()), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """
+    读取策略快照
+    :return: 字典，文件不存在或损坏时返回 None
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"读取快照失败 {path}: {e}")
+        return None
+
+
+def match_orders(desired, live, price_tolerance=1e-4, size_tolerance=1e-3):
+    """
+    将期望挂单与交易所挂单配对
+    优先按 clOrdId / ordId 匹配，其余按方向、价格和数量在容差内匹配(交易所会按价格精度和下单精度取整)
+    :param desired: 期望的订单参数列表 (side/px/sz，可带 clOrdId/ordId)
+    :param live: 交易所返回的未完成订单
+    :param price_tolerance: 价格相对容差
+    :param size_tolerance: 数量相对容差
+    :return: (matched [(desired, live)], 未匹配的 desired, 未匹配的 live)
+    """
+    remaining = list(live)
+    by_client_id = {order.get('clOrdId'): order for order in remaining if order.get('clOrdId')}
+    by_ord_id = {order.get('ordId'): order for order in remaining if order.get('ordId')}
+    matched, unmatched = [], []
+    used = set()
+
+    def close(a, b, tolerance):
+        a, b = float(a or 0), float(b or 0)
+        return abs(a - b) <= tolerance * max(abs(a), abs(b), 1e-12)
+
+    for order in desired:
+        found = by_client_id.get(order.get('clOrdId')) or by_ord_id.get(order.get('ordId'))
+        if found is None:
+            found = next((o for o in remaining if id(o) not in used and o.get('side') == order.get('side')
+                          and close(o.get('px'), order.get('px'), price_tolerance)
+                          and close(o.get('sz'), order.get('sz'), size_tolerance)), None)
+        if found is not None and id(found) not in used:
+            used.add(id(found))
+            matched.append((order, found))
+        else:
+            unmatched.append(order)
+    return matched, unmatched, [order for order in remaining if id(order) not in used]
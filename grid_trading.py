@@ -1,14 +1,15 @@
 from tigeropen.common.consts import Language, Market, BarPeriod, QuoteRight
-from tigeropen.tiger_open_config import TigerOpenClientConfig
-from tigeropen.common.util.signature_utils import read_private_key
-from tigeropen.quote.quote_client import QuoteClient
-from tigeropen.trade.trade_client import TradeClient
-import os
 import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
+from collections import deque
+from indicators import IndicatorSet
+from metrics import track, observe_tick_to_order
+from trade_journal import default_journal, new_run_id
+from grid_state import save_snapshot, load_snapshot, state_path as default_state_path
+from tiger_clients import default_pool, PAPER_ACCOUNT
 
 # 配置日志
 logging.basicConfig(
@@ -17,8 +18,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def get_client_config():
+    """获取API配置，私钥在进程内只读取一次"""
+    try:
+        return default_pool().config(PAPER_ACCOUNT)
+    except Exception as e:
+        logger.error(f"初始化配置失败: {e}")
+        raise
+
+def create_clients(client_config, market):
+    """
+    获取进程内共享的行情和交易客户端，行情权限每个市场只申请一次
+    :return: (quote_client, trade_client)
+    """
+    return default_pool().clients(market, client_config)
+
 class GridTrading:
-    def __init__(self, symbol, upper_price, lower_price, grid_num, quantity_per_grid, market=Market.HK):
+    def __init__(self, symbol, upper_price, lower_price, grid_num, quantity_per_grid, market=Market.HK,
+                 quote_client=None, trade_client=None, journal=None, state_path=None, quote_cache=None):
         """
         初始化网格交易策略
         :param symbol: 交易标的代码
@@ -27,6 +44,12 @@ class GridTrading:
         :param grid_num: 网格数量
         :param quantity_per_grid: 每个网格的交易数量
         :param market: 市场类型，默认港股
+        :param quote_client: 行情客户端，默认按本地配置创建 QuoteClient
+        :param trade_client: 交易客户端，默认按本地配置创建 TradeClient；
+                             两者都传入时(如 SimulatedExchange.tiger_clients())跳过配置和行情权限申请
+        :param journal: 交易日志 TradeJournal，默认使用进程内共享的日志
+        :param state_path: 网格持仓快照文件，重启时恢复各网格持仓；为 True 时使用 state/grid-<symbol>.json
+        :param quote_cache: QuoteCache，多个策略共用时同一标的的行情请求会合并，如 quote_cache.default_quote_cache()
         """
         self.symbol = symbol
         self.market = market
@@ -36,53 +59,92 @@ class GridTrading:
         self.quantity_per_grid = quantity_per_grid
         self.grid_prices = np.linspace(lower_price, upper_price, grid_num + 1)
         self.positions = {}  # 记录每个网格的持仓状态
-        self.trade_history = []  # 记录交易历史
+        self.last_grid_index = None  # 上一次价格所在的网格序号
+        self.journal = journal if journal is not None else default_journal()  # 完整交易记录写入日志
+        self.run_id = new_run_id(f"grid-{symbol}")
+        self.trade_history = deque(maxlen=1000)  # 最近的交易记录
+        self.indicators = IndicatorSet()  # 逐笔更新的流式指标，可通过 indicators.add 注册
+        self.state_path = default_state_path(f"grid-{symbol}") if state_path is True else state_path
+        self.quote_cache = quote_cache
+        self.load_state()
         
-        # 初始化API客户端
-        self.client_config = self._get_client_config()
-        self.quote_client = QuoteClient(self.client_config)
-        self.trade_client = TradeClient(self.client_config)
+        if quote_client is not None and trade_client is not None:
+            self.quote_client = quote_client
+            self.trade_client = trade_client
+            return
         
-        # 获取行情权限
-        try:
-            # 指定市场类型获取权限
-            permissions = self.quote_client.grab_quote_permission(market=self.market)
-            logger.info(f"获取行情权限成功: {permissions}")
-            
-            # 验证权限
-            if not permissions or self.market not in permissions:
-                raise ValueError(f"未获得{self.market}市场权限")
-                
-        except Exception as e:
-            logger.error(f"获取行情权限失败: {e}")
-            raise
+        # 初始化API客户端并获取行情权限
+        self.client_config = get_client_config()
+        self.quote_client, self.trade_client = create_clients(self.client_config, self.market)
         
     def _get_client_config(self):
         """获取API配置"""
+        return get_client_config()
+    
+    def _grid_key(self):
+        return [self.symbol, self.upper_price, self.lower_price, self.grid_num, self.quantity_per_grid]
+    
+    def save_state(self):
+        """保存各网格持仓"""
+        if not self.state_path:
+            return
+        save_snapshot(self.state_path, {
+            'grid': self._grid_key(),
+            'positions': sorted(self.positions),
+            'run_id': self.run_id,
+        })
+    
+    def load_state(self):
+        """
+        从快照恢复网格持仓，网格参数与快照不一致时忽略快照
+        上次价格所在网格不恢复，停机期间的价格穿越不补做交易
+        :return: 是否恢复成功
+        """
+        snapshot = load_snapshot(self.state_path)
+        if not snapshot:
+            return False
+        if snapshot.get('grid') != self._grid_key():
+            logger.warning(f"网格参数已变化，忽略快照 {self.state_path}")
+            return False
+        self.positions = {int(i): True for i in snapshot.get('positions') or []}
+        logger.info(f"从快照恢复网格持仓: {sorted(self.positions)}")
+        return True
+    
+    def reconcile_state(self):
+        """
+        用账户实际持仓校验快照中的网格持仓：实际持仓不足时从最高的网格开始移除，
+        只需一次持仓查询；实际持仓多于网格持仓时不做处理(可能来自网格外的交易)
+        :return: 被移除的网格序号
+        """
+        full_symbol = f"{self.symbol}.HK" if self.market == Market.HK else self.symbol
         try:
-            client_config = TigerOpenClientConfig()
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            private_key_path = os.path.join(current_dir, 'keys', 'private.pem')
-            
-            if not os.path.exists(private_key_path):
-                raise FileNotFoundError(f"私钥文件不存在: {private_key_path}")
-                
-            client_config.private_key = read_private_key(private_key_path)
-            client_config.tiger_id = '20153826'  # 替换为你的模拟账号ID
-            client_config.account = '20240803144534965'  # 替换为你的模拟账号
-            client_config.language = Language.zh_CN
-            return client_config
+            with track('tiger', 'get_positions'):
+                positions = self.trade_client.get_positions(market=self.market, symbol=full_symbol)
         except Exception as e:
-            logger.error(f"初始化配置失败: {e}")
-            raise
+            logger.error(f"获取持仓失败，跳过对账: {e}")
+            return []
+        quantity = sum(position.quantity for position in positions or []
+                       if position.contract.symbol in (self.symbol, full_symbol))
+        held = sorted(self.positions)
+        excess = len(held) - int(quantity // self.quantity_per_grid)
+        removed = held[len(held) - excess:] if excess > 0 else []
+        for i in removed:
+            del self.positions[i]
+        if removed:
+            logger.warning(f"账户持仓 {quantity} 少于网格持仓 {len(held)} 格，移除网格 {removed}")
+            self.save_state()
+        return removed
     
     def get_current_price(self):
         """获取当前价格"""
         try:
             # 港股代码需要添加市场前缀
             full_symbol = f"{self.symbol}.HK" if self.market == Market.HK else self.symbol
-            # 添加市场参数
-            quote = self.quote_client.get_stock_briefs([full_symbol], market=self.market)
+            if self.quote_cache is None:
+                quote = self._fetch_brief(full_symbol)
+            else:
+                quote = self.quote_cache.get(f"tiger:{getattr(self.market, 'value', self.market)}:{full_symbol}",
+                                             lambda: self._fetch_brief(full_symbol))
             
             if quote.empty:
                 raise ValueError(f"无法获取股票 {full_symbol} 的行情数据")
@@ -94,20 +156,26 @@ class GridTrading:
             logger.error(f"获取价格失败: {e}")
             return None
     
+    def _fetch_brief(self, full_symbol):
+        # 添加市场参数
+        with track('tiger', 'get_stock_briefs'):
+            return self.quote_client.get_stock_briefs([full_symbol], market=self.market)
+    
     def place_order(self, price, quantity, side):
         """下单函数"""
         try:
             # 港股代码需要添加市场前缀
             full_symbol = f"{self.symbol}.HK" if self.market == Market.HK else self.symbol
             
-            order = self.trade_client.place_order(
-                symbol=full_symbol,
-                quantity=quantity,
-                side=side,
-                order_type='LIMIT',
-                limit_price=price,
-                market=self.market
-            )
+            with track('tiger', 'place_order'):
+                order = self.trade_client.place_order(
+                    symbol=full_symbol,
+                    quantity=quantity,
+                    side=side,
+                    order_type='LIMIT',
+                    limit_price=price,
+                    market=self.market
+                )
             
             trade_record = {
                 'time': datetime.now(),
@@ -119,6 +187,17 @@ class GridTrading:
             }
             
             self.trade_history.append(trade_record)
+            self.journal.append({
+                'run_id': self.run_id,
+                'strategy': 'grid_trading',
+                'exchange': 'tiger',
+                'symbol': full_symbol,
+                'kind': 'order',
+                'side': side,
+                'price': price,
+                'quantity': quantity,
+                'order_id': str(order.order_id),
+            })
             logger.info(f"下单成功: {trade_record}")
             return order
         except Exception as e:
@@ -126,34 +205,56 @@ class GridTrading:
             return None
     
     def check_and_trade(self):
-        """检查价格并执行交易"""
+        """
+        检查价格并执行交易
+        价格向下穿越第 i 条网格线时买入一格，向上穿越第 i+1 条网格线时卖出第 i 格持仓，
+        规则与 grid_backtest.grid_crossings 保持一致
+        """
         current_price = self.get_current_price()
         if current_price is None:
             return
+        tick_time = time.perf_counter()
             
         logger.info(f"当前价格: {current_price}")
+        self.indicators.update(current_price)
         
         # 找到当前价格所在的网格
-        grid_index = np.searchsorted(self.grid_prices, current_price)
+        grid_index = int(np.searchsorted(self.grid_prices, current_price))
+        last_index = self.last_grid_index
+        self.last_grid_index = grid_index
+        if last_index is None:
+            return
         
-        # 如果价格在网格范围内
-        if 0 < grid_index < len(self.grid_prices):
-            grid_price = self.grid_prices[grid_index]
-            
-            # 如果价格突破网格，执行交易
-            if current_price > grid_price and grid_index not in self.positions:
-                # 买入
+        # 向下穿越网格线，买入
+        for i in range(grid_index, min(last_index, self.grid_num)):
+            if i not in self.positions:
                 order = self.place_order(current_price, self.quantity_per_grid, 'BUY')
                 if order:
-                    self.positions[grid_index] = True
-                    logger.info(f"买入信号: 价格 {current_price}, 数量 {self.quantity_per_grid}")
-            
-            elif current_price < grid_price and grid_index in self.positions:
-                # 卖出
+                    observe_tick_to_order('grid_trading', tick_time)
+                    self.positions[i] = True
+                    self.save_state()
+                    logger.info(f"买入信号: 网格 {i}, 价格 {current_price}, 数量 {self.quantity_per_grid}")
+        
+        # 向上穿越网格线，卖出下方一格的持仓
+        for i in range(max(last_index - 1, 0), min(grid_index - 1, self.grid_num)):
+            if i in self.positions:
                 order = self.place_order(current_price, self.quantity_per_grid, 'SELL')
                 if order:
-                    del self.positions[grid_index]
-                    logger.info(f"卖出信号: 价格 {current_price}, 数量 {self.quantity_per_grid}")
+                    observe_tick_to_order('grid_trading', tick_time)
+                    del self.positions[i]
+                    self.save_state()
+                    logger.info(f"卖出信号: 网格 {i}, 价格 {current_price}, 数量 {self.quantity_per_grid}")
+    
+    def backtest(self, prices, initial_cash=0.0):
+        """
+        用当前网格参数回放历史行情
+        :param prices: 价格数组、Series 或K线 DataFrame
+        :param initial_cash: 初始资金
+        :return: grid_backtest.backtest_grid 的结果
+        """
+        from grid_backtest import backtest_grid
+        return backtest_grid(prices, self.lower_price, self.upper_price, self.grid_num,
+                             self.quantity_per_grid, initial_cash=initial_cash)
     
     def run(self, interval=60):
         """运行网格交易策略"""
@@ -162,6 +263,8 @@ class GridTrading:
         logger.info(f"网格数量: {self.grid_num}")
         logger.info(f"每格数量: {self.quantity_per_grid}")
         logger.info(f"网格价格: {self.grid_prices}")
+        if self.positions:
+            self.reconcile_state()
         
         try:
             while True:
@@ -174,21 +277,19 @@ class GridTrading:
             logger.error(f"策略运行出错: {e}")
             self.print_trade_history()
     
-    def print_trade_history(self):
-        """打印交易历史"""
-        if self.trade_history:
-            df = pd.DataFrame(self.trade_history)
-            logger.info("\n交易历史:")
+    def print_trade_history(self, limit=50):
+        """
+        打印本次运行的交易记录
+        :param limit: 最多显示的最近记录数，总收益在日志库中聚合计算
+        """
+        summary = self.journal.summary(run_id=self.run_id)
+        if summary['count']:
+            df = self.journal.read(run_id=self.run_id, limit=limit)
+            logger.info(f"\n交易历史 (共 {summary['count']} 笔，显示最近 {len(df)} 笔):")
             logger.info(f"\n{df}")
             
             # 计算总收益
-            total_profit = 0
-            for trade in self.trade_history:
-                if trade['side'] == 'SELL':
-                    total_profit += trade['price'] * trade['quantity']
-                else:
-                    total_profit -= trade['price'] * trade['quantity']
-            logger.info(f"总收益: {total_profit:.2f}")
+            logger.info(f"总收益: {summary['cash_flow']:.2f}")
         else:
             logger.info("暂无交易记录")
 
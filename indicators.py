@@ -0,0 +1,291 @@
+import math
+import numpy as np
+
+
+class RingBuffer:
+    """固定长度的环形缓冲区，写入和读取最旧元素均为 O(1)"""
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("窗口大小必须大于0")
+        self.size = size
+        self.data = np.zeros(size)
+        self.count = 0
+        self.head = 0  # 下一次写入的位置
+
+    def push(self, value):
+        """
+        写入新值
+        :return: 被覆盖的最旧值，缓冲区未满时返回 None
+        """
+        old = self.data[self.head] if self.count >= self.size else None
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.size
+        self.count += 1
+        return old
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def values(self):
+        """按时间顺序返回缓冲区内的值"""
+        if not self.full:
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+
+class SMA:
+    """
+    简单移动平均，与 data['Close'].rolling(window).mean() 结果一致
+    窗口未满时返回 NaN
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, price):
+        old = self.buffer.push(price)
+        self.total += price - (old if old is not None else 0.0)
+        if self.buffer.full and self.buffer.head == 0:
+            # 每滚动一整个窗口重新求和一次，消除累加误差，均摊后仍为 O(1)
+            self.total = float(self.buffer.data.sum())
+        self.value = self.total / self.window if self.buffer.full else math.nan
+        return self.value
+
+
+class EMA:
+    """指数移动平均，与 Series.ewm(span=span, adjust=False).mean() 结果一致"""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = math.nan
+
+    def update(self, price):
+        if math.isnan(self.value):
+            self.value = float(price)
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+
+class RollingStd:
+    """滚动标准差(ddof=1)，与 Series.rolling(window).std() 结果一致，采用滑动窗口 Welford 更新"""
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = math.nan
+
+    def update(self, price):
+        old = self.buffer.push(price)
+        if old is None:
+            delta = price - self.mean
+            self.mean += delta / self.buffer.count
+            self.m2 += delta * (price - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (price - old) / self.window
+            self.m2 += (price - old) * (price - self.mean + old - old_mean)
+        if self.buffer.full and self.buffer.head == 0:
+            # 每滚动一整个窗口重新计算一次，消除累积误差
+            data = self.buffer.data
+            self.mean = float(data.mean())
+            self.m2 = float(np.dot(data - self.mean, data - self.mean))
+
+        if not self.buffer.full or self.window < 2:
+            self.value = math.nan
+        else:
+            self.value = math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+        return self.value
+
+
+class Bollinger:
+    """布林带：中轨为滚动均值，上下轨为均值加减 num_std 倍滚动标准差"""
+
+    def __init__(self, window=20, num_std=2.0):
+        self.num_std = num_std
+        self.std = RollingStd(window)
+        self.middle = math.nan
+        self.upper = math.nan
+        self.lower = math.nan
+
+    def update(self, price):
+        std = self.std.update(price)
+        self.middle = self.std.mean if self.std.buffer.full else math.nan
+        self.upper = self.middle + self.num_std * std
+        self.lower = self.middle - self.num_std * std
+        return self.middle, self.upper, self.lower
+
+    @property
+    def value(self):
+        return self.middle, self.upper, self.lower
+
+
+class ATR:
+    """
+    平均真实波幅：真实波幅的简单移动平均
+    与 pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1)
+    .max(axis=1).rolling(window).mean() 结果一致；逐笔行情可令 high = low = close
+    """
+
+    def __init__(self, window=14):
+        self.sma = SMA(window)
+        self.prev_close = None
+        self.value = math.nan
+
+    def update(self, high, low=None, close=None):
+        low = high if low is None else low
+        close = high if close is None else close
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = self.sma.update(true_range)
+        return self.value
+
+
+class Crossover:
+    """
+    均线交叉状态，规则与 intraday.generate_signals 一致：
+    第 short_window 根K线之后，短均线高于长均线时 signal 为 1，否则为 0；
+    positions 为 signal 的变化量 (1 买入, -1 卖出)
+    """
+
+    def __init__(self, short_window=50, long_window=200):
+        self.short_window = short_window
+        self.short_sma = SMA(short_window)
+        self.long_sma = SMA(long_window)
+        self.count = 0
+        self.signal = 0.0
+        self.positions = math.nan
+
+    def update(self, price):
+        short = self.short_sma.update(price)
+        long = self.long_sma.update(price)
+        signal = 1.0 if self.count >= self.short_window and short > long else 0.0
+        self.positions = math.nan if self.count == 0 else signal - self.signal
+        self.signal = signal
+        self.count += 1
+        return {
+            'price': price,
+            'short_sma': short,
+            'long_sma': long,
+            'signal': signal,
+            'positions': self.positions,
+        }
+
+    @property
+    def value(self):
+        return self.signal
+
+
+class OnlineCorrelation:
+    """
+    两个序列的累计协方差和相关系数，双变量 Welford 更新，与 np.cov / np.corrcoef 结果一致
+    不保存历史数据，每次更新 O(1)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+        return self.value
+
+    @property
+    def covariance(self):
+        return self.c_xy / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def value(self):
+        denominator = math.sqrt(self.m2_x * self.m2_y)
+        return self.c_xy / denominator if self.count > 1 and denominator > 0 else math.nan
+
+
+class EWCorrelation:
+    """
+    指数加权协方差和相关系数，近期样本权重更高，用于跟踪相关性的变化
+    :param span: 等效窗口长度，alpha = 2 / (span + 1)
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.var_x = 0.0
+        self.var_y = 0.0
+        self.cov = 0.0
+
+    def update(self, x, y):
+        if self.count == 0:
+            self.mean_x, self.mean_y = float(x), float(y)
+        else:
+            a = self.alpha
+            dx = x - self.mean_x
+            dy = y - self.mean_y
+            self.mean_x += a * dx
+            self.mean_y += a * dy
+            self.var_x = (1 - a) * (self.var_x + a * dx * dx)
+            self.var_y = (1 - a) * (self.var_y + a * dy * dy)
+            self.cov = (1 - a) * (self.cov + a * dx * dy)
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        denominator = math.sqrt(self.var_x * self.var_y)
+        return max(-1.0, min(1.0, self.cov / denominator)) if denominator > 0 else math.nan
+
+
+class IndicatorSet:
+    """
+    一组按名称管理的流式指标，策略每收到一个价格调用一次 update
+    用法: indicators.add('sma20', SMA(20)); indicators.update(price); indicators['sma20'].value
+    """
+
+    def __init__(self):
+        self.indicators = {}
+
+    def add(self, name, indicator):
+        self.indicators[name] = indicator
+        return indicator
+
+    def update(self, price, high=None, low=None):
+        for indicator in self.indicators.values():
+            if isinstance(indicator, ATR):
+                indicator.update(price if high is None else high, price if low is None else low, price)
+            else:
+                indicator.update(price)
+
+    def values(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def __getitem__(self, name):
+        return self.indicators[name]
+
+    def __contains__(self, name):
+        return name in self.indicators
+
+    def __len__(self):
+        return len(self.indicators)
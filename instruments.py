@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+
+logger = logging.getLogger(__name__)
+
+
+class Instrument:
+    """
+    交易对的下单精度：价格按 tick_sz、数量按 lot_sz 取整，数量不得小于 min_sz
+    取整使用 Decimal，结果为交易所接受的字符串，避免浮点误差导致的拒单
+    """
+
+    def __init__(self, inst_id, tick_sz, lot_sz, min_sz, base_ccy='', quote_ccy='', state='live'):
+        self.inst_id = inst_id
+        self.tick_sz = Decimal(str(tick_sz))
+        self.lot_sz = Decimal(str(lot_sz))
+        self.min_sz = Decimal(str(min_sz))
+        self.base_ccy = base_ccy
+        self.quote_ccy = quote_ccy
+        self.state = state
+
+    @classmethod
+    def from_okx(cls, item):
+        """由 OKX 交易产品信息接口返回的一项构造"""
+        return cls(item['instId'], item['tickSz'], item['lotSz'], item['minSz'],
+                   item.get('baseCcy', ''), item.get('quoteCcy', ''), item.get('state', 'live'))
+
+    @staticmethod
+    def _quantize(value, step, rounding):
+        steps = (Decimal(str(value)) / step).to_integral_value(rounding=rounding)
+        return format((steps * step).normalize(), 'f')
+
+    def round_price(self, price, side=None):
+        """
+        价格取整到 tick_sz
+        :param side: 'buy' 向下取整、'sell' 向上取整，保证挂单不会比原价格更激进；为空时四舍五入
+        :return: 价格字符串
+        """
+        rounding = {'buy': ROUND_FLOOR, 'sell': ROUND_CEILING}.get(side, ROUND_HALF_UP)
+        return self._quantize(price, self.tick_sz, rounding)
+
+    def round_size(self, size):
+        """
+        数量向下取整到 lot_sz
+        :return: 数量字符串，不足 min_sz 时返回 None
+        """
+        rounded = self._quantize(size, self.lot_sz, ROUND_FLOOR)
+        return rounded if Decimal(rounded) >= self.min_sz and Decimal(rounded) > 0 else None
+
+    def to_dict(self):
+        return {'instId': self.inst_id, 'tickSz': str(self.tick_sz), 'lotSz': str(self.lot_sz),
+                'minSz': str(self.min_sz), 'baseCcy': self.base_ccy, 'quoteCcy': self.quote_ccy,
+                'state': self.state}
+
+
+class InstrumentCache:
+    """
+    交易产品信息表：首次使用时一次请求加载该类型的全部交易对，此后按 refresh_interval 秒在后台线程刷新，
+    下单路径只读内存
+    :param fetch: 取数函数 fetch(inst_type)，返回 OKX 风格响应 {'code', 'data': [...]}
+    :param inst_type: 产品类型，如 SPOT、SWAP
+    :param refresh_interval: 后台刷新间隔(秒)，为 None 时不刷新
+    :param retry_interval: 首次加载失败后，至少间隔多少秒才再次请求；期间 get 返回 None(不做本地取整)
+    """
+
+    def __init__(self, fetch, inst_type='SPOT', refresh_interval=3600, retry_interval=60):
+        self.fetch = fetch
+        self.inst_type = inst_type
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.instruments = {}
+        self.loaded_at = None
+        self.failed_at = None  # 最近一次加载失败的 time.monotonic()
+        self.lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """
+        重新加载全部交易对，请求失败时保留旧数据
+        :return: 加载的交易对数量
+        """
+        try:
+            response = self.fetch(self.inst_type)
+        except Exception as e:
+            logger.error(f"加载交易产品信息失败: {e}")
+            self.failed_at = time.monotonic()
+            return 0
+        if not response or response.get('code') != '0':
+            logger.error(f"加载交易产品信息失败: {(response or {}).get('msg')}")
+            self.failed_at = time.monotonic()
+            return 0
+        instruments = {item['instId']: Instrument.from_okx(item) for item in response.get('data') or []}
+        with self.lock:
+            self.instruments = instruments
+            self.loaded_at = time.time()
+        logger.info(f"已加载 {len(instruments)} 个 {self.inst_type} 交易对信息")
+        return len(instruments)
+
+    def get(self, inst_id):
+        """
+        :return: Instrument，未知交易对返回 None
+        """
+        if self.loaded_at is None and not self._backing_off():
+            # 并发的首次调用只有一个线程请求，其余线程等待其结果
+            with self._load_lock:
+                if self.loaded_at is None and not self._backing_off() and self.load() and self._thread is None:
+                    self._thread = self._start_refresh()
+        return self.instruments.get(inst_id)
+
+    def _backing_off(self):
+        return self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_interval
+
+    def _start_refresh(self):
+        if not self.refresh_interval:
+            return None
+
+        def run():
+            while not self._stop.wait(self.refresh_interval):
+                self.load()
+
+        thread = threading.Thread(target=run, name=f"instruments-{self.inst_type}", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def __contains__(self, inst_id):
+        return self.get(inst_id) is not None
+
+    def __len__(self):
+        return len(self.instruments)
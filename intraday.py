@@ -1,9 +1,13 @@
 import pandas as pd
-import yfinance as yf
 import numpy as np
+from indicators import Crossover
+from bar_cache import get_yf_bars
 
-def get_stock_data(ticker, period='1d', interval='1m'):
-    # Fetch historical stock data
+def get_stock_data(ticker, period='1d', interval='1m', use_cache=True):
+    # Fetch historical stock data, only downloading bars missing from the local cache
+    if use_cache:
+        return get_yf_bars(ticker, period=period, interval=interval)
+    import yfinance as yf
     stock_data = yf.download(ticker, period=period, interval=interval)
     return stock_data
 
@@ -25,6 +29,12 @@ def generate_signals(data, short_window=50, long_window=200):
     signals['positions'] = signals['signal'].diff()
     return signals
 
+def stream_signals(prices, short_window=50, long_window=200):
+    # Generate the same signals as generate_signals one bar at a time with O(1) work per bar
+    crossover = Crossover(short_window, long_window)
+    for price in prices:
+        yield crossover.update(price)
+
 def simulate_trading(signals, initial_capital=100000.0):
     # Simulate trading based on signals
     positions = pd.DataFrame(index=signals.index).fillna(0.0)
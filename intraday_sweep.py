@@ -0,0 +1,150 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+# 工作进程中挂载的共享内存与价格视图
+_shared = {}
+
+
+def rolling_mean_from_cumsum(cumsum, window):
+    """
+    由累计和计算简单移动平均，结果与 data['Close'].rolling(window).mean() 对齐
+    :param cumsum: 前补 0 的累计和数组，长度为价格长度 + 1
+    :param window: 窗口大小
+    :return: 移动平均数组，前 window-1 个位置为 NaN
+    """
+    n = len(cumsum) - 1
+    sma = np.full(n, np.nan)
+    if window <= n:
+        sma[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return sma
+
+
+def score_sma_pair(price, short_sma, long_sma, short_window, initial_capital=100000.0, shares=100):
+    """
+    按 intraday.generate_signals / simulate_trading 的规则对一组均线打分
+    :return: 该组参数的回测指标字典
+    """
+    signal = np.zeros(len(price))
+    signal[short_window:] = short_sma[short_window:] > long_sma[short_window:]
+    stock = shares * signal
+    pos_diff = np.diff(stock, prepend=0.0)
+    pos_diff[0] = 0.0
+
+    cash = initial_capital - np.cumsum(pos_diff * price)
+    total = cash + stock * price
+    returns = total[1:] / total[:-1] - 1
+    std = returns.std() if len(returns) else 0.0
+
+    return {
+        'final_total': total[-1],
+        'total_return': total[-1] / initial_capital - 1,
+        'trades': int(np.count_nonzero(pos_diff)),
+        'max_drawdown': float(np.max(np.maximum.accumulate(total) - total)),
+        'sharpe': float(returns.mean() / std) if std > 0 else 0.0,
+    }
+
+
+def _attach_shared(name, length, initial_capital, shares):
+    """工作进程初始化：挂载共享内存中的价格与累计和"""
+    shm = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray((2 * length + 1,), dtype=np.float64, buffer=shm.buf)
+    _shared.update(
+        shm=shm,
+        price=buffer[:length],
+        cumsum=buffer[length:],
+        initial_capital=initial_capital,
+        shares=shares,
+        sma_cache={},
+    )
+
+
+def _cached_sma(window):
+    cache = _shared['sma_cache']
+    if window not in cache:
+        # 控制每个工作进程缓存的均线数量，避免长序列时内存无限增长
+        if len(cache) >= 64:
+            cache.pop(next(iter(cache)))
+        cache[window] = rolling_mean_from_cumsum(_shared['cumsum'], window)
+    return cache[window]
+
+
+def _score_long_window(long_window, short_windows):
+    """工作进程任务：同一长均线下批量评估所有短均线"""
+    price = _shared['price']
+    long_sma = _cached_sma(long_window)
+    results = []
+    for short_window in short_windows:
+        result = score_sma_pair(price, _cached_sma(short_window), long_sma, short_window,
+                                _shared['initial_capital'], _shared['shares'])
+        result.update(short_window=short_window, long_window=long_window)
+        results.append(result)
+    return results
+
+
+def sweep_sma_windows(prices, short_windows, long_windows, initial_capital=100000.0, shares=100, processes=None):
+    """
+    在同一价格序列上批量评估 (short_window, long_window) 组合
+    价格与累计和只计算一次并放入共享内存，各工作进程直接读取而无需序列化价格数组
+    :param prices: 收盘价数组、Series，或包含 Close 列的 DataFrame
+    :param short_windows: 短均线窗口候选值
+    :param long_windows: 长均线窗口候选值
+    :param initial_capital: 初始资金
+    :param shares: 持仓股数，与 simulate_trading 一致默认 100
+    :param processes: 进程数，默认 CPU 核数；为 1 时在当前进程中计算
+    :return: 每组窗口一行的 DataFrame，按 final_total 从高到低排序
+    """
+    if isinstance(prices, pd.DataFrame):
+        prices = prices['Close']
+    price = np.asarray(prices, dtype=np.float64).reshape(-1)
+    price = price[np.isfinite(price)]
+    if len(price) == 0:
+        raise ValueError("价格序列为空")
+
+    pairs = {}
+    for short_window, long_window in itertools.product(short_windows, long_windows):
+        if short_window < long_window:
+            pairs.setdefault(int(long_window), []).append(int(short_window))
+    if not pairs:
+        return pd.DataFrame()
+
+    length = len(price)
+    processes = processes or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=(2 * length + 1) * 8)
+    buffer = np.ndarray((2 * length + 1,), dtype=np.float64, buffer=shm.buf)
+    try:
+        buffer[:length] = price
+        buffer[length] = 0.0
+        np.cumsum(price, out=buffer[length + 1:])
+
+        if processes == 1:
+            _attach_shared(shm.name, length, initial_capital, shares)
+            try:
+                results = [_score_long_window(lw, sws) for lw, sws in pairs.items()]
+            finally:
+                attached = _shared['shm']
+                _shared.clear()
+                attached.close()
+        else:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_attach_shared,
+                                     initargs=(shm.name, length, initial_capital, shares)) as executor:
+                results = list(executor.map(_score_long_window, pairs.keys(), pairs.values()))
+    finally:
+        del buffer
+        shm.close()
+        shm.unlink()
+
+    df = pd.DataFrame([row for chunk in results for row in chunk])
+    columns = ['short_window', 'long_window', 'final_total', 'total_return', 'trades', 'max_drawdown', 'sharpe']
+    return df[columns].sort_values('final_total', ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # 示例：随机游走的1分钟行情上扫描均线窗口
+    rng = np.random.default_rng(0)
+    prices = 150 + np.cumsum(rng.normal(0, 0.05, 500_000))
+    result = sweep_sma_windows(prices, short_windows=range(5, 100, 5), long_windows=range(50, 500, 25))
+    print(result.head(20))
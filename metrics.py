@@ -0,0 +1,298 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图默认分桶(秒)，覆盖本地模拟的亚毫秒级到跨境 REST 的秒级
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """带标签的指标基类，子指标按标签值元组保存"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            samples = list(self._samples())
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, value=1):
+        with self.lock:
+            self.children[labels] = self.children.get(labels, 0) + value
+
+    def get(self, *labels):
+        return self.children.get(labels, 0)
+
+    def _samples(self):
+        for labels, value in self.children.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, value=1):
+        with self.lock:
+            self.children[labels] = self.children.get(labels, 0) + value
+
+    def dec(self, *labels, value=1):
+        self.inc(*labels, value=-value)
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.children[labels] = value
+
+    def get(self, *labels):
+        return self.children.get(labels, 0)
+
+    def _samples(self):
+        for labels, value in self.children.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram(Metric):
+    """
+    固定分桶直方图，observe 只做一次二分查找和三次加法
+    :param buckets: 升序的桶上界，自动追加 +Inf
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            child = self.children.get(labels)
+            if child is None:
+                child = self.children[labels] = [[0] * len(self.buckets), 0.0, 0]
+            child[0][i] += 1
+            child[1] += value
+            child[2] += 1
+
+    def count(self, *labels):
+        child = self.children.get(labels)
+        return child[2] if child else 0
+
+    def quantile(self, q, *labels):
+        """
+        按分桶线性插值估算分位数，如 quantile(0.99, 'okx', '/api/v5/trade/order')
+        :return: 估算值(秒)，无数据时为 None
+        """
+        child = self.children.get(labels)
+        if not child or not child[2]:
+            return None
+        counts, _, total = child
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if self.buckets[i] != float('inf') else lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-2]
+
+    def _samples(self):
+        for labels, (counts, total, count) in self.children.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, labels, ('le', _format_value(bound))), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), count
+
+
+class Registry:
+    """指标注册表，负责导出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, *args, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Prometheus 文本格式"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def write_textfile(self, path):
+        """
+        原子写入文本文件，供 node_exporter textfile collector 采集
+        :param path: 文件路径，一般以 .prom 结尾
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port=9108, host='127.0.0.1'):
+        """
+        在后台线程启动 HTTP 采集端点，GET /metrics 返回文本格式指标
+        :return: HTTP 服务器对象，调用 shutdown() 停止
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"指标采集端点: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    def start_textfile_writer(self, path, interval=15):
+        """
+        在后台线程每 interval 秒写一次文本文件
+        :return: threading.Event，set() 后停止
+        """
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    logger.error(f"写入指标文件失败: {str(e)}")
+
+        threading.Thread(target=loop, name='metrics-textfile', daemon=True).start()
+        return stop
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'exchange_request_duration_seconds', 'Exchange API call latency', ('exchange', 'endpoint'))
+REQUEST_ERRORS = REGISTRY.counter(
+    'exchange_request_errors_total', 'Failed exchange API calls by error kind', ('exchange', 'endpoint', 'kind'))
+REQUEST_RETRIES = REGISTRY.counter(
+    'exchange_request_retries_total', 'Retried exchange API calls', ('exchange', 'endpoint'))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'exchange_requests_in_flight', 'Exchange API calls currently in progress', ('exchange', 'endpoint'))
+TICK_TO_ORDER = REGISTRY.histogram(
+    'tick_to_order_seconds', 'Time from receiving a price tick to the order being acknowledged', ('strategy',))
+
+
+class RequestTimer:
+    """交易所调用计时上下文，记录延迟直方图、进行中请求数和异常次数"""
+
+    __slots__ = ('labels', 'start')
+
+    def __init__(self, exchange, endpoint):
+        self.labels = (exchange, endpoint)
+
+    def __enter__(self):
+        REQUESTS_IN_FLIGHT.inc(*self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REQUEST_LATENCY.observe(time.perf_counter() - self.start, *self.labels)
+        REQUESTS_IN_FLIGHT.dec(*self.labels)
+        if exc_type is not None:
+            REQUEST_ERRORS.inc(*self.labels, exc_type.__name__)
+        return False
+
+
+def track(exchange, endpoint):
+    """
+    用法:
+        with track('okx', endpoint):
+            response = func(*args, **kwargs)
+    """
+    return RequestTimer(exchange, endpoint)
+
+
+def record_response_error(exchange, endpoint, response):
+    """OKX 风格响应 code 非 0 时按错误码计数"""
+    if isinstance(response, dict):
+        code = str(response.get('code', '0'))
+        if code != '0':
+            REQUEST_ERRORS.inc(exchange, endpoint, f"code_{code}")
+
+
+def observe_tick_to_order(strategy, tick_time):
+    """
+    记录行情到下单确认的耗时
+    :param tick_time: 收到行情时的 time.perf_counter()
+    """
+    TICK_TO_ORDER.observe(time.perf_counter() - tick_time, strategy)
+
+
+def latency_summary(quantiles=(0.5, 0.99)):
+    """
+    各接口延迟分位数，便于在日志中查看
+    :return: {(exchange, endpoint): {'count', 'p50', 'p99', ...}}
+    """
+    summary = {}
+    for labels in list(REQUEST_LATENCY.children):
+        row = {'count': REQUEST_LATENCY.count(*labels)}
+        for q in quantiles:
+            row[f"p{int(q * 100)}"] = REQUEST_LATENCY.quantile(q, *labels)
+        summary[labels] = row
+    return summary
@@ -0,0 +1,190 @@
+import asyncio
+import base64
+import hmac
+import json
+import logging
+from datetime import datetime, timezone
+import httpx
+import okx.consts as c
+from okx_trading import get_api_credentials
+from rate_limit import RateLimiter, backoff_delay, retry_after, is_rate_limited
+from metrics import track, record_response_error, REQUEST_ERRORS, REQUEST_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOKXTrading:
+    """
+    OKXTrading 的 asyncio 版本
+    所有接口共用一个 keep-alive (HTTP/2) 连接池，相互独立的查询可以用 asyncio.gather 并发执行
+    用法:
+        async with AsyncOKXTrading() as client:
+            position, ticker, orders = await client.fetch_rebalance_state()
+    """
+
+    BATCH_SIZE = 20  # OKX 批量下单/撤单接口单次最多 20 个订单
+
+    def __init__(self, is_simulated=True, base_url=c.API_URL, max_connections=10, timeout=10, http2=True,
+                 rate_limiter=None, credentials=None):
+        """
+        :param is_simulated: 是否为模拟交易
+        :param base_url: REST 地址
+        :param max_connections: 连接池最大连接数
+        :param timeout: 请求超时(秒)
+        :param rate_limiter: 自定义 RateLimiter，与同步客户端共用时两者合计不超过接口限速
+        :param credentials: (api_key, secret_key, passphrase)，默认从环境变量读取
+        """
+        self.flag = "1" if is_simulated else "0"  # 1: 模拟盘, 0: 实盘
+        self.max_retries = 3
+        self.retry_delay = 0.5  # 重试退避基准秒数
+        self.max_retry_delay = 8  # 单次重试最长等待秒数
+        self.rate_limiter = rate_limiter or RateLimiter()  # 按接口限流
+        self.api_key, self.secret_key, self.passphrase = credentials or get_api_credentials(is_simulated)
+        try:
+            self.client = httpx.AsyncClient(
+                base_url=base_url, http2=http2, timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            )
+        except ImportError:
+            # 未安装 h2 时退回 HTTP/1.1 keep-alive
+            self.client = httpx.AsyncClient(
+                base_url=base_url, timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.client.aclose()
+
+    def _headers(self, method, request_path, body):
+        timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        message = f"{timestamp}{method}{request_path}{body}"
+        sign = base64.b64encode(hmac.new(self.secret_key.encode(), message.encode(), digestmod='sha256').digest())
+        return {
+            'Content-Type': 'application/json',
+            'OK-ACCESS-KEY': self.api_key,
+            'OK-ACCESS-SIGN': sign.decode(),
+            'OK-ACCESS-TIMESTAMP': timestamp,
+            'OK-ACCESS-PASSPHRASE': self.passphrase,
+            'x-simulated-trading': self.flag,
+        }
+
+    async def _request(self, method, path, params=None, tokens=1):
+        """
+        带签名的请求：按接口限流，网络错误或服务端限流时以带抖动的指数退避重试
+        :param tokens: 占用的限流配额，批量接口传订单数
+        """
+        params = {k: v for k, v in (params or {}).items() if v not in ('', None)} \
+            if isinstance(params, dict) else params
+        if method == c.GET and params:
+            path = path + '?' + '&'.join(f"{k}={v}" for k, v in params.items())
+        body = json.dumps(params) if method == c.POST else ''
+
+        endpoint = path.split('?')[0]
+        for attempt in range(self.max_retries):
+            await self.rate_limiter.acquire_async(endpoint, tokens)
+            try:
+                with track('okx', endpoint):
+                    response = await self.client.request(method, path, content=body or None,
+                                                         headers=self._headers(method, path, body))
+            except httpx.TransportError as e:
+                logger.warning(f"请求失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
+                if attempt < self.max_retries - 1:
+                    self.rate_limiter.record(endpoint, 'retries')
+                    REQUEST_RETRIES.inc('okx', endpoint)
+                    await asyncio.sleep(backoff_delay(attempt, self.retry_delay, self.max_retry_delay))
+                    continue
+                logger.error(f"达到最大重试次数，请求失败: {str(e)}")
+                raise
+            
+            result = response.json()
+            record_response_error('okx', endpoint, result)
+            if response.status_code >= 400:
+                REQUEST_ERRORS.inc('okx', endpoint, f"http_{response.status_code}")
+            if (response.status_code == 429 or is_rate_limited(result)) and attempt < self.max_retries - 1:
+                # 服务端限流：优先使用 Retry-After 提示，暂停该接口的令牌桶后重试
+                delay = backoff_delay(attempt, self.retry_delay, self.max_retry_delay, retry_after(response))
+                logger.warning(f"接口 {endpoint} 触发限流，{delay:.2f} 秒后重试")
+                self.rate_limiter.record(endpoint, 'rate_limited')
+                self.rate_limiter.record(endpoint, 'retries')
+                REQUEST_RETRIES.inc('okx', endpoint)
+                self.rate_limiter.pause(endpoint, delay)
+                continue
+            return result
+
+    async def get_positions(self, instType='', instId=''):
+        """获取持仓信息"""
+        return await self._request(c.GET, c.POSITION_INFO, {'instType': instType, 'instId': instId})
+
+    async def get_eth_position(self):
+        """获取ETH持仓信息"""
+        return await self.get_positions(instId="ETH-USDT")
+
+    async def get_ticker(self, instId="ETH-USDT"):
+        """获取行情"""
+        return await self._request(c.GET, c.TICKER_INFO, {'instId': instId})
+
+    async def get_eth_price(self):
+        """获取ETH当前价格"""
+        return await self.get_ticker("ETH-USDT")
+
+    async def get_account_balance(self, ccy=None):
+        """获取账户余额信息"""
+        return await self._request(c.GET, c.ACCOUNT_INFO, {'ccy': ccy})
+
+    async def get_open_orders(self, symbol='ETH-USDT'):
+        """获取当前未完成的订单"""
+        return await self._request(c.GET, c.ORDERS_PENDING, {'instType': 'SPOT', 'instId': symbol})
+
+    async def get_order_book(self, symbol='ETH-USDT', limit=5):
+        """获取订单簿信息"""
+        return await self._request(c.GET, c.ORDER_BOOKS, {'instId': symbol, 'sz': str(limit)})
+
+    async def place_order(self, params):
+        """下单，params 格式同 OKXTrading._build_order_params"""
+        return await self._request(c.POST, c.PLACR_ORDER, params)
+
+    async def cancel_order(self, instId, ordId):
+        """撤单"""
+        return await self._request(c.POST, c.CANCEL_ORDER, {'instId': instId, 'ordId': ordId})
+
+    async def _batch(self, path, orders):
+        """分批并发调用批量接口，返回与 orders 一一对应的结果"""
+        chunks = [orders[i:i + self.BATCH_SIZE] for i in range(0, len(orders), self.BATCH_SIZE)]
+        responses = await asyncio.gather(*(self._request(c.POST, path, chunk, len(chunk)) for chunk in chunks),
+                                         return_exceptions=True)
+        results = []
+        for chunk, response in zip(chunks, responses):
+            data = [] if isinstance(response, Exception) else (response.get('data') or [])
+            error = str(response) if isinstance(response, Exception) else response.get('msg', '')
+            for i, order in enumerate(chunk):
+                results.append(data[i] if i < len(data) else {
+                    'ordId': order.get('ordId', ''), 'clOrdId': order.get('clOrdId', ''),
+                    'sCode': 'request_error', 'sMsg': error,
+                })
+        return results
+
+    async def place_orders_batch(self, orders):
+        """批量下单"""
+        return await self._batch(c.BATCH_ORDERS, orders)
+
+    async def cancel_orders_batch(self, orders):
+        """批量撤单"""
+        return await self._batch(c.CANCEL_BATCH_ORDERS,
+                                 [{'instId': order['instId'], 'ordId': order['ordId']} for order in orders])
+
+    async def fetch_rebalance_state(self, instId="ETH-USDT"):
+        """
+        并发获取一次重平衡所需的持仓、行情和未完成订单，总耗时约为一次往返
+        :return: (positions, ticker, open_orders)
+        """
+        return await asyncio.gather(
+            self.get_positions(instId=instId),
+            self.get_ticker(instId),
+            self.get_open_orders(instId),
+        )
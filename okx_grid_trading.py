@@ -1,21 +1,61 @@
+import asyncio
+import bisect
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from okx_trading import OKXTrading
 import numpy as np
 import requests
-from requests.exceptions import RequestException
-import backoff
-import json
+from indicators import IndicatorSet
+from order_tracker import OrderTracker
+from metrics import observe_tick_to_order
+from trade_journal import default_journal, new_run_id
+from grid_state import save_snapshot, load_snapshot, match_orders, state_path as default_state_path
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class OKXGridTrader(OKXTrading):
-    def __init__(self, is_simulated=True):
-        super().__init__(is_simulated=is_simulated)
+    def __init__(self, is_simulated=True, use_batch=True, reconcile_interval=300, backend=None, rate_limiter=None,
+                 journal=None, state_path=None, quote_cache=None, use_order_book=False, inst_id="ETH-USDT",
+                 instruments=None, counter_orders=True):
+        """
+        :param is_simulated: 是否为模拟交易
+        :param use_batch: 是否使用批量下单/撤单接口
+        :param reconcile_interval: 本地订单状态与交易所对账的间隔(秒)
+        :param backend: 见 OKXTrading，传入 SimulatedExchange.okx_backend() 可在本地模拟交易所上运行
+        :param rate_limiter: 见 OKXTrading
+        :param journal: 交易日志 TradeJournal，默认使用进程内共享的日志
+        :param state_path: 网格快照文件，用于重启后对账恢复；为 None 时不保存快照，
+                           为 True 时使用 state/okx-grid-<inst_id>.json
+        :param quote_cache: 见 OKXTrading
+        :param use_order_book: 事件驱动运行时同时订阅 books 频道维护本地订单簿，布置网格时以盘口中间价定价，
+                               不再单独请求行情
+        :param inst_id: 网格交易的现货交易对
+        :param instruments: 见 OKXTrading
+        :param counter_orders: 网格订单成交后在相邻档位挂一个反向订单，价格在区间内时无需重新布置整个网格
+        """
+        super().__init__(is_simulated=is_simulated, backend=backend, rate_limiter=rate_limiter,
+                         quote_cache=quote_cache, instruments=instruments)
+        self.inst_id = inst_id
+        self.use_batch = use_batch
+        self.orders = OrderTracker(reconcile_interval=reconcile_interval)  # 本地订单状态簿
         self.grid_orders = []
         self.is_running = False
+        self.indicators = IndicatorSet()  # 逐笔更新的流式指标，可通过 indicators.add 注册
+        self.grid_params = None  # 当前网格参数
+        self.grid_levels = []  # 当前网格价格水平，升序
+        self.counter_orders = counter_orders
+        self.stream = None  # WebSocket 行情订阅
+        self.private_stream = None  # WebSocket 订单推送订阅
+        self.async_client = None  # 共享连接池的异步客户端，按需创建
+        self.journal = journal if journal is not None else default_journal()  # 下单和成交记录
+        self.run_id = new_run_id(f"okx-grid-{inst_id}")
+        self.state_path = default_state_path(f"okx-grid-{inst_id}") if state_path is True else state_path
+        self.last_position = None  # 最近一次查询到的持仓
+        self.use_order_book = use_order_book
+        self.book_feed = None  # 本地订单簿，仅在事件驱动运行时创建
         
     def calculate_grid_levels(self, upper_price, lower_price, num_grids):
         """
@@ -40,44 +80,336 @@ class OKXGridTrader(OKXTrading):
         quantities = [investment_per_grid / price for price in grid_prices]
         return quantities
     
+    def _grid_layout(self, upper_price, lower_price, num_grids, total_investment, current_price):
+        """
+        计算网格挂单：当前价格以下放置买单，以上放置卖单
+        价格和数量按交易对精度取整，数量不足最小下单数量的网格不下单；
+        counter_orders 时最接近当前价格的档位留空，成交后的反向订单总是落在空出的档位上
+        :return: 下单参数列表
+        """
+        # 计算网格价格水平
+        grid_prices = self.calculate_grid_levels(upper_price, lower_price, num_grids)
+        
+        # 计算每个网格的数量
+        quantities = self.calculate_grid_quantity(total_investment, grid_prices)
+        
+        empty = int(np.argmin(np.abs(grid_prices - current_price))) if self.counter_orders else None
+        layout = [self._build_order_params('buy' if price < current_price else 'sell', quantity, price, self.inst_id)
+                  for i, (price, quantity) in enumerate(zip(grid_prices, quantities)) if i != empty]
+        return [params for params in layout if params is not None]
+    
     def place_grid_orders(self, upper_price, lower_price, num_grids, total_investment):
         """
         放置网格订单
+        只撤销与新网格不一致的挂单、补下缺少的挂单，已存在且一致的挂单保留
         :param upper_price: 网格上限价格
         :param lower_price: 网格下限价格
         :param num_grids: 网格数量
         :param total_investment: 总投资金额(USDT)
         """
-        # 获取当前价格
-        price_response = self.get_eth_price()
-        current_price = float(price_response['data'][0]['last'])
+        current_price = self.current_price()
+        self._set_grid_params(self._make_grid_params(upper_price, lower_price, num_grids, total_investment))
         
-        # 计算网格价格水平
-        grid_prices = self.calculate_grid_levels(upper_price, lower_price, num_grids)
-        
-        # 计算每个网格的数量
-        quantities = self.calculate_grid_quantity(total_investment, grid_prices)
+        layout = self._grid_layout(upper_price, lower_price, num_grids, total_investment, current_price)
+        try:
+            live = (self.get_open_orders(self.inst_id) or {}).get('data') or []
+        except Exception as e:
+            logger.error(f"获取未完成订单失败，改为全部撤销后重新下单: {str(e)}")
+            self.cancel_all_orders()
+            live = []
+        self.sync_orders(layout, live)
+        self.save_state()
+    
+    @staticmethod
+    def _make_grid_params(upper_price, lower_price, num_grids, total_investment):
+        return {
+            'upper_price': float(upper_price),
+            'lower_price': float(lower_price),
+            'num_grids': int(num_grids),
+            'total_investment': float(total_investment),
+        }
+    
+    def _set_grid_params(self, params):
+        self.grid_params = params
+        self.grid_levels = list(self.calculate_grid_levels(params['upper_price'], params['lower_price'],
+                                                           params['num_grids'])) if params else []
+    
+    def current_price(self):
+        """当前价格：本地订单簿已同步时取盘口中间价，否则查询行情"""
+        book = self.book_feed.books.get(self.inst_id) if self.book_feed is not None else None
+        if book is not None and book.synced and book.mid() is not None:
+            return book.mid()
+        price_response = self.get_price(self.inst_id)
+        return float(price_response['data'][0]['last'])
+    
+    def sync_orders(self, desired, live):
+        """
+        使交易所挂单与期望挂单一致
+        :param desired: 期望的下单参数列表
+        :param live: 交易所当前的未完成订单
+        :return: {'kept': 保留数, 'canceled': 撤销数, 'placed': 新下单数}
+        """
+        matched, to_place, to_cancel = match_orders(desired, live)
+        for _, order in matched:
+            self.orders.on_order_update(order)
+        if to_cancel:
+            self._cancel_orders(to_cancel)
+        if to_place:
+            self._place_orders(to_place)
+        logger.info(f"网格订单同步完成: 保留 {len(matched)}, 撤销 {len(to_cancel)}, 新下 {len(to_place)}")
+        return {'kept': len(matched), 'canceled': len(to_cancel), 'placed': len(to_place)}
+    
+    def _place_orders(self, orders):
+        """下单并记录到订单簿和交易日志"""
+        orders = [dict(params, clOrdId=params.get('clOrdId') or self.orders.new_client_id()) for params in orders]
+        if self.use_batch:
+            results = self.place_orders_batch(orders)
+            success = sum(1 for result in results if result.get('sCode') == '0')
+            logger.info(f"网格订单批量放置完成，成功{success}/{len(orders)}个")
+        else:
+            results = []
+            for params in orders:
+                order = self._make_request(self.tradeAPI.place_order, **params)
+                logger.info(f"放置{'买' if params['side'] == 'buy' else '卖'}单: 价格={params.get('px')}, "
+                            f"数量={params['sz']}")
+                results.append(order['data'][0] if order and order.get('data') else None)
+        for params, result in zip(orders, results):
+            self._record_placed(params, self.orders.on_placed(params, result))
+        self.grid_orders.extend(results)
+        return results
+    
+    def _cancel_orders(self, orders):
+        """撤单并更新订单簿"""
+        if self.use_batch:
+            results = self.cancel_orders_batch(orders)
+        else:
+            results = [self.cancel_order(order['instId'], order['ordId']) for order in orders]
+            for result in results:
+                if result.get('sCode') != '0':
+                    logger.error(f"取消订单 {result.get('ordId')} 失败: {result.get('sMsg')}")
+        for result in results:
+            self.orders.on_canceled(result)
+        return results
+    
+    def save_state(self):
+        """保存网格参数、挂单和持仓快照"""
+        if not self.state_path:
+            return
+        save_snapshot(self.state_path, {
+            'grid_params': self.grid_params,
+            'orders': [{key: order.get(key) for key in ('instId', 'side', 'px', 'sz', 'ordId', 'clOrdId', 'accFillSz')}
+                       for order in self.orders.open_orders()],
+            'position': self.last_position,
+            'run_id': self.run_id,
+        })
+    
+    def warm_start(self, grid_params=None):
+        """
+        从快照恢复：读取上次的网格布局，与交易所当前挂单和持仓对账，
+        只撤销快照外的挂单、补下被外部撤销的挂单，停机期间成交的订单记入交易日志后不再补单，
+        counter_orders 时改为在相邻档位挂反向订单
+        API 调用数与变化量相关，与网格大小无关
+        :param grid_params: 本次启动要求的网格参数，与快照不一致时忽略快照
+        :return: 是否成功恢复，无可用快照或网格参数已变化时返回 False
+        """
+        snapshot = load_snapshot(self.state_path)
+        if not snapshot or not snapshot.get('grid_params') or not snapshot.get('orders'):
+            return False
+        if grid_params is not None and snapshot['grid_params'] != grid_params:
+            logger.warning(f"网格参数已变化，忽略快照 {self.state_path}")
+            return False
+        self._set_grid_params(snapshot['grid_params'])
+        layout = snapshot.get('orders') or []
+        live = (self.get_open_orders(self.inst_id) or {}).get('data') or []
+        matched, gone, extra = match_orders(layout, live)
+        for _, order in matched:
+            self.orders.on_order_update(order)
         
-        # 取消所有现有订单
-        self.cancel_all_orders()
+        # 快照中已不在挂单列表的订单：已成交的记入日志，确认被撤销的按未成交数量补下；
+        # 查不到最终状态的不补单，避免已成交的订单被重复下单
+        for order in gone:
+            self.orders.on_order_update(dict(order, state='live'))
+        finals = self.resolve_orders(gone)
+        filled = {order.get('ordId') for order in self.record_fills(gone, finals)}
+        canceled = [dict(order, sz=float(order['sz']) - float(finals[order['ordId']].get('accFillSz') or 0))
+                    for order in gone if order.get('ordId') not in filled
+                    and finals.get(order.get('ordId'), {}).get('state') in ('canceled', 'mmp_canceled')]
+        to_place = [self._build_order_params(order['side'], order['sz'], order['px'], order.get('instId') or self.inst_id)
+                    for order in canceled if order['sz'] > 0]
+        to_place = [params for params in to_place if params is not None]
+        unknown = [order for order in gone if order.get('ordId') not in finals]
+        if unknown:
+            logger.warning(f"{len(unknown)} 个快照订单查询不到最终状态，不补单: "
+                           f"{[order.get('ordId') for order in unknown]}")
+        for order in gone:
+            if order.get('ordId') not in filled:
+                self.orders.on_order_update(dict(order, state='canceled' if order not in unknown else 'closed'))
+        if extra:
+            self._cancel_orders(extra)
+        if to_place:
+            self._place_orders(to_place)
         
-        # 放置网格订单
-        for i in range(len(grid_prices)):
-            price = grid_prices[i]
-            quantity = quantities[i]
-            
-            if price < current_price:
-                # 当前价格以下放置买单
-                order = self.place_eth_order('buy', quantity, price)
-                logger.info(f"放置买单: 价格={price}, 数量={quantity}")
-            else:
-                # 当前价格以上放置卖单
-                order = self.place_eth_order('sell', quantity, price)
-                logger.info(f"放置卖单: 价格={price}, 数量={quantity}")
-            
-            self.grid_orders.append(order)
-            
-        logger.info(f"网格订单放置完成，共{len(grid_prices)}个网格")
+        positions = self.get_position(self.inst_id)
+        self.last_position = self._position_size(positions)
+        if snapshot.get('position') is not None and self.last_position is not None:
+            logger.info(f"持仓: 快照 {snapshot['position']}, 当前 {self.last_position}")
+        logger.info(f"从快照恢复网格: 保留 {len(matched)}, 已成交 {len(filled)}, 撤销 {len(extra)}, "
+                    f"补下 {len(to_place)}, 状态未知 {len(unknown)}")
+        self.orders.last_reconcile = time.monotonic()
+        self.save_state()
+        return True
+    
+    @staticmethod
+    def _position_size(positions):
+        data = (positions or {}).get('data') or []
+        return sum(float(item.get('pos') or 0) for item in data) if data else None
+    
+    def _record_placed(self, params, order):
+        """下单成功的订单写入交易日志"""
+        if order is None or order.get('state') == 'rejected':
+            return
+        self.journal.append({
+            'run_id': self.run_id,
+            'strategy': 'okx_grid',
+            'exchange': 'okx',
+            'symbol': params.get('instId'),
+            'kind': 'order',
+            'side': params.get('side'),
+            'price': float(params['px']) if params.get('px') else None,
+            'quantity': float(params.get('sz') or 0),
+            'order_id': order.get('ordId'),
+            'client_id': order.get('clOrdId'),
+        })
+    
+    def _record_fill(self, order, size):
+        self.journal.append({
+            'run_id': self.run_id,
+            'strategy': 'okx_grid',
+            'exchange': 'okx',
+            'symbol': order.get('instId'),
+            'kind': 'fill',
+            'side': order.get('side'),
+            'price': float(order.get('fillPx') or order.get('avgPx') or order.get('px') or 0),
+            'quantity': size,
+            'order_id': order.get('ordId'),
+            'client_id': order.get('clOrdId'),
+            'fee': abs(float(order.get('fillFee') or 0)),
+        })
+    
+    def on_order_update(self, update):
+        """
+        处理一条订单推送(orders 频道)，有新成交时写入交易日志
+        :param update: OKX 订单对象
+        """
+        previous = self.orders.get(update.get('ordId')) or self.orders.get(update.get('clOrdId')) or {}
+        filled_before = float(previous.get('accFillSz') or 0)
+        order = self.orders.on_order_update(update)
+        size = float(order.get('accFillSz') or 0) - filled_before
+        if size > 0:
+            self._record_fill(order, size)
+        if order.get('state') == 'filled' and previous.get('state') != 'filled':
+            self.place_counter_orders([order])
+        return order
+    
+    def resolve_orders(self, missing):
+        """
+        查询已离开挂单列表的订单的最终状态：先查一次最近的订单历史，不在其中的订单按 ordId 逐个查询订单详情
+        :param missing: 订单列表
+        :return: {ordId: 最终订单}，查询失败的订单不在结果中
+        """
+        if not missing:
+            return {}
+        try:
+            history = self.get_trading_history(self.inst_id, limit=100)
+        except Exception as e:
+            logger.error(f"查询订单历史失败: {str(e)}")
+            history = None
+        by_id = {order['ordId']: order for order in (history or {}).get('data') or []}
+        finals = {}
+        for order in missing:
+            ord_id = order.get('ordId')
+            if not ord_id:
+                continue
+            final = by_id.get(ord_id)
+            if final is None:
+                try:
+                    final = self.get_order(order.get('instId') or self.inst_id, ord_id)
+                except Exception as e:
+                    logger.error(f"查询订单 {ord_id} 详情失败: {str(e)}")
+            if final is not None:
+                finals[ord_id] = final
+        return finals
+    
+    def record_fills(self, missing, finals=None):
+        """
+        对账发现已离开挂单列表的订单，查询最终状态确认是否成交，成交的写入交易日志
+        :param missing: OrderTracker.reconcile 返回的 missing 列表
+        :param finals: 已查询到的最终状态，见 resolve_orders
+        :return: 确认已完全成交的订单
+        """
+        if not missing:
+            return []
+        if finals is None:
+            finals = self.resolve_orders(missing)
+        filled = []
+        for order in missing:
+            final = finals.get(order.get('ordId'))
+            # 查询期间订单推送可能已处理过这笔成交，以跟踪器中的当前状态为准
+            current = self.orders.get(order.get('ordId')) or order
+            if final is not None and current.get('state') != 'filled':
+                # 对账时按已离开挂单列表记为 closed，这里用订单历史中的最终状态覆盖
+                filled_before = float(current.get('accFillSz') or 0)
+                self.orders.on_order_update(final)
+                size = float(final.get('accFillSz') or 0) - filled_before
+                if size > 0:
+                    self._record_fill(dict(final, fillPx=final.get('avgPx')), size)
+                if final.get('state') == 'filled':
+                    filled.append(final)
+        self.place_counter_orders(filled)
+        return filled
+    
+    def _grid_level(self, price):
+        """价格对应的网格档位下标，与最近档位相差超过半个网格间距时返回 None"""
+        levels = self.grid_levels
+        if len(levels) < 2:
+            return None
+        i = bisect.bisect_left(levels, price)
+        nearest = min((j for j in (i - 1, i) if 0 <= j < len(levels)), key=lambda j: abs(levels[j] - price))
+        step = (levels[-1] - levels[0]) / (len(levels) - 1)
+        return nearest if abs(levels[nearest] - price) <= step / 2 else None
+    
+    def counter_order_params(self, order):
+        """
+        成交订单对应的反向订单：第 i 档买单成交后在第 i+1 档挂卖单，卖单成交后在第 i-1 档挂买单，数量与成交数量相同
+        :param order: 已完全成交的订单
+        :return: 下单参数，不是当前网格的订单或反向档位超出网格区间时返回 None
+        """
+        level = self._grid_level(float(order.get('px') or order.get('avgPx') or 0))
+        if level is None:
+            return None
+        side = 'sell' if order.get('side') == 'buy' else 'buy'
+        target = level + 1 if side == 'sell' else level - 1
+        if not 0 <= target < len(self.grid_levels):
+            logger.info(f"第 {level} 档{'买' if side == 'sell' else '卖'}单成交，反向档位超出网格区间")
+            return None
+        return self._build_order_params(side, order.get('accFillSz') or order.get('sz'), self.grid_levels[target],
+                                        order.get('instId') or self.inst_id)
+    
+    def place_counter_orders(self, filled):
+        """
+        为成交的网格订单放置反向订单，每笔成交只下一个订单，与网格大小无关
+        :param filled: 已完全成交的订单列表
+        :return: 下单结果
+        """
+        if not self.counter_orders or not filled:
+            return []
+        params = [p for p in (self.counter_order_params(order) for order in filled) if p is not None]
+        if not params:
+            return []
+        logger.info(f"{len(filled)} 个网格订单成交，放置 {len(params)} 个反向订单")
+        results = self._place_orders(params)
+        self.save_state()
+        return results
     
     def cancel_all_orders(self):
         """取消所有未完成的订单"""
@@ -86,17 +418,21 @@ class OKXGridTrader(OKXTrading):
         
         for attempt in range(max_retries):
             try:
-                open_orders = self.get_open_orders()
-                if open_orders and 'data' in open_orders and open_orders['data']:
+                open_orders = self.get_open_orders(self.inst_id)
+                if open_orders and 'data' in open_orders and open_orders['data'] and self.use_batch:
+                    results = self.cancel_orders_batch(open_orders['data'])
+                    for result in results:
+                        self.orders.on_canceled(result)
+                    failed = [r for r in results if r.get('sCode') != '0']
+                    if failed:
+                        logger.error(f"{len(failed)} 个订单撤销失败")
+                elif open_orders and 'data' in open_orders and open_orders['data']:
                     for order in open_orders['data']:
-                        try:
-                            self.tradeAPI.cancel_order(
-                                instId=order['instId'],
-                                ordId=order['ordId']
-                            )
-                        except Exception as e:
-                            logger.error(f"取消订单 {order['ordId']} 失败: {str(e)}")
+                        result = self.cancel_order(order['instId'], order['ordId'])
+                        if result.get('sCode') != '0':
+                            logger.error(f"取消订单 {order['ordId']} 失败: {result.get('sMsg')}")
                             continue
+                        self.orders.on_canceled(result)
                 logger.info("已取消所有未完成订单")
                 return
             except Exception as e:
@@ -111,7 +447,7 @@ class OKXGridTrader(OKXTrading):
         查询现有订单信息
         :return: 订单信息列表
         """
-        orders = self.get_open_orders()
+        orders = self.get_open_orders(self.inst_id)
         if not orders or 'data' not in orders or not orders['data']:
             logger.info("当前没有未完成的订单")
             return []
@@ -144,8 +480,10 @@ class OKXGridTrader(OKXTrading):
         self.is_running = True
         logger.info("启动网格交易...")
         
-        # 初始放置网格订单
-        self.place_grid_orders(upper_price, lower_price, num_grids, total_investment)
+        # 有网格参数一致的快照时与交易所对账恢复，否则放置网格订单(与现有挂单比对，只改动不一致的部分)
+        grid_params = self._make_grid_params(upper_price, lower_price, num_grids, total_investment)
+        if not (self.state_path and self.warm_start(grid_params)):
+            self.place_grid_orders(upper_price, lower_price, num_grids, total_investment)
         
         flag = 1
         while self.is_running:
@@ -163,7 +501,7 @@ class OKXGridTrader(OKXTrading):
         # 获取当前持仓
         for attempt in range(max_retries):
             try:
-                positions = self.get_eth_position()
+                positions = self.get_position(self.inst_id)
                 if positions and 'data' in positions and positions['data']:
                     break
                 time.sleep(retry_delay)
@@ -173,13 +511,15 @@ class OKXGridTrader(OKXTrading):
                     logger.error("获取持仓信息失败，跳过本次重平衡")
                     return
                 time.sleep(retry_delay)
+        self.last_position = self._position_size(positions)
         
         # 获取当前价格
         for attempt in range(max_retries):
             try:
-                price_response = self.get_eth_price()
+                price_response = self.get_price(self.inst_id)
                 if price_response and 'data' in price_response and price_response['data']:
                     current_price = float(price_response['data'][0]['last'])
+                    self.indicators.update(current_price)
                     break
                 time.sleep(retry_delay)
             except Exception as e:
@@ -189,37 +529,237 @@ class OKXGridTrader(OKXTrading):
                     return
                 time.sleep(retry_delay)
         
-        # 检查是否有成交的订单
-        for attempt in range(max_retries):
-            try:
-                open_orders = self.get_open_orders()
-                if not open_orders or 'data' not in open_orders or not open_orders['data']:
-                    # 如果没有未完成订单，重新放置网格
-                    try:
-                        self.place_grid_orders(
-                            upper_price=current_price * 1.05,  # 上限设为当前价格的105%
-                            lower_price=current_price * 0.95,  # 下限设为当前价格的95%
-                            num_grids=10,  # 默认10个网格
-                            total_investment=1000  # 默认投资1000 USDT
-                        )
-                        logger.info("网格订单重新放置成功")
-                    except Exception as e:
-                        logger.error(f"重新放置网格订单失败: {str(e)}")
-                break
-            except Exception as e:
-                logger.error(f"检查订单状态失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
-                if attempt == max_retries - 1:
-                    logger.error("检查订单状态失败，跳过本次重平衡")
-                    return
-                time.sleep(retry_delay)
+        # 订单状态以本地订单簿为准，只在到达对账间隔时查询交易所；
+        # counter_orders 时每次检查都对账，成交后尽快挂反向订单
+        if self.counter_orders or self.orders.needs_reconcile():
+            for attempt in range(max_retries):
+                try:
+                    open_orders = self.get_open_orders(self.inst_id)
+                    self.record_fills(self.orders.reconcile(open_orders.get('data') or [])['missing'])
+                    self.save_state()
+                    break
+                except Exception as e:
+                    logger.error(f"检查订单状态失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
+                    if attempt == max_retries - 1:
+                        logger.error("检查订单状态失败，跳过本次重平衡")
+                        return
+                    time.sleep(retry_delay)
+        
+        if not self.orders.open_orders():
+            # 如果没有未完成订单，重新放置网格
+            self._replace_grid(current_price)
+    
+    def on_price_update(self, price):
+        """
+        处理一次行情推送
+        :param price: 最新成交价
+        :return: 价格是否已超出当前网格区间，需要重新布置网格
+        """
+        self.indicators.update(price)
+        if not self.grid_params:
+            return False
+        return not (self.grid_params['lower_price'] <= price <= self.grid_params['upper_price'])
+    
+    def recenter_grid(self, price, tick_time=None):
+        """
+        以当前价格为中心、保持原区间宽度重新布置网格
+        :param tick_time: 收到触发行情时的 time.perf_counter()，用于记录行情到下单的延迟
+        """
+        params = self.grid_params
+        half_width = (params['upper_price'] - params['lower_price']) / 2
+        logger.info(f"价格 {price} 超出网格区间，重新布置网格")
+        self.place_grid_orders(price + half_width, price - half_width,
+                               params['num_grids'], params['total_investment'])
+        if tick_time is not None:
+            observe_tick_to_order('okx_grid', tick_time)
+    
+    async def run_grid_trading_ws(self, upper_price, lower_price, num_grids, total_investment,
+                                  inst_id=None, url=None, check_interval=60, record_path=None, private_url=None):
+        """
+        事件驱动的网格交易：订阅 tickers 频道，每次价格推送都执行网格逻辑；
+        use_order_book 时在同一连接上订阅 books 频道维护本地订单簿；
+        有API凭证时登录私有频道订阅 orders，成交推送即时交给 on_order_update 挂反向订单
+        REST 下单在单独线程中串行执行，不阻塞行情接收和心跳
+        :param inst_id: 订阅的交易对，默认为网格交易对
+        :param url: WebSocket 地址，默认按模拟盘/实盘选择
+        :param check_interval: 订单状态兜底检查间隔(秒)
+        :param record_path: 记录原始推送消息的文件，可用于本地回放
+        :param private_url: 私有频道地址，默认按模拟盘/实盘选择
+        """
+        from okx_ws import (OKXPublicStream, OKXPrivateStream, OKX_WS_PUBLIC_URL, OKX_WS_PUBLIC_SIM_URL,
+                            OKX_WS_PRIVATE_URL, OKX_WS_PRIVATE_SIM_URL)
+        
+        inst_id = inst_id or self.inst_id
+        self.is_running = True
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1)
+        pending = None
+        
+        def on_message(arg, data):
+            nonlocal pending
+            if arg.get('channel') != 'tickers':
+                self.book_feed.on_message(arg, data)
+                return
+            tick_time = time.perf_counter()
+            for tick in data:
+                price = float(tick.get('last') or tick.get('px'))
+                if self.on_price_update(price) and (pending is None or pending.done()):
+                    pending = loop.run_in_executor(executor, self.recenter_grid, price, tick_time)
+        
+        def on_order_message(arg, data):
+            for order in data:
+                loop.run_in_executor(executor, self.on_order_update, order)
+        
+        async def periodic_check():
+            while self.is_running:
+                await asyncio.sleep(check_interval)
+                if self.is_running and (pending is None or pending.done()):
+                    await self.rebalance_grid_async(executor)
+        
+        url = url or (OKX_WS_PUBLIC_SIM_URL if self.flag == "1" else OKX_WS_PUBLIC_URL)
+        self.stream = OKXPublicStream([{'channel': 'tickers', 'instId': inst_id}], on_message,
+                                      url=url, record_path=record_path)
+        if self.use_order_book:
+            from order_book import OrderBookFeed
+            
+            self.book_feed = OrderBookFeed([inst_id], stream=self.stream)
+            self.stream.channels.extend(self.book_feed.channels())
+        if self.credentials is not None:
+            private_url = private_url or (OKX_WS_PRIVATE_SIM_URL if self.flag == "1" else OKX_WS_PRIVATE_URL)
+            self.private_stream = OKXPrivateStream([{'channel': 'orders', 'instType': 'SPOT', 'instId': inst_id}],
+                                                   on_order_message, self.credentials, url=private_url)
+        else:
+            logger.warning("没有API凭证，不订阅订单推送，成交只在定期检查时发现")
+        logger.info("启动事件驱动网格交易...")
+        grid_params = self._make_grid_params(upper_price, lower_price, num_grids, total_investment)
+        if not (self.state_path and await loop.run_in_executor(executor, self.warm_start, grid_params)):
+            await loop.run_in_executor(executor, self.place_grid_orders,
+                                       upper_price, lower_price, num_grids, total_investment)
+        checker = asyncio.ensure_future(periodic_check())
+        private = asyncio.ensure_future(self.private_stream.run()) if self.private_stream is not None else None
+        try:
+            await self.stream.run()
+        finally:
+            checker.cancel()
+            if private is not None:
+                await self.private_stream.stop()
+                private.cancel()
+            executor.shutdown(wait=True)
+            if self.async_client is not None:
+                await self.async_client.close()
+                self.async_client = None
+    
+    def start_grid_trading_ws(self, upper_price, lower_price, num_grids, total_investment, **kwargs):
+        """启动事件驱动网格交易（阻塞运行，参数同 run_grid_trading_ws）"""
+        asyncio.run(self.run_grid_trading_ws(upper_price, lower_price, num_grids, total_investment, **kwargs))
+    
+    def _replace_grid(self, current_price):
+        """没有未完成订单时，以当前价格为中心按当前网格参数重新放置网格，尚无网格参数时使用默认参数"""
+        try:
+            if self.grid_params:
+                self.recenter_grid(current_price)
+            else:
+                self.place_grid_orders(
+                    upper_price=current_price * 1.05,  # 上限设为当前价格的105%
+                    lower_price=current_price * 0.95,  # 下限设为当前价格的95%
+                    num_grids=10,  # 默认10个网格
+                    total_investment=1000  # 默认投资1000 USDT
+                )
+            logger.info("网格订单重新放置成功")
+        except Exception as e:
+            logger.error(f"重新放置网格订单失败: {str(e)}")
+    
+    async def rebalance_grid_async(self, executor=None):
+        """
+        重新平衡网格的 asyncio 版本：持仓、价格和未完成订单通过共享连接池并发获取，
+        一次重平衡只需一次往返；需要重新下单时在 executor 中执行同步下单逻辑。
+        使用自定义 backend(如模拟交易所)时没有对应的 REST 接口，直接在 executor 中执行 rebalance_grid
+        """
+        loop = asyncio.get_running_loop()
+        if self.credentials is None:
+            await loop.run_in_executor(executor, self.rebalance_grid)
+            return
+        try:
+            if self.async_client is None:
+                from okx_async import AsyncOKXTrading
+                # 与同步客户端共用凭证和限流器，两条路径合计不超过接口限速
+                self.async_client = AsyncOKXTrading(is_simulated=self.flag == "1", rate_limiter=self.rate_limiter,
+                                                    credentials=self.credentials)
+            if self.quote_cache is None:
+                positions, price_response, open_orders = await self.async_client.fetch_rebalance_state(self.inst_id)
+            else:
+                # 行情经共享缓存获取，与其它实例合并查询
+                positions, price_response, open_orders = await asyncio.gather(
+                    self.async_client.get_positions(instId=self.inst_id),
+                    loop.run_in_executor(executor, self.get_price, self.inst_id),
+                    self.async_client.get_open_orders(self.inst_id),
+                )
+        except Exception as e:
+            logger.error(f"获取重平衡数据失败，跳过本次重平衡: {str(e)}")
+            return
+        
+        if not price_response or not price_response.get('data'):
+            logger.error("获取价格信息失败，跳过本次重平衡")
+            return
+        current_price = float(price_response['data'][0]['last'])
+        self.indicators.update(current_price)
+        self.last_position = self._position_size(positions)
+        
+        # 并发查询已包含未完成订单，顺便完成对账
+        missing = self.orders.reconcile((open_orders or {}).get('data') or [])['missing']
+        if missing:
+            await loop.run_in_executor(executor, self.record_fills, missing)
+            self.save_state()
+        if not self.orders.open_orders():
+            await loop.run_in_executor(executor, self._replace_grid, current_price)
     
     def stop_grid_trading(self):
         """停止网格交易"""
         self.is_running = False
+        if self.stream is not None:
+            self.stream.is_running = False
+        if self.private_stream is not None:
+            self.private_stream.is_running = False
         self.cancel_all_orders()
+        self.save_state()
         logger.info("网格交易已停止")
 
 
+def create_grid_traders(inst_ids, is_simulated=True, backend=None, **kwargs):
+    """
+    在一个进程内为多个交易对创建网格交易，共用API客户端、限流器、交易产品信息表、行情缓存和交易日志
+    :param inst_ids: 交易对列表
+    :param kwargs: 其余参数传给 OKXGridTrader
+    :return: {inst_id: OKXGridTrader}
+    """
+    traders = {}
+    for inst_id in inst_ids:
+        trader = OKXGridTrader(is_simulated=is_simulated, backend=backend, inst_id=inst_id, **kwargs)
+        if not traders:
+            # 第一个实例创建的客户端和共享组件传给其余实例
+            backend = (trader.accountAPI, trader.tradeAPI, trader.marketAPI)
+            kwargs.setdefault('rate_limiter', trader.rate_limiter)
+            kwargs.setdefault('instruments', trader.instruments)
+            kwargs.setdefault('journal', trader.journal)
+            kwargs.setdefault('quote_cache', trader.quote_cache)
+            credentials = trader.credentials
+        else:
+            trader.credentials = credentials
+        traders[inst_id] = trader
+    return traders
+
+
+async def run_grid_traders(traders, grid_params, **kwargs):
+    """
+    在同一个事件循环中运行多个交易对的事件驱动网格
+    :param traders: create_grid_traders 的返回值
+    :param grid_params: {inst_id: (upper_price, lower_price, num_grids, total_investment)}
+    :param kwargs: 其余参数传给 run_grid_trading_ws
+    """
+    await asyncio.gather(*(trader.run_grid_trading_ws(*grid_params[inst_id], **kwargs)
+                           for inst_id, trader in traders.items()))
+
+
 
 def send_feishu_alert(message):
     payload = {
@@ -233,26 +773,35 @@ def send_feishu_alert(message):
     # 调用示例
     
 
-def main():
+def main(is_simulated=True, upper_price=None, lower_price=None, num_grids=10, total_investment=1000,
+         check_interval=60, use_ws=False, state_path=None, inst_id="ETH-USDT"):
+    """
+    运行现货网格交易
+    :param upper_price: 网格上限价格，默认当前价格的102%
+    :param lower_price: 网格下限价格，默认当前价格的98%
+    :param use_ws: 是否订阅 WebSocket 行情事件驱动运行
+    :param state_path: 见 OKXGridTrader
+    :param inst_id: 交易对
+    """
     try:
         # 初始化网格交易类
-        grid_trader = OKXGridTrader(is_simulated=True)
+        grid_trader = OKXGridTrader(is_simulated=is_simulated, state_path=state_path, inst_id=inst_id)
         
         # 查询账户余额
         logger.info("\n=== 账户余额信息 ===")
         balance_response = grid_trader.get_account_balance()
         
         
-        # 获取当前ETH价格
-        price_response = grid_trader.get_eth_price()
+        # 获取当前价格
+        price_response = grid_trader.get_price(inst_id)
         current_price = float(price_response['data'][0]['last'])
-        logger.info(f"\n当前ETH价格: {current_price} USDT")
+        logger.info(f"\n当前{inst_id}价格: {current_price}")
         
         # 设置网格参数
-        upper_price = current_price * 1.02  # 上限设为当前价格的110%
-        lower_price = current_price * 0.98  # 下限设为当前价格的90%
-        num_grids = 10  # 10个网格
-        total_investment = 1000  # 投资1000 USDT
+        if upper_price is None:
+            upper_price = current_price * 1.02  # 上限设为当前价格的102%
+        if lower_price is None:
+            lower_price = current_price * 0.98  # 下限设为当前价格的98%
         
         logger.info(f"\n=== 网格交易参数 ===")
         logger.info(f"价格区间: {lower_price:.2f} - {upper_price:.2f} USDT")
@@ -260,12 +809,17 @@ def main():
         logger.info(f"总投资额: {total_investment} USDT")
         
         # 启动网格交易
-        grid_trader.start_grid_trading(
-            upper_price=upper_price,
-            lower_price=lower_price,
-            num_grids=num_grids,
-            total_investment=total_investment
-        )
+        if use_ws:
+            grid_trader.start_grid_trading_ws(upper_price, lower_price, num_grids, total_investment,
+                                              check_interval=check_interval)
+        else:
+            grid_trader.start_grid_trading(
+                upper_price=upper_price,
+                lower_price=lower_price,
+                num_grids=num_grids,
+                total_investment=total_investment,
+                check_interval=check_interval
+            )
         
     except KeyboardInterrupt:
         logger.info("用户中断，停止网格交易")
@@ -1,6 +1,3 @@
-import ccxt
-import pandas as pd
-from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import okx.Account as Account
@@ -11,6 +8,12 @@ import requests
 from requests.exceptions import RequestException
 import logging
 import json
+import threading
+import httpx
+from rate_limit import (RateLimiter, OKX_SDK_ENDPOINTS, backoff_delay, retry_after,
+                        is_rate_limited)
+from metrics import track, record_response_error, REQUEST_RETRIES
+from instruments import InstrumentCache
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -55,63 +58,139 @@ def format_json_response(response):
         return str(response)
 
 class OKXTrading:
-    def __init__(self, is_simulated=True):
+    BATCH_SIZE = 20  # OKX 批量下单/撤单接口单次最多 20 个订单
+
+    def __init__(self, is_simulated=True, backend=None, rate_limiter=None, quote_cache=None, instruments=None):
         """
         初始化OKX交易类
         :param is_simulated: 是否为模拟交易
+        :param backend: (accountAPI, tradeAPI, marketAPI)，如 SimulatedExchange.okx_backend()，
+                        传入时不读取API凭证、不创建SDK客户端
+        :param rate_limiter: 自定义 RateLimiter，默认按 OKX 公布的接口限速
+        :param quote_cache: QuoteCache，传入后行情查询经缓存合并，如 quote_cache.default_quote_cache()
+        :param instruments: InstrumentCache 交易产品信息表，多个实例可共用；默认首次下单时加载现货交易对
         """
         self.flag = "1" if is_simulated else "0"  # 1: 模拟盘, 0: 实盘
         self.max_retries = 3
-        self.retry_delay = 2  # 重试延迟秒数
+        self.retry_delay = 0.5  # 重试退避基准秒数
+        self.max_retry_delay = 8  # 单次重试最长等待秒数
+        self.rate_limiter = rate_limiter or RateLimiter()  # 按接口限流
+        self.quote_cache = quote_cache
+        self._last_response = threading.local()  # 当前线程最近一次 HTTP 响应，用于读取限流提示
+        self.instruments = instruments if instruments is not None else InstrumentCache(
+            lambda inst_type: self._make_request(self.accountAPI.get_instruments, instType=inst_type))
+        
+        self.credentials = None  # API凭证，用于登录私有 WebSocket 频道
+        if backend is not None:
+            self.accountAPI, self.tradeAPI, self.marketAPI = backend
+            return
         
         # 获取API凭证
         api_key, secret_key, passphrase = get_api_credentials(is_simulated)
+        self.credentials = (api_key, secret_key, passphrase)
         
         # 配置API客户端
         self.accountAPI = Account.AccountAPI(api_key, secret_key, passphrase, False, self.flag)
         self.tradeAPI = Trade.TradeAPI(api_key, secret_key, passphrase, False, self.flag, debug=True)
         self.marketAPI = MarketData.MarketAPI(api_key, secret_key, passphrase, False, self.flag)
+        # SDK 只返回响应 JSON，通过 httpx 的响应钩子保留响应头
+        for api in (self.accountAPI, self.tradeAPI, self.marketAPI):
+            api.event_hooks = dict(api.event_hooks, response=api.event_hooks['response'] + [self._remember_response])
         
         # 设置请求超时
         self.timeout = 10
 
-    def _make_request(self, func, *args, **kwargs):
-        """通用请求处理函数，包含重试机制"""
+    def _remember_response(self, response):
+        self._last_response.value = response
+
+    def _make_request(self, func, *args, tokens=1, **kwargs):
+        """
+        通用请求处理函数：按接口限流，网络错误或服务端限流时以带抖动的指数退避重试，
+        服务端限流响应带 Retry-After 时按其等待
+        :param tokens: 占用的限流配额，批量接口传订单数
+        """
+        endpoint = OKX_SDK_ENDPOINTS.get(getattr(func, '__name__', ''), getattr(func, '__name__', str(func)))
         for attempt in range(self.max_retries):
+            self.rate_limiter.acquire(endpoint, tokens)
+            self._last_response.value = None
             try:
-                return func(*args, **kwargs)
-            except RequestException as e:
+                with track('okx', endpoint):
+                    response = func(*args, **kwargs)
+            except (RequestException, httpx.TransportError) as e:
                 logger.warning(f"请求失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                else:
-                    logger.error(f"达到最大重试次数，请求失败: {str(e)}")
-                    raise
+                    self.rate_limiter.record(endpoint, 'retries')
+                    REQUEST_RETRIES.inc('okx', endpoint)
+                    time.sleep(backoff_delay(attempt, self.retry_delay, self.max_retry_delay))
+                    continue
+                logger.error(f"达到最大重试次数，请求失败: {str(e)}")
+                raise
             except Exception as e:
                 logger.error(f"发生未知错误: {str(e)}")
                 raise
+            
+            record_response_error('okx', endpoint, response)
+            if is_rate_limited(response) and attempt < self.max_retries - 1:
+                # 服务端限流：优先使用 Retry-After 提示，暂停该接口的令牌桶，下一次请求在 acquire 中等待
+                delay = backoff_delay(attempt, self.retry_delay, self.max_retry_delay,
+                                      retry_after(getattr(self._last_response, 'value', None)))
+                logger.warning(f"接口 {endpoint} 触发限流 ({response.get('msg')})，{delay:.2f} 秒后重试")
+                self.rate_limiter.record(endpoint, 'rate_limited')
+                self.rate_limiter.record(endpoint, 'retries')
+                REQUEST_RETRIES.inc('okx', endpoint)
+                self.rate_limiter.pause(endpoint, delay)
+                continue
+            return response
+
+    def get_rate_limit_stats(self):
+        """
+        各接口限流统计
+        :return: {接口: {'requests', 'throttled_time', 'throttled_count', 'rate_limited', 'retries'}}
+        """
+        return self.rate_limiter.stats()
 
     def get_positions(self):
         """获取所有持仓信息"""
         return self._make_request(self.accountAPI.get_positions)
 
+    def get_position(self, instId="ETH-USDT"):
+        """获取指定交易对的持仓信息"""
+        return self._make_request(self.accountAPI.get_positions, instId=instId)
+
     def get_eth_position(self):
         """获取ETH持仓信息"""
-        return self._make_request(self.accountAPI.get_positions, instId="ETH-USDT")
+        return self.get_position("ETH-USDT")
+
+    def get_price(self, instId="ETH-USDT"):
+        """获取指定交易对的最新行情"""
+        if self.quote_cache is None:
+            return self._make_request(self.marketAPI.get_ticker, instId=instId)
+        return self.quote_cache.get(f"okx:{instId}",
+                                    lambda: self._make_request(self.marketAPI.get_ticker, instId=instId),
+                                    valid=lambda response: response.get('code') == '0')
 
     def get_eth_price(self):
         """获取ETH当前价格"""
-        return self._make_request(self.marketAPI.get_ticker, instId="ETH-USDT")
+        return self.get_price("ETH-USDT")
 
-    def place_eth_order(self, side, size, price=None):
+    def _build_order_params(self, side, size, price=None, instId="ETH-USDT"):
         """
-        下单ETH
-        :param side: 'buy' 或 'sell'
-        :param size: 数量
-        :param price: 价格（市价单可不传）
+        构造下单参数，已知交易对精度时在本地把价格取整到 tickSz、数量向下取整到 lotSz
+        :return: 下单参数，数量不足最小下单数量时返回 None(不发送必然被拒的请求)
         """
+        instrument = self.instruments.get(instId)
+        if instrument is not None:
+            if price:
+                price = instrument.round_price(price, side)
+            if price or side == 'sell':
+                # 现货市价买单的 sz 为计价币金额，不按 lotSz 取整
+                rounded = instrument.round_size(size)
+                if rounded is None:
+                    logger.warning(f"{instId} 下单数量 {size} 小于最小下单数量 {instrument.min_sz}，跳过")
+                    return None
+                size = rounded
         params = {
-            "instId": "ETH-USDT",
+            "instId": instId,
             "tdMode": "cash",  # 现货交易
             "side": side,
             "ordType": "limit" if price else "market",
@@ -119,9 +198,92 @@ class OKXTrading:
         }
         if price:
             params["px"] = str(price)
-        
+        return params
+
+    def place_order(self, side, size, price=None, instId="ETH-USDT"):
+        """
+        下单
+        :param side: 'buy' 或 'sell'
+        :param size: 数量
+        :param price: 价格（市价单可不传）
+        :param instId: 交易对
+        """
+        params = self._build_order_params(side, size, price, instId)
+        if params is None:
+            return None
         return self._make_request(self.tradeAPI.place_order, **params)
 
+    def place_eth_order(self, side, size, price=None):
+        """
+        下单ETH
+        :param side: 'buy' 或 'sell'
+        :param size: 数量
+        :param price: 价格（市价单可不传）
+        """
+        return self.place_order(side, size, price, "ETH-USDT")
+
+    def _batch_request(self, func, orders, action):
+        """
+        分批调用批量接口，每批最多 BATCH_SIZE 个订单
+        :return: 与 orders 一一对应的结果列表，每项包含 ordId/clOrdId/sCode/sMsg；
+                 整批请求失败时该批每项的 sCode 为 'request_error'
+        """
+        results = []
+        for start in range(0, len(orders), self.BATCH_SIZE):
+            chunk = orders[start:start + self.BATCH_SIZE]
+            try:
+                response = self._make_request(func, chunk, tokens=len(chunk))
+                data = response.get('data') or []
+            except Exception as e:
+                logger.error(f"批量{action}请求失败: {str(e)}")
+                response, data = {}, []
+                error = str(e)
+            else:
+                error = response.get('msg', '')
+            for i, order in enumerate(chunk):
+                item = data[i] if i < len(data) else {
+                    'ordId': order.get('ordId', ''), 'clOrdId': order.get('clOrdId', ''),
+                    'sCode': 'request_error', 'sMsg': error,
+                }
+                results.append(item)
+            failed = [item for item in results[start:] if item.get('sCode') != '0']
+            if failed:
+                logger.warning(f"批量{action}: {len(chunk) - len(failed)}/{len(chunk)} 成功, 失败: "
+                               f"{[(item.get('ordId') or item.get('clOrdId'), item.get('sMsg')) for item in failed]}")
+        return results
+
+    def place_orders_batch(self, orders):
+        """
+        批量下单，按每批最多 20 个调用 OKX 批量下单接口
+        :param orders: 下单参数列表，可由 _build_order_params 构造
+        :return: 与 orders 一一对应的结果列表，sCode 为 '0' 表示成功
+        """
+        return self._batch_request(self.tradeAPI.place_multiple_orders, orders, "下单")
+
+    def cancel_order(self, instId, ordId):
+        """
+        撤销单个订单
+        :return: 撤单结果 {'ordId', 'clOrdId', 'sCode', 'sMsg'}，sCode 为 '0' 表示成功；
+                 请求失败时 sCode 为 'request_error'
+        """
+        try:
+            response = self._make_request(self.tradeAPI.cancel_order, instId=instId, ordId=ordId)
+        except Exception as e:
+            return {'ordId': ordId, 'clOrdId': '', 'sCode': 'request_error', 'sMsg': str(e)}
+        data = (response or {}).get('data') or []
+        if not data:
+            return {'ordId': ordId, 'clOrdId': '', 'sCode': 'request_error', 'sMsg': (response or {}).get('msg', '')}
+        return data[0]
+
+    def cancel_orders_batch(self, orders):
+        """
+        批量撤单，按每批最多 20 个调用 OKX 批量撤单接口
+        :param orders: [{'instId': ..., 'ordId': ...}, ...]
+        :return: 与 orders 一一对应的结果列表，sCode 为 '0' 表示成功
+        """
+        orders = [{'instId': order['instId'], 'ordId': order['ordId']} for order in orders]
+        return self._batch_request(self.tradeAPI.cancel_multiple_orders, orders, "撤单")
+
     def get_account_balance(self, ccy=None):
         logger.info("获取账户余额信息")
         """
@@ -196,6 +358,16 @@ class OKXTrading:
             logger.error(f"获取交易历史时出错: {str(e)}")
             return None
 
+    def get_order(self, instId, ordId='', clOrdId=''):
+        """
+        查询单个订单详情
+        :return: 订单对象，查询失败或订单不存在时返回 None
+        """
+        response = self._make_request(self.tradeAPI.get_order, instId=instId, ordId=ordId, clOrdId=clOrdId)
+        if not response or response.get('code') != '0' or not response.get('data'):
+            return None
+        return response['data'][0]
+
     def get_open_orders(self, symbol='ETH-USDT'):
         """获取当前未完成的订单"""
         params = {
@@ -203,30 +375,14 @@ class OKXTrading:
             'instId': symbol
         }
         orders = self._make_request(self.tradeAPI.get_order_list, **params)
-        order_list = []
-        for order in orders['data']:
-            order_info = {
-                '订单ID': order['ordId'],
-                '交易对': order['instId'],
-                '方向': '买入' if order['side'] == 'buy' else '卖出',
-                '价格': order['px'],
-                '数量': order['sz'],
-                '状态': order['state'],
-                '创建时间': order['cTime']
-            }
-            order_list.append(order_info)
-            logger.info(f"订单信息: {order_info}")
+        logger.debug(f"未完成订单数量: {len(orders.get('data') or [])}")
         return orders
     
     def cancel_all_orders(self):
         """取消所有未完成的订单"""
         open_orders = self.get_open_orders()
         if open_orders and 'data' in open_orders and open_orders['data']:
-            for order in open_orders['data']:
-                self.tradeAPI.cancel_order(
-                    instId=order['instId'],
-                    ordId=order['ordId']
-                )
+            self.cancel_orders_batch(open_orders['data'])
         logger.info("已取消所有未完成订单")
 
     def get_order_book(self, symbol='ETH-USDT', limit=5):
@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+OKX_WS_PUBLIC_URL = "wss://ws.okx.com:8443/ws/v5/public"
+OKX_WS_PUBLIC_SIM_URL = "wss://wspap.okx.com:8443/ws/v5/public?brokerId=9999"
+OKX_WS_PRIVATE_URL = "wss://ws.okx.com:8443/ws/v5/private"
+OKX_WS_PRIVATE_SIM_URL = "wss://wspap.okx.com:8443/ws/v5/private?brokerId=9999"
+
+
+class OKXPublicStream:
+    """
+    OKX 公共频道 WebSocket 订阅
+    断线后按指数退避自动重连并重新订阅；超过 heartbeat 秒未收到消息时发送 'ping'，
+    pong_timeout 秒内未收到 'pong' 视为连接失效
+    :param channels: 订阅参数列表，如 [{'channel': 'tickers', 'instId': 'ETH-USDT'}]
+    :param on_message: 回调 on_message(arg, data)，arg 为频道参数(带 action 的推送如 books 频道附加 action 字段)，
+                       data 为推送数据列表
+    :param url: WebSocket 地址
+    :param record_path: 记录原始推送消息的文件(JSON Lines)，可用于本地回放
+    """
+
+    def __init__(self, channels, on_message, url=OKX_WS_PUBLIC_URL, heartbeat=25, pong_timeout=5,
+                 max_reconnect_delay=30, record_path=None):
+        self.channels = list(channels)
+        self.on_message = on_message
+        self.url = url
+        self.heartbeat = heartbeat
+        self.pong_timeout = pong_timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.record_path = record_path
+        self.is_running = False
+        self.reconnects = 0
+        self.messages = 0
+        self.websocket = None
+
+    async def _subscribe(self, websocket):
+        await websocket.send(json.dumps({"op": "subscribe", "args": self.channels}))
+
+    async def resubscribe(self, channels):
+        """在当前连接上退订并重新订阅频道，books 等频道会重新推送全量数据"""
+        if self.websocket is None:
+            return
+        await self.websocket.send(json.dumps({"op": "unsubscribe", "args": channels}))
+        await self.websocket.send(json.dumps({"op": "subscribe", "args": channels}))
+
+    async def _recv(self, websocket):
+        """接收一条消息，空闲时发送心跳"""
+        try:
+            return await asyncio.wait_for(websocket.recv(), timeout=self.heartbeat)
+        except asyncio.TimeoutError:
+            await websocket.send('ping')
+            message = await asyncio.wait_for(websocket.recv(), timeout=self.pong_timeout)
+            return message
+
+    def _handle(self, message, record_file):
+        if message == 'pong':
+            return
+        if record_file:
+            record_file.write(message + '\n')
+        payload = json.loads(message)
+        event = payload.get('event')
+        if event == 'error':
+            logger.error(f"WebSocket 订阅错误: {payload.get('code')} {payload.get('msg')}")
+            return
+        if event:
+            logger.info(f"WebSocket 事件: {event} {payload.get('arg', '')}")
+            return
+        if 'data' in payload:
+            self.messages += 1
+            arg = payload.get('arg', {})
+            if 'action' in payload:
+                arg = dict(arg, action=payload['action'])
+            self.on_message(arg, payload['data'])
+
+    async def run(self):
+        """运行订阅循环，直到调用 stop()"""
+        import websockets
+
+        self.is_running = True
+        delay = 1
+        record_file = open(self.record_path, 'a', encoding='utf-8') if self.record_path else None
+        try:
+            while self.is_running:
+                try:
+                    async with websockets.connect(self.url, ping_interval=None) as websocket:
+                        self.websocket = websocket
+                        await self._subscribe(websocket)
+                        logger.info(f"WebSocket 已连接并订阅: {self.channels}")
+                        delay = 1
+                        while self.is_running:
+                            self._handle(await self._recv(websocket), record_file)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if not self.is_running:
+                        break
+                    self.reconnects += 1
+                    wait = min(delay, self.max_reconnect_delay) * (0.5 + random.random() / 2)
+                    logger.warning(f"WebSocket 连接中断: {e!r}，{wait:.1f} 秒后重连 (第 {self.reconnects} 次)")
+                    await asyncio.sleep(wait)
+                    delay *= 2
+                finally:
+                    self.websocket = None
+        finally:
+            if record_file:
+                record_file.close()
+
+    async def stop(self):
+        self.is_running = False
+        if self.websocket is not None:
+            await self.websocket.close()
+
+
+class OKXPrivateStream(OKXPublicStream):
+    """
+    OKX 私有频道 WebSocket 订阅(如 orders 频道)，每次连接先登录再订阅，其余同 OKXPublicStream
+    :param credentials: (api_key, secret_key, passphrase)
+    """
+
+    def __init__(self, channels, on_message, credentials, url=OKX_WS_PRIVATE_URL, **kwargs):
+        super().__init__(channels, on_message, url=url, **kwargs)
+        self.credentials = credentials
+
+    def _login_args(self):
+        api_key, secret_key, passphrase = self.credentials
+        timestamp = str(int(time.time()))
+        sign = base64.b64encode(hmac.new(secret_key.encode(), f"{timestamp}GET/users/self/verify".encode(),
+                                         hashlib.sha256).digest()).decode()
+        return [{'apiKey': api_key, 'passphrase': passphrase, 'timestamp': timestamp, 'sign': sign}]
+
+    async def _subscribe(self, websocket):
+        await websocket.send(json.dumps({"op": "login", "args": self._login_args()}))
+        while True:
+            payload = json.loads(await asyncio.wait_for(websocket.recv(), timeout=self.heartbeat))
+            if payload.get('event') == 'login':
+                break
+            if payload.get('event') == 'error':
+                raise ConnectionError(f"WebSocket 登录失败: {payload.get('code')} {payload.get('msg')}")
+        await super()._subscribe(websocket)
+
+
+def load_recording(path):
+    """读取 OKXPublicStream 记录的消息文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+async def serve_replay(messages, host='127.0.0.1', port=0, interval=0.0, drop_after=None):
+    """
+    启动本地回放服务器，模拟 OKX 公共频道：
+    响应 subscribe 请求和 'ping' 心跳，然后按顺序推送录制的消息；
+    连接建立后的 subscribe/unsubscribe 请求只回复事件确认，不会插入新的推送
+    :param messages: 消息列表(字符串或字典)
+    :param interval: 每条消息之间的间隔秒数
+    :param drop_after: 推送多少条后主动断开连接，用于测试重连；重连后从断点继续推送
+    :return: websockets 服务器对象，server.sockets[0].getsockname()[1] 为实际端口
+    """
+    import websockets
+
+    messages = [m if isinstance(m, str) else json.dumps(m) for m in messages]
+    state = {'sent': 0}
+
+    async def handler(websocket, *args):
+        request = json.loads(await websocket.recv())
+        await websocket.send(json.dumps({'event': request.get('op'), 'arg': (request.get('args') or [{}])[0]}))
+
+        async def answer_pings():
+            async for message in websocket:
+                if message == 'ping':
+                    await websocket.send('pong')
+                else:
+                    request = json.loads(message)
+                    await websocket.send(json.dumps({'event': request.get('op'),
+                                                     'arg': (request.get('args') or [{}])[0]}))
+
+        pinger = asyncio.ensure_future(answer_pings())
+        try:
+            sent_here = 0
+            while state['sent'] < len(messages):
+                if drop_after is not None and sent_here >= drop_after:
+                    await websocket.close()
+                    return
+                await websocket.send(messages[state['sent']])
+                state['sent'] += 1
+                sent_here += 1
+                if interval:
+                    await asyncio.sleep(interval)
+            await websocket.wait_closed()
+        finally:
+            pinger.cancel()
+
+    return await websockets.serve(handler, host, port)
+
+
+def ticker_message(inst_id, last, ts=None):
+    """构造 tickers 频道推送消息，便于生成回放数据"""
+    return {
+        'arg': {'channel': 'tickers', 'instId': inst_id},
+        'data': [{'instId': inst_id, 'last': str(last), 'ts': str(ts or int(time.time() * 1000))}],
+    }
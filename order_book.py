@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from okx_ws import OKXPublicStream, OKX_WS_PUBLIC_URL
+
+logger = logging.getLogger(__name__)
+
+CHECKSUM_LEVELS = 25  # OKX 校验和使用买卖各前 25 档
+
+
+class BookSide:
+    """
+    订单簿一侧，价格档位按从优到劣排列在并列的数组中(买盘降序、卖盘升序)，
+    下标 0 为最优价；按价格定位为二分查找，保留推送中的原始价格/数量字符串用于校验和
+    """
+
+    def __init__(self, descending):
+        self.descending = descending
+        self.keys = []  # 排序键，买盘为 -price
+        self.prices = []
+        self.sizes = []
+        self.raw = []  # (价格字符串, 数量字符串)
+
+    def _key(self, price):
+        return -price if self.descending else price
+
+    def clear(self):
+        self.keys.clear()
+        self.prices.clear()
+        self.sizes.clear()
+        self.raw.clear()
+
+    def update(self, px, sz):
+        """更新一个价格档位，数量为 0 时删除该档位"""
+        price, size = float(px), float(sz)
+        key = self._key(price)
+        i = bisect_left(self.keys, key)
+        exists = i < len(self.keys) and self.keys[i] == key
+        if size == 0:
+            if exists:
+                del self.keys[i], self.prices[i], self.sizes[i], self.raw[i]
+        elif exists:
+            self.sizes[i] = size
+            self.raw[i] = (px, sz)
+        else:
+            self.keys.insert(i, key)
+            self.prices.insert(i, price)
+            self.sizes.insert(i, size)
+            self.raw.insert(i, (px, sz))
+
+    def truncate(self, levels):
+        if len(self.keys) > levels:
+            del self.keys[levels:], self.prices[levels:], self.sizes[levels:], self.raw[levels:]
+
+    def best(self):
+        """:return: (价格, 数量)，该侧为空时返回 None"""
+        return (self.prices[0], self.sizes[0]) if self.prices else None
+
+    def size_at(self, price):
+        """指定价格档位的挂单数量"""
+        key = self._key(float(price))
+        i = bisect_left(self.keys, key)
+        return self.sizes[i] if i < len(self.keys) and self.keys[i] == key else 0.0
+
+    def depth(self, price=None, levels=None):
+        """
+        累计挂单数量
+        :param price: 统计优于或等于该价格的档位
+        :param levels: 只统计前 levels 档
+        """
+        end = len(self.keys)
+        if price is not None:
+            end = bisect_right(self.keys, self._key(float(price)))
+        if levels is not None:
+            end = min(end, levels)
+        return sum(self.sizes[:end])
+
+    def vwap(self, size):
+        """
+        按当前挂单吃掉 size 数量的成交均价
+        :return: 均价，深度不足时返回 None
+        """
+        remaining, cost = float(size), 0.0
+        for price, level_size in zip(self.prices, self.sizes):
+            take = min(remaining, level_size)
+            cost += take * price
+            remaining -= take
+            if remaining <= 0:
+                return cost / float(size)
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class OrderBook:
+    """
+    由 OKX books 频道增量推送维护的本地 L2 订单簿
+    snapshot 推送重建订单簿，update 推送按档位增量更新；
+    update 的 prevSeqId 与上一条的 seqId 不连续(丢包)或校验和不一致时标记为未同步，
+    此后的增量推送被忽略，直到重新订阅收到新的 snapshot
+    :param inst_id: 交易对
+    :param max_levels: 每侧保留的最大档位数(books 频道为 400 档)
+    """
+
+    def __init__(self, inst_id, max_levels=400):
+        self.inst_id = inst_id
+        self.max_levels = max_levels
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.seq_id = None
+        self.ts = None
+        self.synced = False
+        self.updates = 0
+        self.gaps = 0
+        self.checksum_errors = 0
+        self.snapshots = 0
+
+    def apply(self, action, item):
+        """
+        应用一条 books 频道推送
+        :param action: 'snapshot' 或 'update'
+        :param item: 推送 data 中的一项 (asks/bids/ts/checksum/seqId/prevSeqId)
+        :return: 应用后订单簿是否处于同步状态，False 表示需要重新订阅
+        """
+        if action == 'snapshot':
+            self.bids.clear()
+            self.asks.clear()
+            self.snapshots += 1
+        elif not self.synced:
+            return False
+        else:
+            prev_seq_id = item.get('prevSeqId')
+            if prev_seq_id is not None and self.seq_id is not None and int(prev_seq_id) != self.seq_id:
+                self.gaps += 1
+                self.synced = False
+                logger.warning(f"{self.inst_id} 订单簿序号不连续: 期望 {self.seq_id}, 收到 {prev_seq_id}")
+                return False
+
+        for level in item.get('bids', ()):
+            self.bids.update(level[0], level[1])
+        for level in item.get('asks', ()):
+            self.asks.update(level[0], level[1])
+        self.bids.truncate(self.max_levels)
+        self.asks.truncate(self.max_levels)
+        if item.get('seqId') is not None:
+            self.seq_id = int(item['seqId'])
+        self.ts = int(item['ts']) if item.get('ts') else None
+        self.updates += 1
+
+        if item.get('checksum') is not None and self.checksum() != int(item['checksum']):
+            self.checksum_errors += 1
+            self.synced = False
+            logger.warning(f"{self.inst_id} 订单簿校验和不一致 (seqId {self.seq_id})")
+            return False
+        self.synced = True
+        return True
+
+    def checksum(self):
+        """
+        OKX 订单簿校验和：买卖各取前 25 档，按 买1价:买1量:卖1价:卖1量:... 交替拼接(一侧不足时跳过)，
+        取 CRC32 的有符号 32 位整数
+        """
+        parts = []
+        bids, asks = self.bids.raw, self.asks.raw
+        for i in range(CHECKSUM_LEVELS):
+            if i < len(bids):
+                parts.extend(bids[i])
+            if i < len(asks):
+                parts.extend(asks[i])
+        crc = zlib.crc32(':'.join(parts).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def best_bid(self):
+        best = self.bids.best()
+        return best[0] if best else None
+
+    def best_ask(self):
+        best = self.asks.best()
+        return best[0] if best else None
+
+    def mid(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        return (bid + ask) / 2 if bid is not None and ask is not None else None
+
+    def spread(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        return ask - bid if bid is not None and ask is not None else None
+
+    def size_at(self, side, price):
+        """
+        指定价格档位的挂单数量
+        :param side: 'bid' 或 'ask'
+        """
+        return (self.bids if side == 'bid' else self.asks).size_at(price)
+
+    def depth(self, side, price=None, levels=None):
+        """一侧的累计挂单数量，参数见 BookSide.depth"""
+        return (self.bids if side == 'bid' else self.asks).depth(price, levels)
+
+    def vwap(self, side, size):
+        """
+        按当前订单簿成交 size 数量的均价
+        :param side: 'buy' 吃卖盘，'sell' 吃买盘
+        :return: 均价，深度不足时返回 None
+        """
+        return (self.asks if side == 'buy' else self.bids).vwap(size)
+
+    def snapshot(self, levels=5):
+        """前 levels 档 {'bids': [(价格, 数量)], 'asks': [...]}"""
+        return {
+            'bids': list(zip(self.bids.prices[:levels], self.bids.sizes[:levels])),
+            'asks': list(zip(self.asks.prices[:levels], self.asks.sizes[:levels])),
+            'seqId': self.seq_id,
+            'ts': self.ts,
+        }
+
+
+class OrderBookFeed:
+    """
+    订阅 books 频道并维护多个交易对的本地订单簿
+    某个交易对失去同步时重新订阅该交易对，服务端随后推送新的 snapshot；
+    新的 snapshot 校验失败或 resync_timeout 秒内没有恢复同步时再次重新订阅
+    :param inst_ids: 交易对列表
+    :param channel: 深度频道，books(400 档) 或 books50-l2-tbt 等
+    :param on_update: 每次订单簿更新后的回调 on_update(book)
+    :param stream: 已有的 OKXPublicStream，传入时与其他频道共用连接，由调用方把深度推送转给 on_message
+    :param resync_timeout: 重新订阅后等待恢复同步的秒数
+    """
+
+    def __init__(self, inst_ids, channel='books', url=OKX_WS_PUBLIC_URL, on_update=None, record_path=None,
+                 stream=None, resync_timeout=10):
+        self.channel = channel
+        self.books = {inst_id: OrderBook(inst_id) for inst_id in inst_ids}
+        self.on_update = on_update
+        self.resync_timeout = resync_timeout
+        self.resyncs = 0
+        self._resyncing = set()
+        self._attempts = {}  # inst_id -> 重新订阅次数，用于识别超时检查是否已过期
+        self.stream = stream or OKXPublicStream(self.channels(), self.on_message, url=url, record_path=record_path)
+
+    def channels(self, inst_ids=None):
+        return [{'channel': self.channel, 'instId': inst_id} for inst_id in (inst_ids or self.books)]
+
+    def on_message(self, arg, data):
+        book = self.books.get(arg.get('instId'))
+        if book is None:
+            return
+        action = arg.get('action', 'update')
+        for item in data:
+            if action == 'snapshot':
+                # 无论 snapshot 是否通过校验，本次重新订阅都已结束，失败时需要再次订阅
+                self._resyncing.discard(book.inst_id)
+            if book.apply(action, item):
+                if self.on_update is not None:
+                    self.on_update(book)
+            elif book.inst_id not in self._resyncing:
+                self.resync(book.inst_id)
+
+    def resync(self, inst_id):
+        """重新订阅一个交易对以获取新的 snapshot，超时仍未同步时再次重新订阅"""
+        self._resyncing.add(inst_id)
+        self.resyncs += 1
+        attempt = self._attempts[inst_id] = self._attempts.get(inst_id, 0) + 1
+        logger.info(f"{inst_id} 订单簿重新同步")
+        asyncio.ensure_future(self.stream.resubscribe(self.channels([inst_id])))
+        if self.resync_timeout:
+            asyncio.get_running_loop().call_later(self.resync_timeout, self._check_resync, inst_id, attempt)
+
+    def _check_resync(self, inst_id, attempt):
+        # 期间该交易对已经再次重新订阅或已恢复同步时不处理
+        if attempt == self._attempts.get(inst_id) and not self.books[inst_id].synced:
+            logger.warning(f"{inst_id} 订单簿 {self.resync_timeout} 秒内未恢复同步，再次重新订阅")
+            self.resync(inst_id)
+
+    async def run(self):
+        await self.stream.run()
+
+    async def stop(self):
+        await self.stream.stop()
+
+
+def book_message(inst_id, action, bids, asks, seq_id, prev_seq_id=-1, checksum=None, ts=None, channel='books'):
+    """构造 books 频道推送消息，便于生成回放数据；档位为 [价格字符串, 数量字符串]"""
+    item = {
+        'asks': [[px, sz, '0', '1'] for px, sz in asks],
+        'bids': [[px, sz, '0', '1'] for px, sz in bids],
+        'ts': str(ts or int(time.time() * 1000)),
+        'seqId': seq_id,
+        'prevSeqId': prev_seq_id,
+    }
+    if checksum is not None:
+        item['checksum'] = checksum
+    return {'arg': {'channel': channel, 'instId': inst_id}, 'action': action, 'data': [item]}
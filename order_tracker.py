@@ -0,0 +1,139 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# OKX 订单终态
+# closed 表示对账时发现订单已不在挂单列表中，但尚未确认是成交还是撤销
+CLOSED_STATES = {'filled', 'canceled', 'mmp_canceled', 'rejected', 'closed'}
+
+
+class OrderTracker:
+    """
+    本地订单状态簿，按 ordId 和 clOrdId 索引
+    由下单/撤单响应和订单推送(orders 频道或 REST 查询结果)增量更新，
+    每隔 reconcile_interval 秒与交易所未完成订单列表对账一次
+    :param reconcile_interval: 对账间隔(秒)
+    :param max_closed: 保留的已完结订单数量
+    """
+
+    def __init__(self, reconcile_interval=300, max_closed=1000):
+        self.reconcile_interval = reconcile_interval
+        self.max_closed = max_closed
+        self.open = {}  # ordId 或 clOrdId -> 订单
+        self.closed = OrderedDict()
+        self.by_client_id = {}
+        self.last_reconcile = 0.0
+        self.lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def new_client_id(self, prefix='g'):
+        """生成客户端订单号（OKX 要求字母数字，最长 32 位）"""
+        return f"{prefix}{int(time.time() * 1000)}{next(self._ids) % 100000:05d}"
+
+    @staticmethod
+    def _key(order):
+        return order.get('ordId') or order.get('clOrdId')
+
+    def _store(self, order):
+        key = self._key(order)
+        if order.get('clOrdId'):
+            self.by_client_id[order['clOrdId']] = order
+        if order.get('state') in CLOSED_STATES:
+            self.open.pop(key, None)
+            self.open.pop(order.get('clOrdId'), None)
+            self.closed[key] = order
+            while len(self.closed) > self.max_closed:
+                _, old = self.closed.popitem(last=False)
+                self.by_client_id.pop(old.get('clOrdId'), None)
+        else:
+            # 下单时只有 clOrdId，收到 ordId 后改用 ordId 作为主键
+            if order.get('ordId') and order.get('clOrdId'):
+                self.open.pop(order['clOrdId'], None)
+            self.open[key] = order
+
+    def on_placed(self, params, result):
+        """
+        记录下单结果
+        :param params: 下单参数 (instId/side/px/sz/clOrdId)
+        :param result: 下单响应中该订单对应的一项 (ordId/clOrdId/sCode/sMsg)
+        """
+        result = result or {}
+        order = {
+            'instId': params.get('instId'),
+            'side': params.get('side'),
+            'px': params.get('px', ''),
+            'sz': params.get('sz'),
+            'ordId': result.get('ordId', ''),
+            'clOrdId': result.get('clOrdId') or params.get('clOrdId', ''),
+            'state': 'live' if str(result.get('sCode', '0')) == '0' else 'rejected',
+            'accFillSz': '0',
+            'uTime': str(int(time.time() * 1000)),
+        }
+        if not self._key(order):
+            return None
+        with self.lock:
+            self._store(order)
+        return order
+
+    def on_canceled(self, result):
+        """记录撤单响应中成功撤销的订单"""
+        if str(result.get('sCode', '0')) != '0':
+            return
+        with self.lock:
+            order = self.get(result.get('ordId')) or self.by_client_id.get(result.get('clOrdId'))
+            if order is not None:
+                self._store(dict(order, state='canceled'))
+
+    def on_order_update(self, update):
+        """
+        应用一条订单推送/查询结果，字段与 OKX 订单对象一致
+        :return: 更新后的订单
+        """
+        with self.lock:
+            current = self.get(update.get('ordId')) or self.by_client_id.get(update.get('clOrdId')) or {}
+            order = dict(current, **{k: v for k, v in update.items() if v not in (None, '')})
+            self._store(order)
+            return order
+
+    def get(self, ord_id):
+        """按 ordId 或 clOrdId 查询订单"""
+        if not ord_id:
+            return None
+        return self.open.get(ord_id) or self.closed.get(ord_id) or self.by_client_id.get(ord_id)
+
+    def is_open(self, ord_id):
+        return ord_id in self.open or (ord_id in self.by_client_id and
+                                       self.by_client_id[ord_id].get('state') not in CLOSED_STATES)
+
+    def open_orders(self, instId=None):
+        """本地记录的未完成订单"""
+        return [order for order in self.open.values() if instId is None or order.get('instId') == instId]
+
+    def needs_reconcile(self):
+        return time.monotonic() - self.last_reconcile >= self.reconcile_interval
+
+    def reconcile(self, exchange_orders):
+        """
+        与交易所返回的未完成订单列表对账
+        :param exchange_orders: get_order_list 返回的 data 列表
+        :return: {'missing': 本地为未完成但交易所已不存在的订单(已成交或已撤销),
+                  'unknown': 交易所存在但本地没有记录的订单}
+        """
+        with self.lock:
+            remote = {order['ordId']: order for order in exchange_orders}
+            missing = [order for key, order in list(self.open.items()) if order.get('ordId') not in remote]
+            unknown = [order for ord_id, order in remote.items() if self.get(ord_id) is None]
+            for order in missing:
+                # 仅凭挂单列表无法区分成交与撤单，需要时由调用方查询订单历史确认
+                self._store(dict(order, state='closed'))
+            for order in exchange_orders:
+                current = self.get(order['ordId']) or {}
+                self._store(dict(current, **order))
+            self.last_reconcile = time.monotonic()
+        if missing or unknown:
+            logger.info(f"订单对账: {len(missing)} 个订单已不在交易所挂单中, {len(unknown)} 个未知订单")
+        return {'missing': missing, 'unknown': unknown}
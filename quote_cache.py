@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from metrics import REGISTRY
+
+QUOTE_CACHE_REQUESTS = REGISTRY.counter(
+    'quote_cache_requests_total', '行情缓存请求数，result 为 hit/miss/coalesced/error', ('result',))
+
+
+class _Call:
+    """一次进行中的行情请求，同一 key 的并发调用等待同一个结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """
+    行情快照缓存
+    同一标的在 TTL 内的重复请求直接返回缓存；缓存过期时多个线程同时请求同一标的，只有第一个线程访问网络，
+    其余线程等待并共享其结果；条目数超过 max_size 时淘汰最久未使用的标的
+    :param ttl: 默认缓存秒数
+    :param max_size: 最多缓存的标的数
+    :param ttls: 按标的单独设置的缓存秒数，如 {'okx:ETH-USDT': 0.2}
+    """
+
+    def __init__(self, ttl=1.0, max_size=1024, ttls=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.ttls = dict(ttls or {})
+        self.entries = OrderedDict()  # key -> (过期时间, 值)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def set_ttl(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def get(self, key, fetch, valid=None):
+        """
+        获取缓存的行情，未命中时调用 fetch() 获取
+        fetch 抛出的异常传给所有等待该结果的调用方，结果为 None 或 valid(结果) 为 False 时不缓存
+        :param key: 标的标识，如 'okx:ETH-USDT'、'tiger:HK:03033.HK'
+        :param fetch: 无参数的取数函数
+        :param valid: 判断结果是否可以缓存，如检查接口返回码
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                QUOTE_CACHE_REQUESTS.inc('hit')
+                return entry[1]
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self.in_flight[key] = _Call()
+                self.misses += 1
+                QUOTE_CACHE_REQUESTS.inc('miss')
+            else:
+                self.coalesced += 1
+                QUOTE_CACHE_REQUESTS.inc('coalesced')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fetch()
+        except Exception as e:
+            call.error = e
+            with self.lock:
+                self.errors += 1
+                QUOTE_CACHE_REQUESTS.inc('error')
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+                if call.error is None and call.value is not None and (valid is None or valid(call.value)):
+                    self._store(key, call.value)
+            call.done.set()
+        return call.value
+
+    def _store(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttls.get(key, self.ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key=None):
+        """删除一个标的的缓存，key 为 None 时清空"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def stats(self):
+        """
+        :return: 命中、未命中、合并请求数等统计，saved 为节省的网络请求数
+        """
+        with self.lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+                'saved': self.hits + self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / requests if requests else 0.0,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_default_quote_cache = None
+_default_quote_cache_lock = threading.Lock()
+
+
+def default_quote_cache():
+    """进程内共享的行情缓存，同一进程内的多个策略传入同一实例即可共享行情请求"""
+    global _default_quote_cache
+    with _default_quote_cache_lock:
+        if _default_quote_cache is None:
+            _default_quote_cache = QuoteCache()
+        return _default_quote_cache
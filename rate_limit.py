@@ -0,0 +1,195 @@
+import asyncio
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器
+    :param rate: 每个周期补充的令牌数
+    :param period: 补充周期(秒)
+    :param capacity: 桶容量，默认等于 rate（允许的最大突发请求数）
+    """
+
+    def __init__(self, rate, period=1.0, capacity=None):
+        self.rate = rate
+        self.period = period
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.period)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        尝试取得令牌
+        :return: 需要等待的秒数，0 表示已取得
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) * self.period / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        阻塞直到取得令牌
+        :return: 因限流而等待的秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """清空令牌并额外暂停 seconds 秒，用于响应服务端的限流提示"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate / self.period
+
+    async def acquire_async(self, tokens=1):
+        """asyncio 版本的 acquire"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+# OKX 公布的接口限速: 路径 -> (请求次数, 周期秒数)，批量下单/撤单按订单数计算
+# https://www.okx.com/docs-v5/zh/#overview-rate-limits
+OKX_RATE_LIMITS = {
+    '/api/v5/trade/order': (60, 2),
+    '/api/v5/trade/batch-orders': (300, 2),
+    '/api/v5/trade/cancel-order': (60, 2),
+    '/api/v5/trade/cancel-batch-orders': (300, 2),
+    '/api/v5/trade/amend-order': (60, 2),
+    'GET /api/v5/trade/order': (60, 2),  # 查询订单详情，与下单同路径但单独限速
+    '/api/v5/trade/orders-pending': (60, 2),
+    '/api/v5/trade/orders-history': (40, 2),
+    '/api/v5/market/ticker': (20, 2),
+    '/api/v5/market/books': (40, 2),
+    '/api/v5/account/positions': (10, 2),
+    '/api/v5/account/balance': (10, 2),
+    '/api/v5/account/config': (5, 2),
+    '/api/v5/public/instruments': (20, 2),
+    '/api/v5/account/instruments': (20, 2),
+}
+
+# python-okx SDK 方法名 -> 接口路径
+OKX_SDK_ENDPOINTS = {
+    'place_order': '/api/v5/trade/order',
+    'place_multiple_orders': '/api/v5/trade/batch-orders',
+    'cancel_order': '/api/v5/trade/cancel-order',
+    'cancel_multiple_orders': '/api/v5/trade/cancel-batch-orders',
+    'amend_order': '/api/v5/trade/amend-order',
+    'get_order': 'GET /api/v5/trade/order',
+    'get_order_list': '/api/v5/trade/orders-pending',
+    'get_orders_history': '/api/v5/trade/orders-history',
+    'get_ticker': '/api/v5/market/ticker',
+    'get_books': '/api/v5/market/books',
+    'get_positions': '/api/v5/account/positions',
+    'get_account_balance': '/api/v5/account/balance',
+    'get_account_config': '/api/v5/account/config',
+    'get_instruments': '/api/v5/account/instruments',  # AccountAPI.get_instruments
+}
+
+# OKX 限流错误码
+OKX_RATE_LIMIT_CODES = {'50011', '50061'}
+
+
+class RateLimiter:
+    """
+    按接口分组的令牌桶限流器，并统计各接口的请求数、限流等待时间、服务端限流次数和重试次数
+    :param limits: {接口: (请求次数, 周期秒数)}
+    :param default: 未配置接口使用的限速
+    """
+
+    def __init__(self, limits=None, default=(10, 2)):
+        self.limits = dict(OKX_RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self.buckets = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        with self.lock:
+            if endpoint not in self.buckets:
+                rate, period = self.limits.get(endpoint, self.default)
+                self.buckets[endpoint] = TokenBucket(rate, period)
+                self.counters[endpoint] = {'requests': 0, 'throttled_time': 0.0, 'throttled_count': 0,
+                                           'rate_limited': 0, 'retries': 0}
+            return self.buckets[endpoint]
+
+    def record(self, endpoint, name, value=1):
+        self.bucket(endpoint)
+        with self.lock:
+            self.counters[endpoint][name] += value
+
+    def _record_acquire(self, endpoint, waited):
+        with self.lock:
+            counters = self.counters[endpoint]
+            counters['requests'] += 1
+            if waited > 0:
+                counters['throttled_time'] += waited
+                counters['throttled_count'] += 1
+
+    def acquire(self, endpoint, tokens=1):
+        """
+        请求前调用，必要时阻塞等待
+        :param tokens: 本次请求占用的配额，批量接口按订单数计算
+        :return: 等待秒数
+        """
+        waited = self.bucket(endpoint).acquire(tokens)
+        self._record_acquire(endpoint, waited)
+        return waited
+
+    async def acquire_async(self, endpoint, tokens=1):
+        waited = await self.bucket(endpoint).acquire_async(tokens)
+        self._record_acquire(endpoint, waited)
+        return waited
+
+    def pause(self, endpoint, seconds):
+        self.bucket(endpoint).pause(seconds)
+
+    def stats(self):
+        """各接口计数器快照"""
+        with self.lock:
+            return {endpoint: dict(counters) for endpoint, counters in self.counters.items()}
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0, hint=None):
+    """
+    带随机抖动的指数退避时间
+    :param attempt: 第几次重试(从 0 开始)
+    :param hint: 服务端给出的等待时间(如 Retry-After)，优先使用
+    """
+    if hint is not None:
+        return hint + random.uniform(0, base)
+    return random.uniform(0.5, 1.0) * min(cap, base * 2 ** attempt)
+
+
+def retry_after(source):
+    """从 HTTP 响应或携带响应的异常中读取 Retry-After 秒数"""
+    response = getattr(source, 'response', source)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_rate_limited(response):
+    """判断 OKX 响应是否为限流错误"""
+    return isinstance(response, dict) and str(response.get('code')) in OKX_RATE_LIMIT_CODES
@@ -0,0 +1,597 @@
+import bisect
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque, defaultdict
+from decimal import Decimal
+import pandas as pd
+from rate_limit import OKX_RATE_LIMITS, OKX_SDK_ENDPOINTS, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 模拟交易所默认的交易产品精度，与 OKX 现货一致
+SIM_INSTRUMENTS = {
+    'ETH-USDT': {'tickSz': '0.01', 'lotSz': '0.000001', 'minSz': '0.0001'},
+    'BTC-USDT': {'tickSz': '0.1', 'lotSz': '0.00000001', 'minSz': '0.00001'},
+}
+
+
+class MatchingEngine:
+    """
+    单个标的的价格-时间优先撮合引擎
+    同价位订单按到达顺序排队；外部行情价格穿过挂单价格时，挂单按价格优先、时间优先依次以挂单价成交
+    """
+
+    def __init__(self, inst_id):
+        self.inst_id = inst_id
+        self.bids = {}  # 价格 -> deque[订单]
+        self.asks = {}
+        self.bid_prices = []  # 升序
+        self.ask_prices = []  # 升序
+        self.last_price = None
+
+    def _book(self, side):
+        return (self.bids, self.bid_prices) if side == 'buy' else (self.asks, self.ask_prices)
+
+    def add(self, order):
+        levels, prices = self._book(order['side'])
+        px = order['_px']
+        if px not in levels:
+            levels[px] = deque()
+            bisect.insort(prices, px)
+        levels[px].append(order)
+
+    def remove(self, order):
+        levels, prices = self._book(order['side'])
+        px = order['_px']
+        queue = levels.get(px)
+        if not queue:
+            return False
+        try:
+            queue.remove(order)
+        except ValueError:
+            return False
+        if not queue:
+            del levels[px]
+            prices.pop(bisect.bisect_left(prices, px))
+        return True
+
+    def _pop_best(self, side):
+        """弹出某一方向最优价位的队首订单"""
+        levels, prices = self._book(side)
+        px = prices[-1] if side == 'buy' else prices[0]
+        queue = levels[px]
+        order = queue.popleft()
+        if not queue:
+            del levels[px]
+            prices.pop(-1 if side == 'buy' else 0)
+        return order
+
+    def match_incoming(self, order, fill):
+        """
+        新订单先与对手方挂单撮合，再与外部行情成交，剩余部分(限价单)挂单
+        :param fill: fill(order, price, size) 成交回调
+        """
+        side = order['side']
+        opposite = 'sell' if side == 'buy' else 'buy'
+        _, opposite_prices = self._book(opposite)
+        px = order['_px']
+        while order['_remaining'] > 0 and opposite_prices:
+            best = opposite_prices[0] if side == 'buy' else opposite_prices[-1]
+            if (side == 'buy' and best > px) or (side == 'sell' and best < px):
+                break
+            levels, _ = self._book(opposite)
+            maker = levels[best][0]
+            size = min(order['_remaining'], maker['_remaining'])
+            fill(maker, best, size)
+            fill(order, best, size)
+            if maker['_remaining'] <= 0:
+                self._pop_best(opposite)
+
+        last = self.last_price
+        if order['_remaining'] > 0 and last is not None and \
+                ((side == 'buy' and px >= last) or (side == 'sell' and px <= last)):
+            fill(order, last, order['_remaining'])
+        if order['_remaining'] > 0 and order['ordType'] != 'market':
+            self.add(order)
+
+    def on_price(self, price, fill):
+        """外部行情推进：价格穿过的挂单全部以挂单价成交"""
+        self.last_price = price
+        while self.bid_prices and self.bid_prices[-1] >= price:
+            order = self._pop_best('buy')
+            fill(order, order['_px'], order['_remaining'])
+        while self.ask_prices and self.ask_prices[0] <= price:
+            order = self._pop_best('sell')
+            fill(order, order['_px'], order['_remaining'])
+
+    def depth(self, levels=5):
+        """聚合后的买卖盘 [[价格, 数量], ...]"""
+        bids = [[px, sum(o['_remaining'] for o in self.bids[px])] for px in reversed(self.bid_prices[-levels:])]
+        asks = [[px, sum(o['_remaining'] for o in self.asks[px])] for px in self.ask_prices[:levels]]
+        return bids, asks
+
+
+class SimulatedExchange:
+    """
+    进程内模拟交易所
+    - 按价格-时间优先撮合，外部价格由 PriceFeed 回放驱动
+    - 延迟模型：每次请求在模拟时钟上经过 latency±jitter 秒后才到达撮合引擎，realtime=True 时真实等待
+    - 限流模型：按 OKX 公布的接口限速在模拟时钟上计数，超限返回 50011
+    - 模拟时钟：on_price 传入 ts 时按行情时间推进；从未传入 ts 时按真实经过的时间推进，客户端的限流等待同样生效
+    通过 okx_backend() / tiger_clients() 获得与 SDK 同名接口的适配对象
+    """
+
+    def __init__(self, balances=None, latency=0.0, jitter=0.0, rate_limits=OKX_RATE_LIMITS, fee_rate=0.0,
+                 realtime=False, seed=None, instruments=None):
+        """
+        :param balances: 初始资产 {'USDT': 10000, ...}
+        :param latency: 单程延迟(秒)
+        :param jitter: 延迟随机抖动(秒)
+        :param rate_limits: {接口: (次数, 周期秒数)}，为 None 时不限流
+        :param fee_rate: 手续费率，从成交金额中扣除
+        :param realtime: 是否真实 sleep 延迟时间
+        :param instruments: 交易产品精度 {instId: {'tickSz', 'lotSz', 'minSz'}}，默认 SIM_INSTRUMENTS；
+                            列出的交易对下单时按精度校验，未列出的不校验
+        """
+        self.engines = {}
+        self.orders = {}
+        self.pending = []  # (到达时间, 序号, 订单) 尚未到达撮合引擎的订单
+        self.balances = defaultdict(float, balances or {})
+        self.positions = defaultdict(float)
+        self.fills = []
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = rate_limits
+        self.fee_rate = fee_rate
+        self.realtime = realtime
+        self.instruments = dict(SIM_INSTRUMENTS if instruments is None else instruments)
+        self.random = random.Random(seed)
+        self.clock = 0.0
+        self._ts_driven = False  # 是否由行情时间驱动模拟时钟
+        self._wall = None  # 上次按真实时间推进模拟时钟的时刻
+        self.request_times = defaultdict(deque)
+        self.stats = defaultdict(int)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+
+    # ---- 基础设施 ----
+
+    def engine(self, inst_id):
+        if inst_id not in self.engines:
+            self.engines[inst_id] = MatchingEngine(inst_id)
+        return self.engines[inst_id]
+
+    def _delay(self):
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        if self.realtime and delay:
+            time.sleep(delay)
+            if self._wall is not None:
+                self._wall += delay  # 真实等待的时间已计入延迟，不再按真实时间重复推进
+        return delay
+
+    def _advance_wall(self):
+        """没有行情时间驱动时，按真实经过的时间推进模拟时钟，否则限流窗口永远不会滑动"""
+        if self._ts_driven:
+            return
+        now = time.monotonic()
+        if self._wall is not None:
+            self.clock += max(0.0, now - self._wall)
+        self._wall = now
+
+    def _check_rate(self, endpoint, weight=1):
+        """模拟时钟上的滑动窗口限流，超限返回 False；weight 为本次请求占用的配额(批量接口为订单数)"""
+        self.stats['requests'] += 1
+        if not self.rate_limits or endpoint not in self.rate_limits:
+            return True
+        limit, period = self.rate_limits[endpoint]
+        times = self.request_times[endpoint]
+        while times and times[0] <= self.clock - period:
+            times.popleft()
+        if len(times) + weight > limit:
+            self.stats['rate_limited'] += 1
+            return False
+        times.extend([self.clock] * weight)
+        return True
+
+    def _ms(self):
+        return str(int(self.clock * 1000))
+
+    # ---- 行情 ----
+
+    def on_price(self, inst_id, price, ts=None):
+        """
+        推进一笔外部行情：先把已到达的订单送入撮合引擎，再按新价格撮合
+        :param ts: 行情时间(秒)，为空时按真实经过的时间推进模拟时钟
+        """
+        if ts is not None:
+            self._ts_driven = True
+            self.clock = max(self.clock, ts)
+        else:
+            self._advance_wall()
+        self._release_pending()
+        self.engine(inst_id).on_price(price, self._fill)
+        self.stats['ticks'] += 1
+
+    def _release_pending(self):
+        while self.pending and self.pending[0][0] <= self.clock:
+            _, _, order = heapq.heappop(self.pending)
+            if order['state'] == 'live':
+                self.engine(order['instId']).match_incoming(order, self._fill)
+
+    # ---- 订单 ----
+
+    def _fill(self, order, price, size):
+        if size <= 0:
+            return
+        base, _, quote = order['instId'].partition('-')
+        notional = price * size
+        fee = notional * self.fee_rate
+        if order['side'] == 'buy':
+            self.balances[quote] -= notional + fee
+            self.balances[base] += size
+            self.positions[order['instId']] += size
+        else:
+            self.balances[quote] += notional - fee
+            self.balances[base] -= size
+            self.positions[order['instId']] -= size
+
+        filled = float(order['accFillSz']) + size
+        avg = float(order['avgPx'] or 0)
+        order['avgPx'] = str((avg * float(order['accFillSz']) + notional) / filled)
+        order['accFillSz'] = str(filled)
+        order['fillPx'] = str(price)
+        order['fillSz'] = str(size)
+        order['_remaining'] -= size
+        order['state'] = 'filled' if order['_remaining'] <= 1e-12 else 'partially_filled'
+        order['uTime'] = self._ms()
+        self.fills.append({'time': self.clock, 'ordId': order['ordId'], 'instId': order['instId'],
+                           'side': order['side'], 'price': price, 'size': size, 'fee': fee})
+        self.stats['fills'] += 1
+
+    def submit(self, instId, side, ordType, sz, px='', clOrdId='', **kwargs):
+        """
+        提交订单
+        :return: OKX 单个下单结果 {'ordId', 'clOrdId', 'sCode', 'sMsg'}
+        """
+        size = float(sz)
+        if size <= 0:
+            return {'ordId': '', 'clOrdId': clOrdId, 'sCode': '51000', 'sMsg': 'Parameter sz error'}
+        if ordType != 'market' and not px:
+            return {'ordId': '', 'clOrdId': clOrdId, 'sCode': '51000', 'sMsg': 'Parameter px error'}
+        error = self._check_precision(instId, side, ordType, sz, px)
+        if error is not None:
+            return {'ordId': '', 'clOrdId': clOrdId, 'sCode': error[0], 'sMsg': error[1]}
+        ord_id = str(next(self._ids))
+        order = {
+            'ordId': ord_id, 'clOrdId': clOrdId, 'instId': instId, 'side': side, 'ordType': ordType,
+            'px': str(px), 'sz': str(sz), 'accFillSz': '0', 'avgPx': '', 'fillPx': '', 'fillSz': '0',
+            'state': 'live', 'cTime': self._ms(), 'uTime': self._ms(),
+            '_px': float(px) if ordType != 'market' else (float('inf') if side == 'buy' else 0.0),
+            '_remaining': size,
+        }
+        self.orders[ord_id] = order
+        arrival = self.clock + self._delay()
+        if arrival <= self.clock:
+            self.engine(instId).match_incoming(order, self._fill)
+        else:
+            heapq.heappush(self.pending, (arrival, next(self._seq), order))
+        self.stats['orders'] += 1
+        return {'ordId': ord_id, 'clOrdId': clOrdId, 'sCode': '0', 'sMsg': ''}
+
+    def _check_precision(self, inst_id, side, ord_type, sz, px):
+        """
+        按交易产品精度校验下单参数，与 OKX 一样拒绝数量不足 minSz、不是 lotSz 或 tickSz 整数倍的订单
+        市价买单的数量为计价货币金额，不按 lotSz 校验
+        :return: (sCode, sMsg)，通过时返回 None
+        """
+        spec = self.instruments.get(inst_id)
+        if spec is None or (ord_type == 'market' and side == 'buy'):
+            return None
+        size = Decimal(str(sz))
+        if size < Decimal(spec['minSz']):
+            return '51020', 'Order amount should be greater than the min available amount'
+        if size % Decimal(spec['lotSz']):
+            return '51000', 'Parameter sz error'
+        if ord_type != 'market' and Decimal(str(px)) % Decimal(spec['tickSz']):
+            return '51000', 'Parameter px error'
+        return None
+
+    def cancel(self, instId, ordId='', clOrdId=''):
+        order = self.orders.get(ordId)
+        if order is None and clOrdId:
+            order = next((o for o in self.orders.values() if o['clOrdId'] == clOrdId), None)
+        if order is None or order['state'] not in ('live', 'partially_filled'):
+            return {'ordId': ordId, 'clOrdId': clOrdId, 'sCode': '51400', 'sMsg': 'Order does not exist'}
+        self.engine(order['instId']).remove(order)
+        order['state'] = 'canceled'
+        order['uTime'] = self._ms()
+        self.stats['cancels'] += 1
+        return {'ordId': order['ordId'], 'clOrdId': order['clOrdId'], 'sCode': '0', 'sMsg': ''}
+
+    def open_orders(self, instId=None):
+        return [self.public_order(o) for o in self.orders.values()
+                if o['state'] in ('live', 'partially_filled') and (not instId or o['instId'] == instId)]
+
+    @staticmethod
+    def public_order(order):
+        return {k: v for k, v in order.items() if not k.startswith('_')}
+
+    # ---- 适配器 ----
+
+    def _call(self, endpoint, handler, weight=1):
+        """统一处理延迟和限流，返回 OKX 风格响应"""
+        self._advance_wall()
+        self.clock += self._delay()
+        if not self._check_rate(endpoint, weight):
+            return {'code': '50011', 'msg': 'Too Many Requests', 'data': []}
+        result = handler()
+        self.clock += self._delay()
+        self._release_pending()
+        return result
+
+    def okx_backend(self):
+        """返回可传给 OKXTrading(backend=...) 的 (accountAPI, tradeAPI, marketAPI)"""
+        return SimAccountAPI(self), SimTradeAPI(self), SimMarketAPI(self)
+
+    def tiger_clients(self):
+        """返回可传给 GridTrading(quote_client=..., trade_client=...) 的 (quote_client, trade_client)"""
+        return SimTigerQuoteClient(self), SimTigerTradeClient(self)
+
+
+def _endpoint(name):
+    return OKX_SDK_ENDPOINTS.get(name, name)
+
+
+class SimTradeAPI:
+    """模拟 okx.Trade.TradeAPI"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def place_order(self, instId, tdMode, side, ordType, sz, px='', clOrdId='', **kwargs):
+        ex = self.exchange
+
+        def handler():
+            result = ex.submit(instId, side, ordType, sz, px, clOrdId)
+            return {'code': '0' if result['sCode'] == '0' else '1', 'msg': '', 'data': [result]}
+        return ex._call(_endpoint('place_order'), handler)
+
+    def place_multiple_orders(self, orders_data):
+        ex = self.exchange
+
+        def handler():
+            results = [ex.submit(**order) for order in orders_data]
+            failed = sum(1 for r in results if r['sCode'] != '0')
+            code = '0' if not failed else ('1' if failed == len(results) else '2')
+            return {'code': code, 'msg': '', 'data': results}
+        return ex._call(_endpoint('place_multiple_orders'), handler, len(orders_data))
+
+    def cancel_order(self, instId, ordId='', clOrdId=''):
+        ex = self.exchange
+
+        def handler():
+            result = ex.cancel(instId, ordId, clOrdId)
+            return {'code': '0' if result['sCode'] == '0' else '1', 'msg': '', 'data': [result]}
+        return ex._call(_endpoint('cancel_order'), handler)
+
+    def cancel_multiple_orders(self, orders_data):
+        ex = self.exchange
+
+        def handler():
+            results = [ex.cancel(**order) for order in orders_data]
+            failed = sum(1 for r in results if r['sCode'] != '0')
+            code = '0' if not failed else ('1' if failed == len(results) else '2')
+            return {'code': code, 'msg': '', 'data': results}
+        return ex._call(_endpoint('cancel_multiple_orders'), handler, len(orders_data))
+
+    def get_order_list(self, instType='', instId='', **kwargs):
+        ex = self.exchange
+        return ex._call(_endpoint('get_order_list'),
+                        lambda: {'code': '0', 'msg': '', 'data': ex.open_orders(instId)})
+
+    def get_order(self, instId, ordId='', clOrdId=''):
+        ex = self.exchange
+
+        def handler():
+            order = ex.orders.get(ordId)
+            if order is None and clOrdId:
+                order = next((o for o in ex.orders.values() if o['clOrdId'] == clOrdId), None)
+            if order is None or order['instId'] != instId:
+                return {'code': '51603', 'msg': 'Order does not exist', 'data': []}
+            return {'code': '0', 'msg': '', 'data': [ex.public_order(order)]}
+        return ex._call(_endpoint('get_order'), handler)
+
+    def get_orders_history(self, instType='', instId='', limit='', **kwargs):
+        ex = self.exchange
+
+        def handler():
+            closed = [ex.public_order(o) for o in ex.orders.values()
+                      if o['state'] in ('filled', 'canceled') and (not instId or o['instId'] == instId)]
+            return {'code': '0', 'msg': '', 'data': closed[::-1][:int(limit or 100)]}
+        return ex._call(_endpoint('get_orders_history'), handler)
+
+
+class SimMarketAPI:
+    """模拟 okx.MarketData.MarketAPI"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def get_ticker(self, instId):
+        ex = self.exchange
+
+        def handler():
+            engine = ex.engine(instId)
+            bids, asks = engine.depth(1)
+            last = engine.last_price
+            return {'code': '0', 'msg': '', 'data': [{
+                'instId': instId, 'last': str(last if last is not None else ''),
+                'bidPx': str(bids[0][0]) if bids else '', 'askPx': str(asks[0][0]) if asks else '',
+                'ts': ex._ms(),
+            }]}
+        return ex._call(_endpoint('get_ticker'), handler)
+
+    def get_books(self, instId, sz=''):
+        ex = self.exchange
+
+        def handler():
+            bids, asks = ex.engine(instId).depth(int(sz or 5))
+            return {'code': '0', 'msg': '', 'data': [{
+                'bids': [[str(p), str(s), '0', '1'] for p, s in bids],
+                'asks': [[str(p), str(s), '0', '1'] for p, s in asks],
+                'ts': ex._ms(),
+            }]}
+        return ex._call(_endpoint('get_books'), handler)
+
+
+class SimAccountAPI:
+    """模拟 okx.Account.AccountAPI"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def get_account_balance(self, ccy=''):
+        ex = self.exchange
+
+        def handler():
+            details = [{'ccy': c, 'eq': str(v), 'availEq': str(v), 'availBal': str(v)}
+                       for c, v in ex.balances.items() if not ccy or c == ccy]
+            total = ex.balances.get('USDT', 0.0)
+            return {'code': '0', 'msg': '', 'data': [{'totalEq': str(total), 'availEq': str(total),
+                                                        'details': details}]}
+        return ex._call(_endpoint('get_account_balance'), handler)
+
+    def get_positions(self, instType='', instId=''):
+        ex = self.exchange
+
+        def handler():
+            insts = [instId] if instId else list(ex.positions)
+            data = [{'instId': i, 'pos': str(ex.positions.get(i, 0.0)), 'instType': instType or 'SPOT'}
+                    for i in insts]
+            return {'code': '0', 'msg': '', 'data': data}
+        return ex._call(_endpoint('get_positions'), handler)
+
+    def get_account_config(self, instType=''):
+        return self.exchange._call(_endpoint('get_account_config'),
+                                   lambda: {'code': '0', 'msg': '', 'data': [{'acctLv': '1'}]})
+
+    def get_instruments(self, instType='', instId='', **kwargs):
+        ex = self.exchange
+
+        def handler():
+            data = [dict(spec, instId=i, instType=instType or 'SPOT', baseCcy=i.partition('-')[0],
+                         quoteCcy=i.partition('-')[2], state='live')
+                    for i, spec in ex.instruments.items() if not instId or i == instId]
+            return {'code': '0', 'msg': '', 'data': data}
+        return ex._call(_endpoint('get_instruments'), handler)
+
+
+class SimTigerOrder:
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self.id = order_id
+
+
+class SimTigerContract:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+
+class SimTigerPosition:
+    def __init__(self, symbol, quantity):
+        self.contract = SimTigerContract(symbol)
+        self.quantity = quantity
+
+
+class SimTigerTradeClient:
+    """模拟 tigeropen TradeClient，接口与 GridTrading.place_order 的调用方式一致"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def place_order(self, symbol, quantity, side, order_type='LIMIT', limit_price=None, market=None, **kwargs):
+        ex = self.exchange
+        ord_type = 'market' if str(order_type).upper() == 'MKT' else 'limit'
+
+        def handler():
+            result = ex.submit(symbol, str(side).lower(), ord_type, quantity, limit_price or '')
+            if result['sCode'] != '0':
+                raise ValueError(result['sMsg'])
+            return SimTigerOrder(int(result['ordId']))
+        result = ex._call('tiger_place_order', handler)
+        if isinstance(result, dict):
+            raise ValueError(result['msg'])
+        return result
+
+    def cancel_order(self, id=None, order_id=None, **kwargs):
+        ex = self.exchange
+        ord_id = str(order_id or id)
+        order = ex.orders.get(ord_id)
+        return ex._call('tiger_cancel_order', lambda: ex.cancel(order['instId'] if order else '', ord_id))
+
+    def get_positions(self, account=None, sec_type=None, currency=None, market=None, symbol=None, **kwargs):
+        ex = self.exchange
+
+        def handler():
+            return [SimTigerPosition(inst_id, quantity) for inst_id, quantity in ex.positions.items()
+                    if quantity and (symbol is None or inst_id == symbol)]
+        result = ex._call('tiger_get_positions', handler)
+        if isinstance(result, dict):
+            raise ValueError(result['msg'])
+        return result
+
+
+class SimTigerQuoteClient:
+    """模拟 tigeropen QuoteClient 的行情快照接口"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def grab_quote_permission(self, market=None):
+        return [market]
+
+    def get_stock_briefs(self, symbols, market=None, **kwargs):
+        ex = self.exchange
+
+        def handler():
+            rows = [{'symbol': s, 'last': ex.engine(s).last_price} for s in symbols
+                    if ex.engine(s).last_price is not None]
+            return pd.DataFrame(rows, columns=['symbol', 'last'])
+        result = ex._call('tiger_get_stock_briefs', handler)
+        return result if isinstance(result, pd.DataFrame) else pd.DataFrame(columns=['symbol', 'last'])
+
+
+class PriceFeed:
+    """
+    可回放的价格序列
+    :param prices: 价格序列
+    :param inst_id: 标的
+    :param timestamps: 每个价格对应的时间(秒)，默认每个价格间隔 interval 秒
+    """
+
+    def __init__(self, prices, inst_id, timestamps=None, interval=1.0):
+        self.prices = list(map(float, prices))
+        self.inst_id = inst_id
+        self.timestamps = list(timestamps) if timestamps is not None else \
+            [i * interval for i in range(len(self.prices))]
+
+    def replay(self, exchange, on_tick=None):
+        """
+        按顺序把价格推入交易所，每笔行情后调用 on_tick(price)
+        :return: 处理的事件数/秒
+        """
+        start = time.perf_counter()
+        for ts, price in zip(self.timestamps, self.prices):
+            exchange.on_price(self.inst_id, price, ts)
+            if on_tick is not None:
+                on_tick(price)
+        elapsed = time.perf_counter() - start
+        return len(self.prices) / elapsed if elapsed > 0 else float('inf')
+
+
+def unlimited_rate_limiter():
+    """客户端不限流的 RateLimiter，压测模拟交易所时使用，由模拟交易所自身的限流模型约束"""
+    return RateLimiter(limits={}, default=(float('inf'), 1))
@@ -0,0 +1,196 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'symbols.npz')
+
+
+def _market_value(market):
+    """兼容 Market 枚举与字符串"""
+    return getattr(market, 'value', market)
+
+
+class SymbolMaster:
+    """
+    证券代码主表
+    以列式二进制(npz，不压缩)存放，按 (market, symbol) 排序：
+    市场只记录各自在排序数组中的起止位置，symbols 为定长字节数组，名称为 UTF-8 拼接字节加偏移量，
+    查询通过二分查找完成，加载时无需逐行构建 Python 对象
+    """
+
+    def __init__(self, path=DEFAULT_MASTER_PATH):
+        self.path = path
+        self._set_rows([], [], [])
+        if os.path.exists(path):
+            self.load()
+
+    def _set_rows(self, markets, symbols, names):
+        order = np.lexsort((np.asarray(symbols, dtype=object), np.asarray(markets, dtype=object))) \
+            if len(symbols) else np.array([], dtype=np.int64)
+        self.symbols = np.array([symbols[i].encode() for i in order], dtype='S')
+        encoded = [names[i].encode('utf-8') for i in order]
+        self.name_offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(b) for b in encoded], out=self.name_offsets[1:])
+        self.name_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+        # 每个市场在排序数组中的起止位置
+        self.market_index = {}
+        for i, row in enumerate(order):
+            market = markets[row]
+            start, _ = self.market_index.get(market, (i, i))
+            self.market_index[market] = (start, i + 1)
+
+    def load(self):
+        """从磁盘加载主表"""
+        with np.load(self.path, allow_pickle=False) as data:
+            self.symbols = data['symbols']
+            self.name_bytes = data['name_bytes']
+            self.name_offsets = data['name_offsets']
+            bounds = data['market_bounds']
+            self.market_index = {
+                market.decode(): (int(bounds[i]), int(bounds[i + 1]))
+                for i, market in enumerate(data['market_names'])
+            }
+
+    def save(self):
+        """原子写入磁盘"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        market_names = list(self.market_index)
+        market_bounds = [self.market_index[m][0] for m in market_names] + [len(self.symbols)]
+        np.savez(tmp_path, symbols=self.symbols, name_bytes=self.name_bytes, name_offsets=self.name_offsets,
+                 market_names=np.array([m.encode() for m in market_names], dtype='S'),
+                 market_bounds=np.array(market_bounds, dtype=np.int64))
+        os.replace(tmp_path, self.path)
+
+    def _name(self, i):
+        return self.name_bytes[self.name_offsets[i]:self.name_offsets[i + 1]].tobytes().decode('utf-8')
+
+    def _find(self, market, symbol):
+        start, stop = self.market_index.get(_market_value(market), (0, 0))
+        key = str(symbol).encode()
+        i = start + int(np.searchsorted(self.symbols[start:stop], key))
+        return i if i < stop and self.symbols[i] == key else None
+
+    def lookup(self, market, symbol):
+        """
+        查询单个证券
+        :return: {'market', 'symbol', 'name'}，不存在时返回 None
+        """
+        i = self._find(market, symbol)
+        if i is None:
+            return None
+        return {'market': _market_value(market), 'symbol': str(symbol), 'name': self._name(i)}
+
+    def list(self, market):
+        """
+        列出某个市场的全部证券
+        :return: [(symbol, name), ...]，按代码排序
+        """
+        start, stop = self.market_index.get(_market_value(market), (0, 0))
+        return [(self.symbols[i].decode(), self._name(i)) for i in range(start, stop)]
+
+    def list_markets(self):
+        return list(self.market_index)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, key):
+        market, symbol = key
+        return self._find(market, symbol) is not None
+
+    def _rows(self):
+        """以 {(market, symbol): name} 形式返回全部数据"""
+        names = self.name_bytes.tobytes()
+        offsets = self.name_offsets
+        rows = {}
+        for market, (start, stop) in self.market_index.items():
+            for i in range(start, stop):
+                rows[(market, self.symbols[i].decode())] = names[offsets[i]:offsets[i + 1]].decode('utf-8')
+        return rows
+
+    def to_dataframe(self):
+        rows = self._rows()
+        return pd.DataFrame([(m, s, n) for (m, s), n in rows.items()], columns=['market', 'symbol', 'name'])
+
+    def diff(self, market, symbols):
+        """
+        计算某个市场最新列表与主表之间的差异
+        :param market: 市场
+        :param symbols: 最新证券列表 [(symbol, name), ...]
+        :return: {'added': [...], 'removed': [...], 'renamed': [(symbol, old_name, new_name), ...]}
+        """
+        current = dict(self.list(market))
+        latest = {str(symbol): str(name) for symbol, name in symbols}
+        return {
+            'added': sorted((s, latest[s]) for s in latest.keys() - current.keys()),
+            'removed': sorted((s, current[s]) for s in current.keys() - latest.keys()),
+            'renamed': sorted((s, current[s], latest[s]) for s in latest.keys() & current.keys()
+                              if current[s] != latest[s]),
+        }
+
+    def apply(self, market, changes):
+        """
+        把 diff 结果应用到主表
+        :param changes: diff 的返回值
+        """
+        market = _market_value(market)
+        if not any(changes.values()):
+            return
+        rows = self._rows()
+        for symbol, _ in changes['removed']:
+            rows.pop((market, symbol), None)
+        for symbol, name in changes['added']:
+            rows[(market, symbol)] = name
+        for symbol, _, name in changes['renamed']:
+            rows[(market, symbol)] = name
+        keys = list(rows)
+        self._set_rows([k[0] for k in keys], [k[1] for k in keys], [rows[k] for k in keys])
+
+    def refresh(self, market, symbols, save=True):
+        """
+        用某个市场的最新列表增量更新主表，只改动新增、退市和更名的证券
+        未出现在本次刷新中的市场保持不变
+        :return: diff 结果
+        """
+        market = _market_value(market)
+        changes = self.diff(market, symbols)
+        logger.info(f"{market} 市场: 新增 {len(changes['added'])}, 退市 {len(changes['removed'])}, "
+                    f"更名 {len(changes['renamed'])}")
+        if any(changes.values()):
+            self.apply(market, changes)
+            if save:
+                self.save()
+        return changes
+
+    @classmethod
+    def from_csv(cls, csv_path, path=DEFAULT_MASTER_PATH):
+        """从 get_all_symbols 导出的 CSV 构建主表"""
+        df = pd.read_csv(csv_path, dtype=str, encoding='utf-8-sig', keep_default_na=False)
+        master = cls.__new__(cls)
+        master.path = path
+        master._set_rows(df['market'].tolist(), df['symbol'].tolist(), df['name'].tolist())
+        return master
+
+
+_default_master = None
+
+
+def default_master():
+    """进程内共享的主表实例"""
+    global _default_master
+    if _default_master is None:
+        _default_master = SymbolMaster()
+    return _default_master
+
+
+def lookup(market, symbol):
+    return default_master().lookup(market, symbol)
+
+
+def list_symbols(market):
+    return default_master().list(market)
@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+from metrics import track
+
+logger = logging.getLogger(__name__)
+
+PRIVATE_KEY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keys', 'private.pem')
+TIGER_ID = '20153826'
+PAPER_ACCOUNT = '20240803144534965'  # 模拟账号
+LIVE_ACCOUNT = '498843'
+
+
+class TigerClientPool:
+    """
+    进程内共享的老虎证券客户端
+    私钥每个文件只读取解析一次；行情客户端按 tiger_id 共享(行情权限属于开发者账号，与交易账号无关)，
+    交易客户端按 (tiger_id, 交易账号) 共享；每个市场的行情权限在进程内只申请一次，
+    避免同一进程内的多个策略反复抢占权限
+    """
+
+    def __init__(self, private_key_path=PRIVATE_KEY_PATH, tiger_id=TIGER_ID):
+        self.private_key_path = private_key_path
+        self.tiger_id = tiger_id
+        self.lock = threading.RLock()
+        self._private_keys = {}
+        self._configs = {}
+        self._quote_clients = {}
+        self._trade_clients = {}
+        self._permissions = {}  # (tiger_id, market) -> grab_quote_permission 结果
+
+    def private_key(self, path=None):
+        path = path or self.private_key_path
+        with self.lock:
+            if path not in self._private_keys:
+                from tigeropen.common.util.signature_utils import read_private_key
+
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"私钥文件不存在: {path}")
+                self._private_keys[path] = read_private_key(path)
+            return self._private_keys[path]
+
+    def config(self, account=PAPER_ACCOUNT, tiger_id=None):
+        """
+        获取API配置，同一账号返回同一个配置对象
+        :param account: 交易账号
+        :param tiger_id: 开发者ID，默认为 TIGER_ID
+        """
+        tiger_id = tiger_id or self.tiger_id
+        with self.lock:
+            key = (tiger_id, account)
+            if key not in self._configs:
+                from tigeropen.common.consts import Language
+                from tigeropen.tiger_open_config import TigerOpenClientConfig
+
+                client_config = TigerOpenClientConfig()
+                client_config.private_key = self.private_key()
+                client_config.tiger_id = tiger_id
+                client_config.account = account
+                client_config.language = Language.zh_CN
+                self._configs[key] = client_config
+            return self._configs[key]
+
+    def quote_client(self, client_config=None):
+        """按 tiger_id 共享的行情客户端"""
+        client_config = client_config or self.config()
+        with self.lock:
+            if client_config.tiger_id not in self._quote_clients:
+                from tigeropen.quote.quote_client import QuoteClient
+
+                self._quote_clients[client_config.tiger_id] = QuoteClient(client_config)
+            return self._quote_clients[client_config.tiger_id]
+
+    def trade_client(self, client_config=None):
+        """按 (tiger_id, 账号) 共享的交易客户端"""
+        client_config = client_config or self.config()
+        key = (client_config.tiger_id, client_config.account)
+        with self.lock:
+            if key not in self._trade_clients:
+                from tigeropen.trade.trade_client import TradeClient
+
+                self._trade_clients[key] = TradeClient(client_config)
+            return self._trade_clients[key]
+
+    def ensure_permission(self, market, client_config=None):
+        """
+        申请行情权限，同一 tiger_id 和市场在进程内只申请一次
+        :return: 行情权限列表
+        """
+        client_config = client_config or self.config()
+        quote_client = self.quote_client(client_config)
+        key = (client_config.tiger_id, market)
+        with self.lock:
+            if key in self._permissions:
+                return self._permissions[key]
+            try:
+                # 指定市场类型获取权限
+                with track('tiger', 'grab_quote_permission'):
+                    permissions = quote_client.grab_quote_permission(market=market)
+                logger.info(f"获取行情权限成功: {permissions}")
+            except Exception as e:
+                logger.error(f"获取行情权限失败: {e}")
+                raise
+            # 验证权限
+            if not permissions or market not in permissions:
+                raise ValueError(f"未获得{market}市场权限")
+            self._permissions[key] = permissions
+            return permissions
+
+    def clients(self, market, client_config=None):
+        """
+        获取行情和交易客户端，并确保已获得该市场的行情权限
+        :return: (quote_client, trade_client)
+        """
+        self.ensure_permission(market, client_config)
+        return self.quote_client(client_config), self.trade_client(client_config)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """进程内共享的客户端池"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = TigerClientPool()
+        return _default_pool
+
+
+def get_client_config(account=PAPER_ACCOUNT):
+    """获取指定账号的API配置(进程内缓存)"""
+    return default_pool().config(account)
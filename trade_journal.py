@@ -0,0 +1,161 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal', 'trades.db')
+
+COLUMNS = ('time', 'run_id', 'strategy', 'exchange', 'symbol', 'kind', 'side', 'price', 'quantity',
+           'order_id', 'client_id', 'fee')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    run_id TEXT,
+    strategy TEXT,
+    exchange TEXT,
+    symbol TEXT,
+    kind TEXT,
+    side TEXT,
+    price REAL,
+    quantity REAL,
+    order_id TEXT,
+    client_id TEXT,
+    fee REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_run ON trades (run_id, time);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, time);
+"""
+
+
+class TradeJournal:
+    """
+    只追加的成交/下单日志，SQLite WAL 模式
+    写入先进入内存缓冲，达到 batch_size 条或距上次落盘超过 flush_interval 秒时以单个事务批量写入，
+    每条记录的写入成本恒定；分析时按条件读回为 DataFrame，进程内不保留完整历史
+    :param path: 数据库文件路径，':memory:' 为内存库
+    :param batch_size: 缓冲条数上限
+    :param flush_interval: 缓冲最长保留秒数
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, batch_size=100, flush_interval=1.0):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA mmap_size=268435456')  # 读取走内存映射
+        self.conn.executescript(SCHEMA)
+        atexit.register(self.close)
+
+    def append(self, record):
+        """
+        追加一条记录
+        :param record: 包含 COLUMNS 中字段的字典，缺少的字段为空；time 默认当前时间
+        """
+        row = tuple(record.get(column) for column in COLUMNS)
+        if row[0] is None:
+            row = (time.time(),) + row[1:]
+        with self.lock:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            rows, self.buffer = self.buffer, []
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                f"INSERT INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            self.conn.execute('COMMIT')
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        with self.lock:
+            self.conn.close()
+            self.conn = None
+        atexit.unregister(self.close)
+
+    def _where(self, run_id=None, strategy=None, symbol=None, since=None, kind=None):
+        clauses, params = [], []
+        for column, value in (('run_id', run_id), ('strategy', strategy), ('symbol', symbol), ('kind', kind)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("time >= ?")
+            params.append(since)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def read(self, run_id=None, strategy=None, symbol=None, since=None, kind=None, limit=None):
+        """
+        按条件读回记录
+        :param since: 起始时间(Unix 秒)
+        :param limit: 只读取最近的 limit 条
+        :return: DataFrame，time 列转换为 datetime
+        """
+        self.flush()
+        where, params = self._where(run_id, strategy, symbol, since, kind)
+        query = f"SELECT id, {', '.join(COLUMNS)} FROM trades{where} ORDER BY id DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self.lock:
+            df = pd.read_sql_query(query, self.conn, params=params)
+        df = df.iloc[::-1].set_index('id')
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        return df
+
+    def summary(self, run_id=None, strategy=None, symbol=None, since=None, kind=None):
+        """
+        在数据库内聚合，不读回明细
+        :return: {'count', 'buy_quantity', 'sell_quantity', 'cash_flow'}，cash_flow 为卖出额减买入额
+        """
+        self.flush()
+        where, params = self._where(run_id, strategy, symbol, since, kind)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*),"
+                " COALESCE(SUM(CASE WHEN UPPER(side) = 'BUY' THEN quantity END), 0),"
+                " COALESCE(SUM(CASE WHEN UPPER(side) = 'SELL' THEN quantity END), 0),"
+                " COALESCE(SUM(CASE WHEN UPPER(side) = 'SELL' THEN price * quantity"
+                "                   ELSE -price * quantity END - COALESCE(fee, 0)), 0)"
+                f" FROM trades{where}", params).fetchone()
+        return {'count': row[0], 'buy_quantity': row[1], 'sell_quantity': row[2], 'cash_flow': row[3]}
+
+    def __len__(self):
+        return self.summary()['count']
+
+
+_default_journal = None
+
+
+def default_journal():
+    """进程内共享的日志实例"""
+    global _default_journal
+    if _default_journal is None or _default_journal.conn is None:
+        _default_journal = TradeJournal()
+    return _default_journal
+
+
+def new_run_id(prefix):
+    """一次运行的标识，用于从共享日志中筛选本次运行的记录"""
+    return f"{prefix}-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"